@@ -0,0 +1,56 @@
+"""add full-text search index"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "2026_10_17_0002"
+down_revision = "2025_09_27_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS thoughts_fts_docs ("
+            "docid INTEGER PRIMARY KEY AUTOINCREMENT, thought_id VARCHAR(64) NOT NULL UNIQUE)"
+        )
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS thoughts_fts USING fts5("
+            "title, content, tags, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute("INSERT INTO thoughts_fts_docs (thought_id) SELECT id FROM thoughts WHERE deleted_at IS NULL")
+        op.execute(
+            "INSERT INTO thoughts_fts (rowid, title, content, tags) "
+            "SELECT d.docid, t.title, t.content, "
+            "COALESCE((SELECT group_concat(tag, ' ') FROM thought_tags WHERE thought_id = t.id), '') "
+            "FROM thoughts_fts_docs AS d JOIN thoughts AS t ON t.id = d.thought_id"
+        )
+    elif dialect == "postgresql":
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS thought_search ("
+            "thought_id VARCHAR(64) PRIMARY KEY REFERENCES thoughts (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_thought_search_document ON thought_search USING GIN (document)")
+        op.execute(
+            "INSERT INTO thought_search (thought_id, document) "
+            "SELECT t.id, "
+            "setweight(to_tsvector('simple', t.title), 'A') || "
+            "setweight(to_tsvector('simple', COALESCE((SELECT string_agg(tag, ' ') FROM thought_tags "
+            "WHERE thought_id = t.id), '')), 'B') || "
+            "setweight(to_tsvector('simple', t.content), 'C') "
+            "FROM thoughts AS t WHERE t.deleted_at IS NULL"
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS thoughts_fts")
+        op.execute("DROP TABLE IF EXISTS thoughts_fts_docs")
+    elif dialect == "postgresql":
+        op.execute("DROP TABLE IF EXISTS thought_search")
@@ -0,0 +1,29 @@
+"""add thought change log"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "2026_10_17_0003"
+down_revision = "2026_10_17_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "thought_changes",
+        sa.Column("seq", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("thought_id", sa.String(length=64), nullable=False),
+        sa.ForeignKeyConstraint(["thought_id"], ["thoughts.id"], ondelete="CASCADE"),
+        sa.UniqueConstraint("thought_id", name="uq_thought_changes_thought_id"),
+        sqlite_autoincrement=True,
+    )
+    # seed the log in the order the old timestamp cursor would have delivered rows
+    op.execute("INSERT INTO thought_changes (thought_id) SELECT id FROM thoughts ORDER BY updated_at, id")
+
+
+def downgrade() -> None:
+    op.drop_table("thought_changes")
@@ -0,0 +1,22 @@
+"""record the sync client behind each change"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "2026_10_17_0004"
+down_revision = "2026_10_17_0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("thought_changes") as batch:
+        batch.add_column(sa.Column("client_id", sa.String(length=128), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("thought_changes") as batch:
+        batch.drop_column("client_id")
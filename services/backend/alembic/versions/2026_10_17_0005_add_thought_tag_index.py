@@ -0,0 +1,19 @@
+"""index thought tags by tag for filters and facet counts"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "2026_10_17_0005"
+down_revision = "2026_10_17_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_thought_tags_tag", "thought_tags", ["tag", "thought_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_thought_tags_tag", table_name="thought_tags")
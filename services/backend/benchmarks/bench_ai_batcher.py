@@ -0,0 +1,134 @@
+"""Throughput of suggest calls with and without single flight and micro-batching.
+
+Starts a stand-in model runner on a free local port (uvicorn in a thread).
+Like a real runner it serves one forward pass at a time, and a pass costs a
+fixed ``--pass-ms`` plus ``--item-ms`` per request in it, so ``/suggest``
+pays the fixed cost per request while ``/suggest/batch`` pays it once per
+batch. ``--requests`` suggest calls, ``--concurrency`` at a time, go through
+:class:`AIService` on the pooled client, first directly and then through a
+:class:`ModelBatcher`; a ``--duplicates`` share of them repeat a call that is
+already in flight, the way autosave re-sends unchanged text. The response
+cache is off so every call reaches the batcher.
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_ai_batcher.py --requests 400 --concurrency 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import uvicorn
+
+from enso_api.config import get_settings
+from enso_api.domain.ai import AISuggestRequest
+from enso_api.services.ai import AIService, build_model_client
+from enso_api.services.ai_batcher import ModelBatcher
+
+
+class _StandInRunner:
+    """Bare ASGI app with one forward pass in flight at a time."""
+
+    def __init__(self, pass_seconds: float, item_seconds: float) -> None:
+        self.pass_seconds = pass_seconds
+        self.item_seconds = item_seconds
+        self.passes = 0
+        self._lock: asyncio.Lock | None = None
+
+    async def __call__(self, scope, receive, send) -> None:  # noqa: ANN001
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        payload = json.loads(body)
+        requests = payload["requests"] if scope["path"].endswith("/batch") else [payload]
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self.passes += 1
+            await asyncio.sleep(self.pass_seconds + self.item_seconds * len(requests))
+        answers = [{"suggestions": [{"label": f"#{len(item['content'])}"}], "source": "local"} for item in requests]
+        result = {"responses": answers} if scope["path"].endswith("/batch") else answers[0]
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps(result).encode()})
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+async def _drive(service: AIService, requests: int, concurrency: int, duplicates: float) -> float:
+    distinct = max(1, round(requests * (1 - duplicates)))
+    # repeats sit next to each other, so they overlap with the call they repeat
+    payloads = [AISuggestRequest(content=f"note {index * distinct // requests}") for index in range(requests)]
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(payload: AISuggestRequest) -> None:
+        async with gate:
+            await service.suggest(payload)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(payload) for payload in payloads))
+    return time.perf_counter() - started
+
+
+async def _run(url: str, runner: _StandInRunner, args: argparse.Namespace) -> None:
+    settings = get_settings().model_copy(update={"ai_enabled": True, "ai_mode": "local", "ai_model_url": url})
+    client = build_model_client(settings.model_copy(update={"ai_max_connections": args.concurrency}))
+    async with client:
+        runner.passes = 0
+        elapsed = await _drive(AIService(settings=settings, client=client), args.requests, args.concurrency, args.duplicates)
+        print(f"direct:  {args.requests / elapsed:8.0f} requests/s, {runner.passes} forward passes")
+
+        runner.passes = 0
+        batcher = ModelBatcher(client, window_seconds=args.window_ms / 1000, max_batch=args.max_batch)
+        await batcher.start()
+        service = AIService(settings=settings, client=client, batcher=batcher)
+        elapsed = await _drive(service, args.requests, args.concurrency, args.duplicates)
+        await batcher.stop()
+        stats = batcher.stats
+        print(
+            f"batched: {args.requests / elapsed:8.0f} requests/s, {runner.passes} forward passes "
+            f"({stats.coalesced} coalesced, largest batch {stats.largest_batch})"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duplicates", type=float, default=0.25)
+    parser.add_argument("--pass-ms", type=float, default=10.0)
+    parser.add_argument("--item-ms", type=float, default=0.5)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=16)
+    args = parser.parse_args()
+
+    runner = _StandInRunner(args.pass_ms / 1000, args.item_ms / 1000)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(runner, host="127.0.0.1", port=port, log_level="warning", http="h11"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        asyncio.run(_run(f"http://127.0.0.1:{port}", runner, args))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Per-request overhead of AIService calls: a client per call vs the shared pooled client.
+
+Starts a stand-in model server on a free local port (uvicorn in a thread,
+answering ``/suggest`` with a canned body), then sends the same suggest
+requests through :class:`AIService` twice: without a shared client, so each
+call builds and closes its own ``httpx.AsyncClient`` as before, and with the
+client :func:`build_model_client` creates for the app lifespan. Requests run
+sequentially and then ``--concurrency`` at a time. The server counts the TCP
+connections it accepted.
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_ai_client.py --requests 1000 --concurrency 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+
+import uvicorn
+
+from enso_api.config import get_settings
+from enso_api.domain.ai import AISuggestRequest
+from enso_api.services.ai import AIService, build_model_client
+
+SUGGESTIONS = b'{"suggestions": [{"type": "tag", "label": "#work", "confidence": 0.9}], "source": "local"}'
+
+
+class _StandInModel:
+    """Bare ASGI app: ``/suggest`` answers a fixed body; new connections are counted by client address."""
+
+    def __init__(self) -> None:
+        self.peers: set[tuple[str, int]] = set()
+
+    async def __call__(self, scope, receive, send) -> None:  # noqa: ANN001
+        if scope["type"] != "http":
+            return
+        self.peers.add(tuple(scope["client"]))
+        while (await receive()).get("more_body"):
+            pass
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": SUGGESTIONS})
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+async def _drive(service: AIService, requests: int, concurrency: int) -> float:
+    payload = AISuggestRequest(content="plan the product launch")
+    started = time.perf_counter()
+    if concurrency == 1:
+        for _ in range(requests):
+            await service.suggest(payload)
+    else:
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one() -> None:
+            async with gate:
+                await service.suggest(payload)
+
+        await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - started
+
+
+async def _run(url: str, model: _StandInModel, requests: int, concurrency: int) -> None:
+    settings = get_settings().model_copy(update={"ai_enabled": True, "ai_mode": "local", "ai_model_url": url})
+    for parallel in (1, concurrency):
+        model.peers.clear()
+        elapsed = await _drive(AIService(settings=settings), requests, parallel)
+        print(
+            f"client per call, {parallel:>3} at a time: {elapsed / requests * 1e6:8.0f} us/request, "
+            f"{len(model.peers)} connections"
+        )
+
+        model.peers.clear()
+        client = build_model_client(settings)
+        async with client:
+            elapsed = await _drive(AIService(settings=settings, client=client), requests, parallel)
+        print(
+            f"pooled client,   {parallel:>3} at a time: {elapsed / requests * 1e6:8.0f} us/request, "
+            f"{len(model.peers)} connections"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    model = _StandInModel()
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(model, host="127.0.0.1", port=port, log_level="warning", http="h11"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        asyncio.run(_run(f"http://127.0.0.1:{port}", model, args.requests, args.concurrency))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
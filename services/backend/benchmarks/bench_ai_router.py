@@ -0,0 +1,129 @@
+"""Tail latency of ``AI_MODE=auto`` routing: a single backend vs the router, with and without hedging.
+
+Two simulated backends answer through ``httpx.MockTransport``:
+
+* ``local`` usually answers in ``--local-ms`` but one call in ``--tail-every``
+  takes ``--tail-ms`` (a GC pause, a cold cache);
+* ``remote`` answers steadily in ``--remote-ms``.
+
+Scenarios, ``--requests`` summary calls each, ``--concurrency`` at a time:
+
+1. every call to ``local``, as with ``AI_MODE=local``;
+2. the router over both, no hedging;
+3. the router with ``AI_HEDGE_AFTER_MS=--hedge-ms``;
+4. ``local`` is down and every call to it hangs for ``--timeout-ms`` before
+   failing; only the calls already on their way to it when it went down
+   should pay that wait.
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_ai_router.py --requests 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+from typing import Callable
+
+import httpx
+
+from enso_api.config import get_settings
+from enso_api.domain.ai import AISummaryRequest
+from enso_api.services.ai import AIService
+from enso_api.services.ai_router import ModelBackend, ModelRouter
+
+
+def _client(name: str, latency: Callable[[], tuple[float, bool]]) -> httpx.AsyncClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        delay, ok = latency()
+        await asyncio.sleep(delay)
+        if not ok:
+            raise httpx.ConnectTimeout("timed out", request=request)
+        return httpx.Response(200, json={"summary": name, "source": name})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=f"http://{name}")
+
+
+def _backends(args: argparse.Namespace, *, local_down: bool = False) -> list[ModelBackend]:
+    counter = itertools.count(1)
+
+    def local() -> tuple[float, bool]:
+        if local_down:
+            return args.timeout_ms / 1000, False
+        slow = next(counter) % args.tail_every == 0
+        return (args.tail_ms if slow else args.local_ms) / 1000, True
+
+    def remote() -> tuple[float, bool]:
+        return args.remote_ms / 1000, True
+
+    return [
+        ModelBackend("local", _client("local", local)),
+        ModelBackend("remote", _client("remote", remote)),
+    ]
+
+
+async def _drive(service: AIService, requests: int, concurrency: int) -> list[float]:
+    gate = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(index: int) -> None:
+        async with gate:
+            started = time.perf_counter()
+            await service.summarize(AISummaryRequest(content=f"note {index}"))
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    return latencies
+
+
+def _report(label: str, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+    print(
+        f"{label:<34} p50 {statistics.median(ordered):7.1f} ms  p95 {ordered[int(0.95 * len(ordered))]:7.1f} ms  "
+        f"p99 {p99:7.1f} ms  max {ordered[-1]:7.1f} ms"
+    )
+
+
+async def _run(args: argparse.Namespace) -> None:
+    settings = get_settings().model_copy(update={"ai_enabled": True, "ai_mode": "auto"})
+
+    local = _backends(args)[0].client
+    async with local:
+        service = AIService(settings=settings.model_copy(update={"ai_mode": "local"}), client=local)
+        _report("local only", await _drive(service, args.requests, args.concurrency))
+
+    hedged = ModelRouter(_backends(args), hedge_after_seconds=args.hedge_ms / 1000)
+    scenarios = [
+        ("router", ModelRouter(_backends(args))),
+        (f"router, hedge after {args.hedge_ms:g} ms", hedged),
+        ("local down", ModelRouter(_backends(args, local_down=True))),
+    ]
+    for label, router in scenarios:
+        latencies = await _drive(AIService(settings=settings, router=router), args.requests, args.concurrency)
+        _report(label, latencies)
+        await router.aclose()
+    waited = sum(latency >= args.timeout_ms for latency in latencies)
+    state = router.backends[0].breaker.state
+    print(f"local down: {waited} of {args.requests} calls waited out the timeout; local breaker {state}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--local-ms", type=float, default=20.0)
+    parser.add_argument("--tail-ms", type=float, default=400.0)
+    parser.add_argument("--tail-every", type=int, default=20)
+    parser.add_argument("--remote-ms", type=float, default=35.0)
+    parser.add_argument("--hedge-ms", type=float, default=60.0)
+    parser.add_argument("--timeout-ms", type=float, default=1000.0)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
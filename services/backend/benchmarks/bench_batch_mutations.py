@@ -0,0 +1,77 @@
+"""Per-operation cost of retagging and relinking: one request each vs ``POST /thoughts/batch``.
+
+Drives the app in-process through httpx's ASGI transport against a scratch
+SQLite file. The same retag + relink workload is sent as individual
+``PATCH``/link requests and then as batches of up to 1000 operations.
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_batch_mutations.py --thoughts 300
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+async def _run(thoughts: int) -> None:
+    import httpx
+
+    from enso_api.database import Base, engine
+    from enso_api.domain.thought import MAX_BATCH_OPERATIONS
+    from enso_api.main import app
+
+    Base.metadata.create_all(bind=engine)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        hub = (await client.post("/thoughts/", json={"title": "Hub", "content": "hub"})).json()["id"]
+        ids = []
+        for index in range(thoughts):
+            response = await client.post("/thoughts/", json={"title": f"Note {index}", "content": "note", "tags": ["old"]})
+            ids.append(response.json()["id"])
+
+        started = time.perf_counter()
+        for thought_id in ids:
+            await client.patch(f"/thoughts/{thought_id}", json={"tags": ["single"]})
+            await client.post(f"/thoughts/{thought_id}/links/{hub}")
+        single = time.perf_counter() - started
+
+        operations = [
+            operation
+            for thought_id in ids
+            for operation in (
+                {"op": "update", "id": thought_id, "changes": {"tags": ["batched"]}},
+                {"op": "unlink", "source": thought_id, "target": hub},
+            )
+        ]
+        started = time.perf_counter()
+        for start in range(0, len(operations), MAX_BATCH_OPERATIONS):
+            response = await client.post(
+                "/thoughts/batch", json={"operations": operations[start : start + MAX_BATCH_OPERATIONS]}
+            )
+            assert response.json()["committed"], response.text
+        batched = time.perf_counter() - started
+
+    count = 2 * thoughts
+    print(f"{count} operations as single requests: {single * 1000:8.1f} ms ({single / count * 1e6:7.0f} us/op)")
+    print(f"{count} operations in batches:        {batched * 1000:8.1f} ms ({batched / count * 1e6:7.0f} us/op)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--thoughts", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # settings are read at import time, so point them at the scratch file first
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(scratch) / 'bench.db'}"
+        asyncio.run(_run(args.thoughts))
+
+
+if __name__ == "__main__":
+    main()
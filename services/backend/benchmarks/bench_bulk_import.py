@@ -0,0 +1,98 @@
+"""Import throughput: one ``ThoughtRepository.create`` per row vs the bulk pipeline.
+
+Generates a JSONL file of thoughts with tags and links to earlier and later
+rows, then loads it into a scratch SQLite database twice: row by row through
+the repository, and through :func:`enso_api.bulk.import_file`. Reports rows
+per second for both and for a streaming JSONL export.
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_bulk_import.py --rows 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from enso_api import bulk
+from enso_api.database import Base
+from enso_api.domain.thought import ThoughtCreate
+from enso_api.repositories.thoughts import ThoughtRepository
+
+
+def _rows(count: int, rng: random.Random) -> list[dict]:
+    return [
+        {
+            "id": f"th_{index:08d}",
+            "title": f"Note {index}",
+            "content": f"Body of note {index} about topic {rng.randrange(500)}",
+            "tags": [f"tag{rng.randrange(50)}" for _ in range(2)],
+            "links": [f"th_{rng.randrange(count):08d}" for _ in range(3)],
+        }
+        for index in range(count)
+    ]
+
+
+def _fresh(path: Path) -> sessionmaker[Session]:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def _one_by_one(factory: sessionmaker[Session], rows: list[dict]) -> None:
+    with factory() as session:
+        repo = ThoughtRepository(session)
+        # without the bulk pipeline's second pass, links to later rows have to wait
+        for row in rows:
+            repo.create(ThoughtCreate(**{**row, "links": []}))
+        for row in rows:
+            for target in row["links"]:
+                if target != row["id"]:
+                    repo.link(row["id"], target)
+        session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--single-rows", type=int, default=5_000, help="rows for the slower row-by-row baseline")
+    parser.add_argument("--chunk-size", type=int, default=bulk.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        rows = _rows(args.single_rows, rng)
+        factory = _fresh(Path(scratch) / "single.db")
+        started = time.perf_counter()
+        _one_by_one(factory, rows)
+        elapsed = time.perf_counter() - started
+        print(f"row by row:  {len(rows):>8} rows {elapsed:8.2f} s {len(rows) / elapsed:>10,.0f} rows/s")
+
+        rows = _rows(args.rows, rng)
+        source = b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+        factory = _fresh(Path(scratch) / "bulk.db")
+        report = bulk.import_file(io.BytesIO(source), "jsonl", factory, chunk_size=args.chunk_size)
+        print(
+            f"bulk import: {report.imported:>8} rows {report.elapsed_seconds:8.2f} s "
+            f"{report.rows_per_second:>10,.0f} rows/s ({report.links} links)"
+        )
+
+        with factory() as session:
+            started = time.perf_counter()
+            exported = sum(chunk.count(b"\n") for chunk in bulk.iter_jsonl(session))
+            elapsed = time.perf_counter() - started
+        print(f"jsonl export:{exported:>8} rows {elapsed:8.2f} s {exported / elapsed:>10,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
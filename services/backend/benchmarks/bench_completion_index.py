@@ -0,0 +1,164 @@
+"""Typeahead over titles and tags: the completion index vs ``LIKE '%q%'``.
+
+Seeds a scratch SQLite database with thoughts titled from a word list, some
+links between them and Zipf-distributed tags. It then loads
+:class:`CompletionIndex` and reports p50/p99 of ``complete()`` for prefixes
+of one to six characters cut from real titles. It also times the ``LIKE``
+query the capture UI used before, applies a stream of retitles and relinks
+through the change-feed path (including the merges they trigger), and
+measures query latency again with a full overlay.
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_completion_index.py --thoughts 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from enso_api.completion import CompletionIndex
+from enso_api.database import Base
+from enso_api.domain.thought import ThoughtRead
+from enso_api.models import Thought, ThoughtLink, ThoughtTag
+
+INSERT_BATCH = 50_000
+WORDS = (
+    "alpha atlas autumn bakery balance bridge budget canvas carbon chapter circle climate cloud coffee compass "
+    "concert crystal dawn delta design draft dream echo editor energy engine fabric falcon field forest garden "
+    "glacier harbor harvest horizon island journal kernel ladder lantern launch letter library market meadow "
+    "memory metric mirror module monsoon mountain network notebook ocean orbit palette pattern pepper planet "
+    "podcast portal prism project quartz question rain recipe river roadmap rocket sailing season signal spring "
+    "station summit sunrise thunder timber travel tunnel valley vector voyage window winter workshop yoga zenith"
+).split()
+
+
+def _title(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randrange(2, 6))
+    return " ".join([words[0].capitalize(), *words[1:]])
+
+
+def _seed(session: Session, thoughts: int, tags: int, rng: random.Random) -> tuple[list[str], list[str]]:
+    now = datetime.now(timezone.utc)
+    names = [f"tag{rank}" for rank in range(tags)]
+    weights = [1 / (rank + 1) for rank in range(tags)]
+    ids = [f"th_{index:09d}" for index in range(thoughts)]
+    titles = [_title(rng) for _ in range(thoughts)]
+    for start in range(0, thoughts, INSERT_BATCH):
+        batch = range(start, min(start + INSERT_BATCH, thoughts))
+        rows = []
+        for index in batch:
+            stamp = now - timedelta(days=rng.random() * 720)
+            rows.append(
+                {"id": ids[index], "title": titles[index], "content": "", "created_at": stamp, "updated_at": stamp}
+            )
+        session.execute(insert(Thought), rows)
+        session.execute(
+            insert(ThoughtTag),
+            [
+                {"thought_id": ids[index], "tag": tag}
+                for index in batch
+                for tag in set(rng.choices(names, weights, k=rng.randrange(4)))
+            ],
+        )
+        # skewed targets so a few thoughts are linked to far more than the rest
+        links = {(index, int(thoughts * rng.random() ** 3)) for index in batch for _ in range(rng.randrange(3))}
+        session.execute(
+            insert(ThoughtLink),
+            [{"source_id": ids[source], "target_id": ids[target]} for source, target in links if source != target],
+        )
+    session.commit()
+    return ids, titles
+
+
+def _timed(label: str, call) -> object:  # noqa: ANN001
+    started = time.perf_counter()
+    result = call()
+    print(f"{label:<36} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    return result
+
+
+def _latencies(label: str, call, prefixes: list[str]) -> None:  # noqa: ANN001
+    latencies = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        call(prefix)
+        latencies.append((time.perf_counter() - started) * 1000)
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+    print(f"{label:<36} p50 {statistics.median(ordered):7.3f} ms  p99 {p99:7.3f} ms  max {ordered[-1]:7.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--thoughts", type=int, default=1_000_000)
+    parser.add_argument("--tags", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=100_000, help="retitled and relinked thoughts")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(f"sqlite:///{Path(scratch) / 'complete.db'}")
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as session:
+            ids, titles = _timed("seed database", lambda: _seed(session, args.thoughts, args.tags, rng))
+            index = CompletionIndex()
+            _timed("load index", lambda: index.load(session))
+            print(f"  {index.stats().model_dump()}")
+
+            prefixes = [rng.choice(titles)[: rng.randrange(1, 7)] for _ in range(args.queries)]
+            tag_prefixes = [f"#tag{rng.randrange(args.tags)}"[: rng.randrange(2, 7)] for _ in range(args.queries)]
+            _latencies("complete titles and tags", lambda prefix: index.complete(prefix, 10), prefixes)
+            _latencies("complete #tags", lambda prefix: index.complete(prefix, 10), tag_prefixes)
+            _latencies(
+                "sql LIKE '%q%' (first 50)",
+                lambda prefix: session.execute(
+                    select(Thought.id, Thought.title).where(Thought.title.like(f"%{prefix}%")).limit(10)
+                ).all(),
+                prefixes[:50],
+            )
+
+            now = datetime.now(timezone.utc)
+            changes = [
+                {
+                    ids[slot]: ThoughtRead.model_construct(
+                        id=ids[slot],
+                        title=_title(rng),
+                        content="",
+                        tags=[f"tag{rng.randrange(args.tags)}"],
+                        links=[ids[rng.randrange(len(ids))]],
+                        created_at=now,
+                        updated_at=now,
+                        deleted_at=None,
+                    )
+                }
+                for slot in rng.sample(range(len(ids)), min(args.updates, len(ids)))
+            ]
+            worst = 0.0
+
+            def apply_all() -> None:
+                nonlocal worst
+                for change in changes:
+                    started = time.perf_counter()
+                    index.apply(change)
+                    worst = max(worst, time.perf_counter() - started)
+
+            _timed(f"apply {len(changes)} updates", apply_all)
+            print(f"  slowest apply (a merge) {worst * 1000:.1f} ms; {index.stats().model_dump()}")
+            _latencies("complete after updates", lambda prefix: index.complete(prefix, 10), prefixes)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
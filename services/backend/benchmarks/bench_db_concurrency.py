@@ -0,0 +1,118 @@
+"""Throughput of /thoughts under concurrent load: threadpool sessions vs the async engine.
+
+Each mode runs in a fresh interpreter (settings are read at import time) against
+its own SQLite file, driving the app in-process through httpx's ASGI transport.
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_db_concurrency.py --requests 2000 --concurrency 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+async def _drive(requests: int, concurrency: int, seed: int, write_every: int) -> dict[str, float]:
+    import httpx
+
+    from enso_api.database import Base, engine
+    from enso_api.main import app
+
+    Base.metadata.create_all(bind=engine)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        ids = []
+        for index in range(seed):
+            response = await client.post("/thoughts/", json={"title": f"Seed {index}", "content": "seed", "tags": ["seed"]})
+            ids.append(response.json()["id"])
+
+        gate = asyncio.Semaphore(concurrency)
+        latencies: list[float] = []
+        failures = 0
+
+        async def one(index: int) -> None:
+            nonlocal failures
+            async with gate:
+                started = time.perf_counter()
+                if write_every and index % write_every == 0:
+                    response = await client.post("/thoughts/", json={"title": f"Load {index}", "content": "load"})
+                elif index % 2:
+                    response = await client.get(f"/thoughts/{ids[index % len(ids)]}")
+                else:
+                    response = await client.get("/thoughts/", params={"limit": 50})
+                latencies.append(time.perf_counter() - started)
+                failures += response.status_code >= 400
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "failures": failures,
+    }
+
+
+def _run_mode(async_mode: bool, args: argparse.Namespace) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as scratch:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{Path(scratch) / 'bench.db'}",
+            "DATABASE_ASYNC": "true" if async_mode else "false",
+            "PYTHONPATH": str(Path(__file__).resolve().parent.parent),
+        }
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--child",
+                "--requests",
+                str(args.requests),
+                "--concurrency",
+                str(args.concurrency),
+                "--seed",
+                str(args.seed),
+                "--write-every",
+                str(args.write_every),
+            ],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=200)
+    parser.add_argument("--write-every", type=int, default=0, help="make every Nth request a create (0 = read-only)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_drive(args.requests, args.concurrency, args.seed, args.write_every))))
+        return
+
+    for label, async_mode in (("sync sessions (threadpool)", False), ("async engine (aiosqlite)", True)):
+        result = _run_mode(async_mode, args)
+        print(f"{label:<28} {result['rps']:8.0f} req/s  p50 {result['p50_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms  {result['failures']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Memory and speed of the in-memory link graph index.
+
+Seeds a scratch SQLite database with a random link graph, loads it into
+:class:`LinkGraphIndex`, and reports bytes held per million links alongside
+the time taken by a full load, incremental updates, compaction and each
+analytics query.
+
+Run from ``services/backend`` (needs numpy)::
+
+    python benchmarks/bench_graph_index.py --thoughts 200000 --links 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from enso_api.database import Base
+from enso_api.domain.thought import ThoughtRead
+from enso_api.graph import LinkGraphIndex
+from enso_api.models import Thought, ThoughtLink
+
+INSERT_BATCH = 50_000
+
+
+def _seed(session: Session, thoughts: int, links: int, rng: random.Random) -> list[str]:
+    stamp = datetime.now(timezone.utc)
+    ids = [f"th_{index:09d}" for index in range(thoughts)]
+    for start in range(0, thoughts, INSERT_BATCH):
+        session.execute(
+            insert(Thought),
+            [
+                {"id": thought_id, "title": thought_id, "content": "", "created_at": stamp, "updated_at": stamp}
+                for thought_id in ids[start : start + INSERT_BATCH]
+            ],
+        )
+    pairs: set[tuple[int, int]] = set()
+    while len(pairs) < links:
+        # skewed targets give the graph a few real hubs
+        source, target = rng.randrange(thoughts), int(thoughts * rng.random() ** 3)
+        if source != target:
+            pairs.add((source, target))
+    rows = [{"source_id": ids[source], "target_id": ids[target]} for source, target in pairs]
+    for start in range(0, len(rows), INSERT_BATCH):
+        session.execute(insert(ThoughtLink), rows[start : start + INSERT_BATCH])
+    session.commit()
+    return ids
+
+
+def _timed(label: str, call) -> object:  # noqa: ANN001
+    started = time.perf_counter()
+    result = call()
+    print(f"{label:<28} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--thoughts", type=int, default=200_000)
+    parser.add_argument("--links", type=int, default=1_000_000)
+    parser.add_argument("--updates", type=int, default=10_000, help="thoughts whose links are rewritten incrementally")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(f"sqlite:///{Path(scratch) / 'graph.db'}")
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as session:
+            ids = _timed("seed database", lambda: _seed(session, args.thoughts, args.links, rng))
+            index = LinkGraphIndex()
+            _timed("load index", lambda: index.load(session))
+        engine.dispose()
+
+    stats = index.stats()
+    print(
+        f"{stats.nodes} thoughts, {stats.edges} links: adjacency {stats.adjacency_bytes / 2**20:.1f} MiB, "
+        f"id map {stats.id_map_bytes / 2**20:.1f} MiB, "
+        f"{stats.bytes_per_million_edges / 2**20:.1f} MiB per million links"
+    )
+
+    stamp = datetime.now(timezone.utc)
+    changes = {
+        ids[slot]: ThoughtRead.model_construct(
+            id=ids[slot],
+            title="",
+            content="",
+            tags=[],
+            links=[ids[rng.randrange(len(ids))] for _ in range(5)],
+            created_at=stamp,
+            updated_at=stamp,
+            deleted_at=None,
+        )
+        for slot in rng.sample(range(len(ids)), min(args.updates, len(ids)))
+    }
+    batches = [dict(list(changes.items())[start : start + 10]) for start in range(0, len(changes), 10)]
+    _timed(f"apply {len(changes)} updates", lambda: [index.apply(batch) for batch in batches])
+
+    components = _timed("components (compacts first)", index.components)
+    print(f"  {components.total} components, largest {components.components[0].size}")
+    orphans = _timed("orphans", index.orphans)
+    print(f"  {orphans.total} orphans")
+    _timed("hubs (pagerank)", lambda: index.hubs(20))
+    _timed("hubs (degree)", lambda: index.hubs(20, "degree"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Write throughput on SQLite: one transaction per request vs the group-commit writer.
+
+Concurrent coroutines each create thoughts, either committing their own
+transaction on a worker thread (what a request does without
+``WRITE_COALESCING``) or submitting to :class:`GroupCommitWriter`.
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_group_commit.py --writes 2000 --concurrency 1 16 64 256
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from anyio.to_thread import run_sync
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from enso_api.config import Settings
+from enso_api.database import Base, install_sqlite_pragmas, sqlite_pragmas
+from enso_api.domain.thought import ThoughtCreate
+from enso_api.repositories.thoughts import ThoughtRepository
+from enso_api.write_queue import GroupCommitWriter
+
+
+def _draft(index: int) -> ThoughtCreate:
+    return ThoughtCreate(title=f"Write {index}", content="coalesced " * 20, tags=["bench"])
+
+
+async def _per_request(factory, writes: int, concurrency: int) -> int:  # noqa: ANN001
+    gate = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    def write(index: int) -> None:
+        with factory() as session:
+            ThoughtRepository(session).create(_draft(index))
+            session.commit()
+
+    async def one(index: int) -> None:
+        nonlocal failures
+        async with gate:
+            try:
+                await run_sync(write, index)
+            except OperationalError:
+                failures += 1
+
+    await asyncio.gather(*(one(index) for index in range(writes)))
+    return failures
+
+
+async def _grouped(factory, writes: int, concurrency: int, window: float) -> GroupCommitWriter:  # noqa: ANN001
+    writer = GroupCommitWriter(factory, window_seconds=window)
+    await writer.start()
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with gate:
+            await writer.submit(lambda repo: repo.create(_draft(index)))
+
+    try:
+        await asyncio.gather(*(one(index) for index in range(writes)))
+    finally:
+        await writer.stop()
+    return writer
+
+
+def _measure(mode: str, writes: int, concurrency: int, window: float, profile: Settings) -> str:
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(
+            f"sqlite:///{Path(scratch) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+            pool_size=min(concurrency, 40),
+        )
+        install_sqlite_pragmas(engine, sqlite_pragmas(profile))
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine, class_=Session, autoflush=False, expire_on_commit=False)
+
+        started = time.perf_counter()
+        if mode == "per-request":
+            failures = asyncio.run(_per_request(factory, writes, concurrency))
+            detail = f"  {failures:5d} failed (database is locked)"
+        else:
+            writer = asyncio.run(_grouped(factory, writes, concurrency, window))
+            detail = f"  {writer.stats.groups:5d} commits, largest group {writer.stats.largest_group}"
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+    return f"{mode:<12} c={concurrency:<4} {writes / elapsed:8.0f} attempted writes/s{detail}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--synchronous", default="normal", help="SQLite synchronous level (full fsyncs every commit)")
+    args = parser.parse_args()
+    profile = Settings(sqlite_synchronous=args.synchronous)
+
+    for concurrency in args.concurrency:
+        for mode in ("per-request", "grouped"):
+            print(_measure(mode, args.writes, concurrency, args.window_ms / 1000, profile))
+
+
+if __name__ == "__main__":
+    main()
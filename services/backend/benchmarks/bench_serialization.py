@@ -0,0 +1,77 @@
+"""Per-item cost of rendering thought lists: validated response_model path vs trusted output.
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_serialization.py --items 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from enso_api.domain.thought import ThoughtPublic, ThoughtRead
+from enso_api.serialization import THOUGHT_LIST_ADAPTER
+
+
+def _rows(count: int) -> list[dict]:
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": f"th_{index:08d}",
+            "title": f"Thought {index}",
+            "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4,
+            "tags": ["focus", "work", f"tag-{index % 50}"],
+            "links": [f"th_{(index + 1) % count:08d}", f"th_{(index + 7) % count:08d}"],
+            "created_at": base + timedelta(seconds=index),
+            "updated_at": base + timedelta(seconds=index, minutes=5),
+            "deleted_at": None,
+        }
+        for index in range(count)
+    ]
+
+
+def _validated(rows: list[dict], field) -> bytes:  # noqa: ANN001
+    records = [ThoughtRead(**row) for row in rows]
+    content = asyncio.run(serialize_response(field=field, response_content=records))
+    return JSONResponse(content).body
+
+
+def _trusted(rows: list[dict]) -> bytes:
+    records = [ThoughtRead.model_construct(**row) for row in rows]
+    return THOUGHT_LIST_ADAPTER.dump_json(records)
+
+
+def _measure(label: str, count: int, repeat: int, func) -> float:  # noqa: ANN001
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    per_item = best / count * 1e6
+    print(f"{label:<28} {best * 1000:9.2f} ms total  {per_item:7.2f} us/item")
+    return per_item
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = _rows(args.items)
+    field = create_response_field(name="response", type_=list[ThoughtPublic])
+
+    legacy = _measure("validated (response_model)", args.items, args.repeat, lambda: _validated(rows, field))
+    trusted = _measure("trusted (dump_json)", args.items, args.repeat, lambda: _trusted(rows))
+    print(f"speedup: {legacy / trusted:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Concurrent sync pushes against a SQLite file: stock connection settings vs the tuned profile.
+
+Writer threads push small sync batches while reader threads page through the
+thought list, each on its own pooled connection. Failed transactions (almost
+always "database is locked") are counted rather than retried.
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_sqlite_writers.py --writers 8 --readers 4 --seconds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from enso_api.config import Settings
+from enso_api.database import Base, install_sqlite_pragmas, sqlite_pragmas
+from enso_api.domain.thought import SyncThoughtPayload
+from enso_api.repositories.thoughts import ThoughtRepository
+
+# What a bare ``create_engine("sqlite:///...")`` connection gets: rollback journal,
+# synchronous=FULL, pysqlite's own 5 s lock timeout, small page cache.
+STOCK_PRAGMAS: list[str] = []
+
+
+def _batch(writer: int, round_: int, size: int) -> list[SyncThoughtPayload]:
+    stamp = datetime.now(timezone.utc)
+    return [
+        SyncThoughtPayload(
+            id=f"th_w{writer}_{round_}_{index}",
+            title=f"Writer {writer} round {round_}",
+            content="pushed from a benchmark device " * 8,
+            tags=["bench", f"writer-{writer}"],
+            created_at=stamp,
+            updated_at=stamp,
+        )
+        for index in range(size)
+    ]
+
+
+def _run(label: str, pragmas: list[str], args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(
+            f"sqlite:///{Path(scratch) / 'bench.db'}",
+            connect_args={"check_same_thread": False},
+            pool_size=args.writers + args.readers,
+        )
+        install_sqlite_pragmas(engine, pragmas)
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine, class_=Session, autoflush=False, expire_on_commit=False)
+
+        deadline = time.perf_counter() + args.seconds
+        counts = {"pushed": 0, "reads": 0, "failed": 0}
+        lock = threading.Lock()
+
+        def bump(key: str, amount: int = 1) -> None:
+            with lock:
+                counts[key] += amount
+
+        def writer(number: int) -> None:
+            round_ = 0
+            while time.perf_counter() < deadline:
+                round_ += 1
+                session = factory()
+                try:
+                    ThoughtRepository(session).apply_sync_batch(_batch(number, round_, args.batch), client_id=f"w{number}")
+                    session.commit()
+                    bump("pushed", args.batch)
+                except OperationalError:
+                    session.rollback()
+                    bump("failed")
+                finally:
+                    session.close()
+
+        def reader() -> None:
+            while time.perf_counter() < deadline:
+                session = factory()
+                try:
+                    ThoughtRepository(session).list(limit=50)
+                    bump("reads")
+                except OperationalError:
+                    bump("failed")
+                finally:
+                    session.close()
+
+        threads = [threading.Thread(target=writer, args=(number,)) for number in range(args.writers)]
+        threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    print(
+        f"{label:<10} {counts['pushed'] / elapsed:9.0f} thoughts/s pushed  "
+        f"{counts['reads'] / elapsed:7.0f} pages/s read  {counts['failed']:5d} failed transactions"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    _run("stock", STOCK_PRAGMAS, args)
+    _run("tuned", sqlite_pragmas(Settings()), args)
+
+
+if __name__ == "__main__":
+    main()
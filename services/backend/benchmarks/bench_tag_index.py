@@ -0,0 +1,116 @@
+"""Tag filters and facet counts: per-tag bitmaps vs SQL over ``thought_tags``.
+
+Seeds a scratch SQLite database with thoughts carrying Zipf-distributed tags,
+loads :class:`TagIndex`, and times the same filters and facet counts answered
+from the bitmaps and by SQL (``EXISTS`` subqueries on the tag index and a
+``GROUP BY`` for counts).
+
+Run from ``services/backend``::
+
+    python benchmarks/bench_tag_index.py --thoughts 1000000 --tags 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from enso_api.database import Base
+from enso_api.domain.tags import TagFilter
+from enso_api.models import Thought, ThoughtTag
+from enso_api.repositories.thoughts import ThoughtRepository
+from enso_api.tags import TagIndex
+
+INSERT_BATCH = 50_000
+
+
+def _seed(session: Session, thoughts: int, tags: int, per_thought: int, rng: random.Random) -> None:
+    stamp = datetime.now(timezone.utc)
+    names = [f"tag{rank}" for rank in range(tags)]
+    weights = [1 / (rank + 1) for rank in range(tags)]
+    for start in range(0, thoughts, INSERT_BATCH):
+        ids = [f"th_{index:09d}" for index in range(start, min(start + INSERT_BATCH, thoughts))]
+        session.execute(
+            insert(Thought),
+            [{"id": thought_id, "title": thought_id, "content": "", "created_at": stamp, "updated_at": stamp} for thought_id in ids],
+        )
+        session.execute(
+            insert(ThoughtTag),
+            [
+                {"thought_id": thought_id, "tag": tag}
+                for thought_id in ids
+                for tag in set(rng.choices(names, weights, k=rng.randrange(per_thought + 1)))
+            ],
+        )
+    session.commit()
+
+
+def _timed(label: str, call, repeat: int = 1) -> object:  # noqa: ANN001
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = call()
+    elapsed = (time.perf_counter() - started) / repeat
+    unit, scale = ("us", 1e6) if elapsed < 1e-3 else ("ms", 1e3)
+    print(f"{label:<44} {elapsed * scale:9.1f} {unit}")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--thoughts", type=int, default=1_000_000)
+    parser.add_argument("--tags", type=int, default=2000)
+    parser.add_argument("--per-thought", type=int, default=4, help="upper bound on tags per thought")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    filters = {
+        "all=tag0,tag1 none=tag2": TagFilter.from_params(["tag0", "tag1"], [], ["tag2"]),
+        "all=tag5,tag40 (selective)": TagFilter.from_params(["tag5", "tag40"]),
+        "any=tag100..tag109": TagFilter.from_params([], [f"tag{rank}" for rank in range(100, 110)]),
+        "none=tag0": TagFilter.from_params([], [], ["tag0"]),
+    }
+
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(f"sqlite:///{Path(scratch) / 'tags.db'}")
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as session:
+            _timed("seed database", lambda: _seed(session, args.thoughts, args.tags, args.per_thought, rng))
+            index = TagIndex()
+            _timed("load index", lambda: index.load(session))
+            stats = index.stats()
+            print(
+                f"{stats.live_thoughts} thoughts, {stats.tags} tags, {stats.memberships} memberships: "
+                f"bitmaps {stats.bitmap_bytes / 2**20:.1f} MiB "
+                f"({stats.sparse_chunks} sparse / {stats.dense_chunks} dense chunks)"
+            )
+
+            for label, tag_filter in filters.items():
+                count = _timed(f"bitmap count  {label}", lambda: index.count(tag_filter), repeat=20)
+                _timed(f"bitmap narrow {label}", lambda: index.narrow(tag_filter, 500), repeat=20)
+                repo = ThoughtRepository(session)
+                query = repo._filter_tags(select(func.count()).select_from(Thought), tag_filter)
+                sql_count = _timed(f"sql count     {label}", lambda: session.scalar(query))
+                assert count == sql_count, (label, count, sql_count)
+                print(f"  {count} matches")
+
+            _timed("bitmap facets (all thoughts)", lambda: index.facets(limit=50), repeat=20)
+            _timed("bitmap facets (all=tag0)", lambda: index.facets(TagFilter.from_params(["tag0"]), 50), repeat=5)
+            _timed(
+                "sql facets (GROUP BY)",
+                lambda: session.execute(
+                    select(ThoughtTag.tag, func.count()).group_by(ThoughtTag.tag).order_by(func.count().desc()).limit(50)
+                ).all(),
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Exact vs IVF search over the semantic vector index, and the cost of a restart.
+
+Fills a memory-mapped :class:`VectorIndex` with clustered synthetic
+embeddings (``--clusters`` topics with noise around each), trains the
+inverted lists, then reports query latency and recall@10 against exact
+search for a few probe counts. Finally it seeds a scratch SQLite database
+with matching thoughts and reopens the store from disk, which should
+re-embed nothing.
+
+Run from ``services/backend`` (needs numpy)::
+
+    python benchmarks/bench_vector_index.py --vectors 200000 --dimensions 256
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from enso_api.database import Base
+from enso_api.models import Thought
+from enso_api.vectors import VectorIndex, thought_text
+
+INSERT_BATCH = 50_000
+SIGNATURE = "bench"
+
+
+def _vectors(count: int, dimensions: int, clusters: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    members = rng.integers(0, clusters, size=count)
+    noise = rng.normal(scale=0.6, size=(count, dimensions)).astype(np.float32)
+    return centers, centers[members] + noise
+
+
+def _timed(label: str, call) -> object:  # noqa: ANN001
+    started = time.perf_counter()
+    result = call()
+    print(f"{label:<28} {(time.perf_counter() - started) * 1000:9.1f} ms")
+    return result
+
+
+def _queries(index: VectorIndex, queries: np.ndarray, mode: str, probes: int) -> tuple[list[float], list[set[str]]]:
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits, _ = index.search(query, 10, mode, probes)  # type: ignore[arg-type]
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append({thought_id for thought_id, _ in hits})
+    return latencies, results
+
+
+def _report(label: str, latencies: list[float], recall: float) -> None:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+    print(f"{label:<28} p50 {statistics.median(ordered):7.2f} ms  p99 {p99:7.2f} ms  recall@10 {recall:.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=2_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--probes", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    centers, vectors = _vectors(args.vectors, args.dimensions, args.clusters, rng)
+    ids = [f"th_{slot:09d}" for slot in range(args.vectors)]
+    texts = [thought_text(thought_id, "") for thought_id in ids]
+    queries = centers[rng.integers(0, args.clusters, size=args.queries)]
+    queries += rng.normal(scale=0.6, size=queries.shape).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        store = Path(scratch) / "vectors"
+        index = VectorIndex(store, signature=SIGNATURE, dimensions=args.dimensions)
+        engine = create_engine(f"sqlite:///{Path(scratch) / 'vectors.db'}")
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as session:
+            index.load(session)
+
+            def fill() -> None:
+                for start in range(0, args.vectors, INSERT_BATCH):
+                    stop = start + INSERT_BATCH
+                    index.upsert(ids[start:stop], texts[start:stop], vectors[start:stop])
+
+            _timed(f"insert {args.vectors} vectors", fill)
+            _timed("train inverted lists", index.train)
+            stats = index.stats()
+            print(
+                f"{stats.live_vectors} x {stats.dimensions} vectors, {stats.matrix_bytes / 2**20:.1f} MiB on disk, "
+                f"{stats.ivf_lists} lists"
+            )
+
+            exact_latencies, exact = _queries(index, queries, "exact", 0)
+            _report("exact", exact_latencies, 1.0)
+            for probes in args.probes:
+                latencies, approximate = _queries(index, queries, "ivf", probes)
+                recall = statistics.fmean(len(a & b) / 10 for a, b in zip(exact, approximate))
+                _report(f"ivf, {probes} probes", latencies, recall)
+            index.close()
+
+            stamp = datetime.now(timezone.utc)
+            for start in range(0, args.vectors, INSERT_BATCH):
+                session.execute(
+                    insert(Thought),
+                    [
+                        {"id": thought_id, "title": thought_id, "content": "", "created_at": stamp, "updated_at": stamp}
+                        for thought_id in ids[start : start + INSERT_BATCH]
+                    ],
+                )
+            session.commit()
+            reopened = VectorIndex(store, signature=SIGNATURE, dimensions=args.dimensions)
+            _timed("reopen from disk", lambda: reopened.load(session))
+            print(f"  {reopened.stats().live_vectors} vectors reused, {reopened.pending()} to embed again")
+            reopened.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
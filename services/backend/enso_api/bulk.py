@@ -0,0 +1,407 @@
+"""Bulk import and export of thoughts as JSON Lines or Markdown.
+
+Imports stream rows from a JSONL file or from a folder (or tar archive) of
+Markdown files. Rows are validated a chunk at a time and each chunk is written
+with bulk inserts (``COPY`` on Postgres) in its own transaction. Links are
+collected on the way and resolved in a second pass once every row exists, so
+a row may link to one that appears later in the input. A reference is matched
+as a thought id first, then by title or Markdown file name (case-insensitive),
+imported rows before stored ones.
+
+Markdown files carry their metadata in a front-matter block::
+
+    ---
+    id: "th_abc"
+    title: "Weekly review"
+    tags: ["work", "review"]
+    links: ["th_def"]
+    created_at: "2025-01-06T09:00:00Z"
+    ---
+    Body text, which may also link to [[Another note]].
+
+Values are JSON (which is also YAML); bare words, ``[a, b]`` lists and
+``- item`` blocks are accepted as well. Without a ``title`` the first
+``# heading`` or the file name is used. Rows whose id already exists are
+skipped, so re-running an import of files that carry ids is safe.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import re
+import tarfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from pathlib import Path, PurePosixPath
+from typing import IO, Callable, Iterable, Iterator, Literal, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .domain.thought import ThoughtCreate, ThoughtImportReport, ThoughtRead, generate_thought_id, isoformat
+from .models import Thought
+from .repositories.thoughts import HYDRATE_CHUNK_SIZE, ThoughtRepository, _chunked
+from .serialization import dump_ndjson_lines
+
+BulkFormat = Literal["jsonl", "markdown"]
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+MARKDOWN_SUFFIX = ".md"
+
+_FRONT_MATTER = re.compile(r"\A---[ \t]*\r?\n(.*?)\r?\n---[ \t]*(?:\r?\n|\Z)", re.DOTALL)
+_WIKILINK = re.compile(r"\[\[([^\]|#]+)(?:#[^\]|]*)?(?:\|[^\]]*)?\]\]")
+_HEADING = re.compile(r"^#[ \t]+(.+?)[ \t]*#*[ \t]*$", re.MULTILINE)
+_SLUG = re.compile(r"[^a-z0-9]+")
+
+
+class ImportFormatError(ValueError):
+    """Raised when an import source cannot be read at all (as opposed to a bad row)."""
+
+
+class _ImportedThought(ThoughtCreate):
+    deleted_at: Optional[datetime] = None
+
+
+@dataclass(slots=True)
+class ImportRow:
+    location: str
+    data: dict | None
+    # extra names the row can be linked by, such as its file name
+    aliases: tuple[str, ...] = ()
+    error: str | None = None
+
+
+# ----------------------------------------------------------------------
+# Readers
+# ----------------------------------------------------------------------
+def read_jsonl(lines: Iterable[bytes | str]) -> Iterator[ImportRow]:
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield ImportRow(f"line {number}", None, error=f"invalid JSON: {exc}")
+            continue
+        if not isinstance(data, dict):
+            yield ImportRow(f"line {number}", None, error="expected a JSON object")
+            continue
+        yield ImportRow(f"line {number}", data)
+
+
+def read_markdown_folder(directory: Path) -> Iterator[ImportRow]:
+    for path in sorted(directory.rglob(f"*{MARKDOWN_SUFFIX}")):
+        if path.is_file():
+            yield _markdown_row(path.relative_to(directory).as_posix(), path.read_bytes())
+
+
+def read_markdown_tar(fileobj: IO[bytes]) -> Iterator[ImportRow]:
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode="r:*")
+    except tarfile.TarError as exc:
+        raise ImportFormatError(f"not a readable tar archive: {exc}") from exc
+    with archive:
+        for member in archive:
+            if member.isfile() and member.name.endswith(MARKDOWN_SUFFIX):
+                extracted = archive.extractfile(member)
+                if extracted is not None:
+                    yield _markdown_row(member.name, extracted.read())
+
+
+def parse_markdown(text: str, name: str) -> dict:
+    """Turn a Markdown note into a thought payload; ``[[wikilinks]]`` are added to ``links``."""
+    data: dict = {}
+    body = text
+    match = _FRONT_MATTER.match(text)
+    if match:
+        data = _parse_front_matter(match.group(1))
+        body = text[match.end() :]
+    body = body.strip("\n")
+    if not data.get("title"):
+        heading = _HEADING.search(body)
+        data["title"] = heading.group(1) if heading else PurePosixPath(name).stem
+    tags = data.get("tags") or []
+    data["tags"] = [str(tag) for tag in (tags if isinstance(tags, list) else [tags])]
+    links = data.get("links") or []
+    links = links if isinstance(links, list) else [links]
+    data["links"] = [*map(str, links), *(target.strip() for target in _WIKILINK.findall(body))]
+    data["content"] = body
+    return data
+
+
+def _markdown_row(name: str, raw: bytes) -> ImportRow:
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return ImportRow(name, None, error="not UTF-8 text")
+    return ImportRow(name, parse_markdown(text, name), aliases=(PurePosixPath(name).stem,))
+
+
+def _parse_front_matter(block: str) -> dict:
+    data: dict = {}
+    key: str | None = None
+    for line in block.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key is not None:
+            if not isinstance(data.get(key), list):
+                data[key] = []
+            data[key].append(_scalar(stripped[2:]))
+            continue
+        name, separator, value = line.partition(":")
+        if not separator:
+            continue
+        key = name.strip()
+        data[key] = _value(value.strip())
+    return data
+
+
+def _value(raw: str) -> object:
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        pass
+    if raw.startswith("[") and raw.endswith("]"):
+        return [_scalar(item) for item in raw[1:-1].split(",") if item.strip()]
+    return raw
+
+
+def _scalar(raw: str) -> str:
+    return raw.strip().strip("\"'")
+
+
+# ----------------------------------------------------------------------
+# Import
+# ----------------------------------------------------------------------
+def import_rows(
+    rows: Iterable[ImportRow],
+    session_factory: Callable[[], Session] = SessionLocal,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> ThoughtImportReport:
+    """Validate and insert ``rows`` chunk by chunk, then resolve their links."""
+    report = ThoughtImportReport()
+    started = time.perf_counter()
+    seen: set[str] = set()
+    aliases: dict[str, str] = {}
+    references: list[tuple[str, str]] = []
+
+    iterator = iter(rows)
+    while chunk := list(islice(iterator, chunk_size)):
+        drafts: list[tuple[ImportRow, _ImportedThought, str]] = []
+        for row in chunk:
+            report.read += 1
+            if row.error is not None:
+                _reject(report, row.location, row.error)
+                continue
+            try:
+                draft = _ImportedThought.model_validate(row.data)
+            except ValidationError as exc:
+                error = exc.errors()[0]
+                _reject(report, row.location, f"{'.'.join(map(str, error['loc']))}: {error['msg']}")
+                continue
+            thought_id = draft.id or generate_thought_id()
+            if thought_id in seen:
+                report.skipped += 1
+                continue
+            seen.add(thought_id)
+            drafts.append((row, draft, thought_id))
+
+        with session_factory() as session:
+            repo = ThoughtRepository(session)
+            existing = repo.existing_ids([thought_id for _, _, thought_id in drafts])
+            fresh = [entry for entry in drafts if entry[2] not in existing]
+            repo.bulk_insert([_record(draft, thought_id) for _, draft, thought_id in fresh])
+            session.commit()
+        report.skipped += len(drafts) - len(fresh)
+        report.imported += len(fresh)
+        for row, draft, thought_id in fresh:
+            references.extend((thought_id, reference) for reference in draft.links)
+            for alias in (draft.title, *row.aliases):
+                aliases.setdefault(alias.lower(), thought_id)
+
+    with session_factory() as session:
+        repo = ThoughtRepository(session)
+        pairs, unresolved = _resolve(session, references, seen, aliases)
+        report.links = repo.bulk_link(pairs)
+        session.commit()
+    report.unresolved_links = unresolved
+
+    report.elapsed_seconds = time.perf_counter() - started
+    report.rows_per_second = report.read / report.elapsed_seconds if report.elapsed_seconds else 0.0
+    return report
+
+
+def import_file(
+    source: IO[bytes],
+    data_format: BulkFormat,
+    session_factory: Callable[[], Session] = SessionLocal,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> ThoughtImportReport:
+    """Import a JSONL file or a tar archive of Markdown files."""
+    rows = read_jsonl(source) if data_format == "jsonl" else read_markdown_tar(source)
+    return import_rows(rows, session_factory, chunk_size=chunk_size)
+
+
+def import_path(
+    path: Path,
+    data_format: BulkFormat | None = None,
+    session_factory: Callable[[], Session] = SessionLocal,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> ThoughtImportReport:
+    """Import a JSONL file, a Markdown folder or a tar archive of one; the format is inferred when omitted."""
+    if path.is_dir():
+        return import_rows(read_markdown_folder(path), session_factory, chunk_size=chunk_size)
+    if data_format is None:
+        data_format = "markdown" if tarfile.is_tarfile(path) else "jsonl"
+    with path.open("rb") as source:
+        return import_file(source, data_format, session_factory, chunk_size=chunk_size)
+
+
+def _record(draft: _ImportedThought, thought_id: str) -> ThoughtRead:
+    return ThoughtRead.model_construct(
+        id=thought_id,
+        title=draft.title,
+        content=draft.content,
+        tags=sorted(draft.tags),
+        links=[],
+        created_at=draft.created_at,
+        updated_at=draft.updated_at,
+        deleted_at=draft.deleted_at,
+    )
+
+
+def _reject(report: ThoughtImportReport, location: str, error: str) -> None:
+    report.invalid += 1
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append(f"{location}: {error}")
+
+
+def _resolve(
+    session: Session,
+    references: list[tuple[str, str]],
+    imported: set[str],
+    aliases: dict[str, str],
+) -> tuple[list[tuple[str, str]], int]:
+    """Map each ``(source, reference)`` to a ``(source, target id)`` link."""
+    targets: dict[str, str] = {}
+    pending: set[str] = set()
+    for _, reference in references:
+        if reference in imported:
+            targets[reference] = reference
+        elif reference.lower() in aliases:
+            targets[reference] = aliases[reference.lower()]
+        else:
+            pending.add(reference)
+
+    remaining = sorted(pending)
+    for chunk in _chunked(remaining, HYDRATE_CHUNK_SIZE):
+        targets.update((thought_id, thought_id) for thought_id in ThoughtRepository(session).existing_ids(chunk))
+    by_title: dict[str, list[str]] = {}
+    for reference in remaining:
+        if reference not in targets:
+            by_title.setdefault(reference.lower(), []).append(reference)
+    for chunk in _chunked(sorted(by_title), HYDRATE_CHUNK_SIZE):
+        rows = session.execute(
+            select(func.lower(Thought.title), Thought.id).where(func.lower(Thought.title).in_(chunk)).order_by(Thought.id)
+        )
+        for title, thought_id in rows:
+            for reference in by_title.get(title, ()):
+                targets.setdefault(reference, thought_id)
+
+    pairs = [(source, targets[reference]) for source, reference in references if reference in targets]
+    unresolved = sum(reference not in targets for _, reference in references)
+    return pairs, unresolved
+
+
+# ----------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------
+def render_markdown(record: ThoughtRead) -> str:
+    fields: dict[str, object] = {
+        "id": record.id,
+        "title": record.title,
+        "tags": record.tags,
+        "links": record.links,
+        "created_at": isoformat(record.created_at),
+        "updated_at": isoformat(record.updated_at),
+    }
+    if record.deleted_at is not None:
+        fields["deleted_at"] = isoformat(record.deleted_at)
+    front_matter = "\n".join(f"{key}: {json.dumps(value, ensure_ascii=False)}" for key, value in fields.items())
+    return f"---\n{front_matter}\n---\n{record.content}\n"
+
+
+def markdown_filename(record: ThoughtRead) -> str:
+    slug = _SLUG.sub("-", record.title.lower()).strip("-")[:60] or "thought"
+    return f"{slug}-{record.id}{MARKDOWN_SUFFIX}"
+
+
+def iter_jsonl(session: Session, *, include_deleted: bool = False, batch_size: int = HYDRATE_CHUNK_SIZE) -> Iterator[bytes]:
+    for batch in ThoughtRepository(session).iter_batches(include_deleted=include_deleted, batch_size=batch_size):
+        yield dump_ndjson_lines(batch)
+
+
+def iter_markdown_tar(
+    session: Session, *, include_deleted: bool = False, batch_size: int = HYDRATE_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Stream an uncompressed tar of one Markdown file per thought."""
+    sink = io.BytesIO()
+    with tarfile.open(fileobj=sink, mode="w|") as archive:
+        for batch in ThoughtRepository(session).iter_batches(include_deleted=include_deleted, batch_size=batch_size):
+            for record in batch:
+                data = render_markdown(record).encode("utf-8")
+                info = tarfile.TarInfo(markdown_filename(record))
+                info.size = len(data)
+                info.mtime = int(record.updated_at.timestamp())
+                archive.addfile(info, io.BytesIO(data))
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def export_markdown_folder(session: Session, directory: Path, *, include_deleted: bool = False) -> int:
+    directory.mkdir(parents=True, exist_ok=True)
+    written = 0
+    for batch in ThoughtRepository(session).iter_batches(include_deleted=include_deleted):
+        for record in batch:
+            (directory / markdown_filename(record)).write_text(render_markdown(record), encoding="utf-8")
+        written += len(batch)
+    return written
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+__all__ = [
+    "BulkFormat",
+    "DEFAULT_CHUNK_SIZE",
+    "ImportFormatError",
+    "ImportRow",
+    "export_markdown_folder",
+    "import_file",
+    "import_path",
+    "import_rows",
+    "iter_jsonl",
+    "iter_markdown_tar",
+    "markdown_filename",
+    "parse_markdown",
+    "read_jsonl",
+    "read_markdown_folder",
+    "read_markdown_tar",
+    "render_markdown",
+]
@@ -0,0 +1,138 @@
+"""Bounded in-process caches."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Callable, Generic, Hashable, Iterable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    rejected_fills: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class LRUCache(Generic[K, V]):
+    """Thread-safe LRU map with a per-entry time-to-live.
+
+    Fills are guarded by a generation token so a reader that loaded a value
+    while a writer was invalidating it cannot put the stale copy back::
+
+        token = cache.token()
+        value = load_from_database(key)
+        cache.put(key, value, token)  # dropped if anything was invalidated meanwhile
+
+    With ``sizeof`` the cache also keeps a running total of the size of the
+    values it holds, reported as ``bytes``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sizeof: Callable[[V], int] | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self.bytes = 0
+        self._clock = clock
+        self._sizeof = sizeof
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._forget(value)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def token(self) -> int:
+        return self._generation
+
+    def put(self, key: K, value: V, token: int | None = None) -> bool:
+        if not self.enabled:
+            return False
+        with self._lock:
+            if token is not None and token != self._generation:
+                self.stats.rejected_fills += 1
+                return False
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._forget(previous[1])
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            if self._sizeof is not None:
+                self.bytes += self._sizeof(value)
+            while len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._forget(evicted)
+                self.stats.evictions += 1
+            return True
+
+    def invalidate(self, keys: Iterable[K]) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._forget(entry[1])
+                    self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.bytes = 0
+
+    def _forget(self, value: V) -> None:
+        if self._sizeof is not None:
+            self.bytes -= self._sizeof(value)
+
+    def snapshot(self) -> dict[str, int | float]:
+        snapshot: dict[str, int | float] = {
+            **self.stats.as_dict(),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+        if self._sizeof is not None:
+            snapshot["bytes"] = self.bytes
+        return snapshot
+
+
+__all__ = ["CacheStats", "LRUCache"]
@@ -0,0 +1,90 @@
+"""Administrative command line for the Enso backend."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import BinaryIO, Sequence
+
+from sqlalchemy.orm import Session
+
+from . import bulk
+from .database import session_scope
+from .repositories.thoughts import ThoughtRepository
+
+
+def _rebuild_search(args: argparse.Namespace) -> int:
+    with session_scope() as session:
+        indexed = ThoughtRepository(session).rebuild_search_index(batch_size=args.batch_size)
+    print(f"Indexed {indexed} thoughts")
+    return 0
+
+
+def _import(args: argparse.Namespace) -> int:
+    try:
+        report = bulk.import_path(args.path, args.format, chunk_size=args.chunk_size)
+    except (OSError, bulk.ImportFormatError) as exc:
+        print(f"Import failed: {exc}", file=sys.stderr)
+        return 1
+    for error in report.errors:
+        print(error, file=sys.stderr)
+    print(
+        f"Read {report.read} rows in {report.elapsed_seconds:.2f}s ({report.rows_per_second:,.0f} rows/s): "
+        f"{report.imported} imported, {report.skipped} skipped, {report.invalid} invalid; "
+        f"{report.links} links added, {report.unresolved_links} unresolved"
+    )
+    return 1 if report.invalid else 0
+
+
+def _export(args: argparse.Namespace) -> int:
+    with session_scope() as session:
+        if args.format == "markdown":
+            written = bulk.export_markdown_folder(session, args.path, include_deleted=args.include_deleted)
+        elif str(args.path) == "-":
+            written = _write_jsonl(session, sys.stdout.buffer, args.include_deleted)
+        else:
+            with args.path.open("wb") as sink:
+                written = _write_jsonl(session, sink, args.include_deleted)
+    print(f"Exported {written} thoughts", file=sys.stderr)
+    return 0
+
+
+def _write_jsonl(session: Session, sink: BinaryIO, include_deleted: bool) -> int:
+    written = 0
+    for lines in bulk.iter_jsonl(session, include_deleted=include_deleted):
+        sink.write(lines)
+        written += lines.count(b"\n")
+    return written
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="enso-admin", description="Enso backend maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-search", help="rebuild the full-text search index")
+    rebuild.add_argument("--batch-size", type=int, default=500)
+    rebuild.set_defaults(handler=_rebuild_search)
+
+    load = commands.add_parser("import", help="bulk import thoughts from JSON Lines or Markdown files")
+    load.add_argument("path", type=Path, help="a .jsonl file, a folder of .md files, or a tar archive of them")
+    load.add_argument("--format", choices=["jsonl", "markdown"], help="inferred from the path when omitted")
+    load.add_argument("--chunk-size", type=int, default=bulk.DEFAULT_CHUNK_SIZE)
+    load.set_defaults(handler=_import)
+
+    dump = commands.add_parser("export", help="export thoughts as JSON Lines or a folder of Markdown files")
+    dump.add_argument("path", type=Path, help="output file (- for stdout) or, for markdown, a folder")
+    dump.add_argument("--format", choices=["jsonl", "markdown"], default="jsonl")
+    dump.add_argument("--include-deleted", action="store_true")
+    dump.set_defaults(handler=_export)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
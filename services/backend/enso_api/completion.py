@@ -0,0 +1,471 @@
+"""In-memory prefix index over thought titles and tags for typeahead.
+
+Each :class:`PrefixTable` keeps its keys in one sorted list, so the keys
+sharing a prefix are a contiguous range found with two bisects. Scores sit in
+a max segment tree over the same order, and the best ``k`` in a range come
+out of a heap walk over the tree nodes, which costs ``O(k log n)`` however
+many keys match. Keys that are added or change after the sorted list was built
+go to a small sorted overlay and their old positions are buried (their leaf
+set to ``-inf``). Once the overlay grows past a fraction of the table, both
+are merged into a fresh list in one pass.
+
+Scores combine frequency and recency in a way that does not change as time
+passes: ``log2(1 + uses) + updated_at / RECENCY_HALF_LIFE_SECONDS``. Uses are
+incoming links for titles and carrying thoughts for tags. So a thought edited
+one half-life ago needs twice the uses to rank level with one edited now, and
+no score has to be refreshed while nothing is written.
+
+Like the tag index, the completion index is loaded at startup and then
+follows the change feed (:mod:`enso_api.repositories.change_feed`), including
+the writes other processes commit. It holds only committed state, and a write
+delivered twice leaves every key and score where the first delivery put it.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from itertools import compress
+from operator import itemgetter
+from typing import Iterable, Mapping
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .domain.completion import CompletionIndexStats, CompletionKind, Completions, TagCompletion, TitleCompletion
+from .domain.thought import ThoughtRead
+from .models import Thought, ThoughtLink, ThoughtTag
+
+LOAD_BATCH_SIZE = 10_000
+# overlay entries tolerated before a merge: this many, or 1/16 of the table if that is more
+COMPACT_THRESHOLD = 4096
+COMPACT_FRACTION_BITS = 4
+RECENCY_HALF_LIFE_SECONDS = 30 * 24 * 3600.0
+# sorts after any character a key continues a prefix with
+_PREFIX_END = "\U0010ffff"
+_BURIED = -math.inf
+
+
+def completion_key(text: str) -> str:
+    """What prefixes are matched against: case-folded, whitespace collapsed."""
+    return " ".join(text.casefold().split())
+
+
+def rank_score(uses: int, stamp: float) -> float:
+    return math.log2(1 + uses) + stamp / RECENCY_HALF_LIFE_SECONDS
+
+
+class PrefixTable:
+    """Scored ``(key, member)`` pairs over dense integer members; best members by key prefix.
+
+    Not thread-safe on its own; :class:`CompletionIndex` holds the lock.
+    """
+
+    def __init__(self) -> None:
+        self.compactions = 0
+        self._keys: list[str] = []
+        self._members = array("i")
+        self._size = 1
+        self._tree = array("d", [_BURIED, _BURIED])
+        # member -> position in the sorted list, or -1 when buried, in the overlay or absent
+        self._positions = array("i")
+        self._scores = array("d")
+        self._overlay: list[tuple[str, int]] = []
+        self._overlay_keys: dict[int, str] = {}
+        self._buried = 0
+
+    @classmethod
+    def build(cls, entries: Iterable[tuple[str, int, float]]) -> "PrefixTable":
+        table = cls()
+        pairs = []
+        for key, member, score in entries:
+            table._grow(member)
+            table._scores[member] = score
+            pairs.append((key, member))
+        pairs.sort()
+        table._rebuild(list(map(itemgetter(0), pairs)), array("i", map(itemgetter(1), pairs)))
+        return table
+
+    def __len__(self) -> int:
+        return len(self._keys) - self._buried + len(self._overlay)
+
+    @property
+    def overlay_size(self) -> int:
+        return len(self._overlay)
+
+    def set(self, member: int, key: str, score: float) -> None:
+        self._grow(member)
+        self._scores[member] = score
+        position = self._positions[member]
+        if position >= 0:
+            if self._keys[position] == key:
+                self._update(position, score)
+                return
+            self._bury(member, position)
+        else:
+            current = self._overlay_keys.get(member)
+            if current == key:
+                return
+            if current is not None:
+                self._remove_overlay(member, current)
+        insort(self._overlay, (key, member))
+        self._overlay_keys[member] = key
+        if len(self._overlay) > max(COMPACT_THRESHOLD, len(self._keys) >> COMPACT_FRACTION_BITS):
+            self._compact()
+
+    def discard(self, member: int) -> None:
+        if member >= len(self._positions):
+            return
+        position = self._positions[member]
+        if position >= 0:
+            self._bury(member, position)
+            return
+        current = self._overlay_keys.get(member)
+        if current is not None:
+            self._remove_overlay(member, current)
+
+    def top(self, prefix: str, limit: int) -> list[int]:
+        """Up to ``limit`` members whose key starts with ``prefix``, best score first, then by key."""
+        end = prefix + _PREFIX_END
+        candidates = [
+            (-self._scores[self._members[position]], self._keys[position], self._members[position])
+            for position in self._range_top(bisect_left(self._keys, prefix), bisect_left(self._keys, end), limit)
+        ]
+        overlay = self._overlay
+        for index in range(bisect_left(overlay, (prefix,)), bisect_left(overlay, (end,))):
+            key, member = overlay[index]
+            candidates.append((-self._scores[member], key, member))
+        return [member for _, _, member in heapq.nsmallest(limit, candidates)]
+
+    def _range_top(self, lo: int, hi: int, limit: int) -> list[int]:
+        tree, size = self._tree, self._size
+        heap: list[tuple[float, int]] = []
+        left, right = lo + size, hi + size
+        # the O(log n) nodes that exactly cover [lo, hi)
+        while left < right:
+            if left & 1:
+                heap.append((-tree[left], left))
+                left += 1
+            if right & 1:
+                right -= 1
+                heap.append((-tree[right], right))
+            left >>= 1
+            right >>= 1
+        heapq.heapify(heap)
+        positions: list[int] = []
+        while heap and len(positions) < limit:
+            negated, node = heapq.heappop(heap)
+            if negated == -_BURIED:
+                break
+            if node >= size:
+                positions.append(node - size)
+            else:
+                heapq.heappush(heap, (-tree[2 * node], 2 * node))
+                heapq.heappush(heap, (-tree[2 * node + 1], 2 * node + 1))
+        return positions
+
+    def _grow(self, member: int) -> None:
+        missing = member + 1 - len(self._positions)
+        if missing > 0:
+            self._positions.extend(array("i", [-1]) * missing)
+            self._scores.extend(array("d", [_BURIED]) * missing)
+
+    def _update(self, position: int, score: float) -> None:
+        tree = self._tree
+        node = position + self._size
+        tree[node] = score
+        node >>= 1
+        while node:
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            node >>= 1
+
+    def _bury(self, member: int, position: int) -> None:
+        self._positions[member] = -1
+        self._update(position, _BURIED)
+        self._buried += 1
+
+    def _remove_overlay(self, member: int, key: str) -> None:
+        index = bisect_left(self._overlay, (key, member))
+        del self._overlay[index]
+        del self._overlay_keys[member]
+
+    def _compact(self) -> None:
+        # scores are finite, so the leaves left at -inf are exactly the buried positions
+        alive = list(map(_BURIED.__ne__, self._tree[self._size : self._size + len(self._keys)]))
+        base_keys = list(compress(self._keys, alive))
+        base_members = array("i", compress(self._members, alive))
+        keys: list[str] = []
+        members = array("i")
+        start = 0
+        # splice the (much shorter) overlay into the surviving keys, copying the runs in between whole
+        for key, member in self._overlay:
+            end = bisect_left(base_keys, key, start)
+            keys.extend(base_keys[start:end])
+            members.extend(base_members[start:end])
+            keys.append(key)
+            members.append(member)
+            start = end
+        keys.extend(base_keys[start:])
+        members.extend(base_members[start:])
+        self._rebuild(keys, members)
+        self.compactions += 1
+
+    def _rebuild(self, keys: list[str], members: array) -> None:
+        self._keys, self._members = keys, members
+        positions = self._positions = array("i", [-1]) * len(self._positions)
+        for position, member in enumerate(members):
+            positions[member] = position
+        size = 1
+        while size < len(keys):
+            size <<= 1
+        tree = array("d", [_BURIED]) * (2 * size)
+        tree[size : size + len(keys)] = array("d", map(self._scores.__getitem__, members))
+        # one level at a time: each parent is the larger of its two children
+        level = size
+        while level > 1:
+            children = tree[level : 2 * level]
+            tree[level // 2 : level] = array("d", map(max, children[0::2], children[1::2]))
+            level //= 2
+        self._size, self._tree = size, tree
+        self._overlay, self._overlay_keys, self._buried = [], {}, 0
+
+
+class CompletionIndex:
+    """Thread-safe prefix tables over live thought titles and tags, kept current by committed writes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ids: list[str] = []
+        self._slots: dict[str, int] = {}
+        # None for thoughts that are deleted or only known as link targets
+        self._titles: list[str | None] = []
+        self._stamps = array("d")
+        self._inbound = array("I")
+        self._outbound: dict[int, tuple[int, ...]] = {}
+        self._slot_tags: list[tuple[int, ...]] = []
+        self._tag_names: list[str] = []
+        self._tag_ids: dict[str, int] = {}
+        self._tag_counts = array("I")
+        self._tag_stamps = array("d")
+        self._title_table = PrefixTable()
+        self._tag_table = PrefixTable()
+        # changes delivered while a load is running, replayed on top of it
+        self._backlog: dict[str, ThoughtRead | None] | None = None
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def load(self, session: Session) -> None:
+        """Replace the contents of the index with the titles and tags of the live thoughts currently stored."""
+        with self._lock:
+            self._backlog = {}
+        ids: list[str] = []
+        slots: dict[str, int] = {}
+        titles: list[str | None] = []
+        stamps = array("d")
+        thoughts = (
+            select(Thought.id, Thought.title, Thought.updated_at)
+            .where(Thought.deleted_at.is_(None))
+            .execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        for partition in session.execute(thoughts).partitions():
+            for thought_id, title, updated_at in partition:
+                slots[thought_id] = len(ids)
+                ids.append(thought_id)
+                titles.append(title)
+                stamps.append(_epoch(updated_at))
+
+        inbound = array("I", [0]) * len(ids)
+        outbound: dict[int, list[int]] = {}
+        links = (
+            select(ThoughtLink.source_id, ThoughtLink.target_id)
+            .join(Thought, Thought.id == ThoughtLink.source_id)
+            .where(Thought.deleted_at.is_(None))
+            .execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        for partition in session.execute(links).partitions():
+            for source_id, target_id in partition:
+                source, target = slots.get(source_id), slots.get(target_id)
+                if source is not None and target is not None:
+                    inbound[target] += 1
+                    outbound.setdefault(source, []).append(target)
+
+        tag_names: list[str] = []
+        tag_ids: dict[str, int] = {}
+        tag_counts, tag_stamps = array("I"), array("d")
+        tagged: dict[int, list[int]] = {}
+        rows = (
+            select(ThoughtTag.thought_id, ThoughtTag.tag)
+            .join(Thought, Thought.id == ThoughtTag.thought_id)
+            .where(Thought.deleted_at.is_(None))
+            .execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        for partition in session.execute(rows).partitions():
+            for thought_id, tag in partition:
+                slot = slots.get(thought_id)
+                if slot is None:
+                    continue
+                tag_id = tag_ids.get(tag)
+                if tag_id is None:
+                    tag_id = tag_ids[tag] = len(tag_names)
+                    tag_names.append(tag)
+                    tag_counts.append(0)
+                    tag_stamps.append(_BURIED)
+                tag_counts[tag_id] += 1
+                tag_stamps[tag_id] = max(tag_stamps[tag_id], stamps[slot])
+                tagged.setdefault(slot, []).append(tag_id)
+
+        slot_tags: list[tuple[int, ...]] = [()] * len(ids)
+        for slot, slot_tag_ids in tagged.items():
+            slot_tags[slot] = tuple(slot_tag_ids)
+        title_table = PrefixTable.build(
+            (key, slot, rank_score(inbound[slot], stamps[slot]))
+            for slot, key in enumerate(map(completion_key, titles))
+            if key
+        )
+        tag_table = PrefixTable.build(
+            (name, tag_id, rank_score(tag_counts[tag_id], tag_stamps[tag_id])) for tag_id, name in enumerate(tag_names)
+        )
+
+        with self._lock:
+            self._ids, self._slots, self._titles, self._stamps = ids, slots, titles, stamps
+            self._inbound = inbound
+            self._outbound = {slot: tuple(targets) for slot, targets in outbound.items()}
+            self._slot_tags = slot_tags
+            self._tag_names, self._tag_ids = tag_names, tag_ids
+            self._tag_counts, self._tag_stamps = tag_counts, tag_stamps
+            self._title_table, self._tag_table = title_table, tag_table
+            backlog, self._backlog = self._backlog, None
+            self._apply(backlog or {})
+
+    def apply(self, changes: Mapping[str, ThoughtRead | None]) -> None:
+        """Change feed subscriber: re-rank the title, link targets and tags of every committed thought."""
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.update(changes)
+            self._apply(changes)
+
+    def _apply(self, changes: Mapping[str, ThoughtRead | None]) -> None:
+        for thought_id, record in changes.items():
+            if record is None or record.deleted_at is not None:
+                slot = self._slots.get(thought_id)
+                if slot is not None:
+                    self._titles[slot] = None
+                    self._relink(slot, ())
+                    self._retag(slot, (), _BURIED)
+                    self._rank_title(slot)
+                continue
+            slot = self._slot(thought_id)
+            self._titles[slot] = record.title
+            self._stamps[slot] = _epoch(record.updated_at)
+            self._relink(slot, tuple(self._slot(target_id) for target_id in record.links))
+            self._retag(slot, tuple(self._intern(tag) for tag in record.tags), self._stamps[slot])
+            self._rank_title(slot)
+
+    def _slot(self, thought_id: str) -> int:
+        slot = self._slots.get(thought_id)
+        if slot is None:
+            slot = self._slots[thought_id] = len(self._ids)
+            self._ids.append(thought_id)
+            self._titles.append(None)
+            self._stamps.append(0.0)
+            self._inbound.append(0)
+            self._slot_tags.append(())
+        return slot
+
+    def _intern(self, tag: str) -> int:
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_ids[tag] = len(self._tag_names)
+            self._tag_names.append(tag)
+            self._tag_counts.append(0)
+            self._tag_stamps.append(_BURIED)
+        return tag_id
+
+    def _relink(self, slot: int, targets: tuple[int, ...]) -> None:
+        previous = self._outbound.get(slot, ())
+        if previous == targets:
+            return
+        for target in previous:
+            if target not in targets:
+                self._inbound[target] -= 1
+                self._rank_title(target)
+        for target in targets:
+            if target not in previous:
+                self._inbound[target] += 1
+                self._rank_title(target)
+        if targets:
+            self._outbound[slot] = targets
+        else:
+            self._outbound.pop(slot, None)
+
+    def _retag(self, slot: int, tag_ids: tuple[int, ...], stamp: float) -> None:
+        previous = self._slot_tags[slot]
+        for tag_id in previous:
+            if tag_id not in tag_ids:
+                self._tag_counts[tag_id] -= 1
+                self._rank_tag(tag_id)
+        for tag_id in tag_ids:
+            if tag_id not in previous:
+                self._tag_counts[tag_id] += 1
+            # any write to a thought counts as a use of its tags
+            self._tag_stamps[tag_id] = max(self._tag_stamps[tag_id], stamp)
+            self._rank_tag(tag_id)
+        self._slot_tags[slot] = tag_ids
+
+    def _rank_title(self, slot: int) -> None:
+        title = self._titles[slot]
+        key = completion_key(title) if title else ""
+        if key:
+            self._title_table.set(slot, key, rank_score(self._inbound[slot], self._stamps[slot]))
+        else:
+            self._title_table.discard(slot)
+
+    def _rank_tag(self, tag_id: int) -> None:
+        count = self._tag_counts[tag_id]
+        if count:
+            self._tag_table.set(tag_id, self._tag_names[tag_id], rank_score(count, self._tag_stamps[tag_id]))
+        else:
+            self._tag_table.discard(tag_id)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def complete(self, prefix: str, limit: int = 10, kind: CompletionKind = "all") -> Completions:
+        """Best titles and tags starting with ``prefix``; a leading ``#`` asks for tags only."""
+        if prefix.startswith("#"):
+            prefix, kind = prefix[1:], "tags"
+        key = completion_key(prefix)
+        # a trailing space is part of what was typed: "road " should not match "roadmap"
+        if key and prefix[-1:].isspace():
+            key += " "
+        with self._lock:
+            titles = self._title_table.top(key, limit) if key and kind != "tags" else []
+            tags = self._tag_table.top(key, limit) if kind != "titles" else []
+            return Completions(
+                titles=[TitleCompletion(id=self._ids[slot], title=self._titles[slot] or "") for slot in titles],
+                tags=[TagCompletion(tag=self._tag_names[tag_id]) for tag_id in tags],
+            )
+
+    def stats(self) -> CompletionIndexStats:
+        with self._lock:
+            return CompletionIndexStats(
+                thoughts=len(self._ids),
+                titles=len(self._title_table),
+                tags=len(self._tag_table),
+                overlay_entries=self._title_table.overlay_size + self._tag_table.overlay_size,
+                compactions=self._title_table.compactions + self._tag_table.compactions,
+            )
+
+
+def _epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+__all__ = ["CompletionIndex", "PrefixTable", "completion_key", "rank_score"]
@@ -0,0 +1,91 @@
+"""Entity tags and conditional requests for thought resources.
+
+Tags are derived from the change log rather than the payload: a single
+thought is tagged with the sequence of its latest change (which also moves
+when links are added or removed), and a list with the collection version plus
+the query string. Checking a tag therefore costs one indexed lookup and never
+hydrates tags or links. MessagePack and JSON bodies are distinct
+representations, so they get distinct tags; content codings are told apart
+by ``ContentEncodingMiddleware``, which suffixes and strips them around these
+helpers.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+
+from fastapi import Request, Response, status
+
+from .encoding import wants_msgpack
+
+# revalidate on every use; unchanged resources come back as an empty 304
+CACHE_CONTROL = "private, no-cache"
+
+_ENTITY_TAG = re.compile(r'\s*(W/)?("[^"]*")\s*(?:,|$)')
+_THOUGHT_TAG = re.compile(r'^"t\.(\d+)(?:\.msgpack)?"$')
+
+
+def _suffix(request: Request) -> str:
+    return ".msgpack" if wants_msgpack(request.headers.get("accept", "")) else ""
+
+
+def thought_etag(request: Request, version: int) -> str:
+    return f'"t.{version}{_suffix(request)}"'
+
+
+def collection_etag(request: Request, version: tuple[int, int]) -> str:
+    latest, count = version
+    digest = hashlib.blake2b(f"{latest}:{count}:{request.url.query}".encode(), digest_size=8).hexdigest()
+    return f'"c.{digest}{_suffix(request)}"'
+
+
+def _entity_tags(header: str) -> list[tuple[bool, str]]:
+    """Split an ``If-Match``/``If-None-Match`` value into ``(weak, tag)`` pairs."""
+    return [(bool(match.group(1)), match.group(2)) for match in _ENTITY_TAG.finditer(header)]
+
+
+def none_match(request: Request, etag: str) -> bool:
+    """True when ``If-None-Match`` names ``etag`` (weak comparison, as RFC 9110 requires)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag == etag for _, tag in _entity_tags(header))
+
+
+def expected_versions(request: Request) -> set[int] | None:
+    """Thought versions accepted by ``If-Match``; ``None`` when any version is.
+
+    If-Match uses strong comparison, so weak tags never match.
+    """
+    header = request.headers.get("if-match")
+    if not header or header.strip() == "*":
+        return None
+    versions: set[int] = set()
+    for weak, tag in _entity_tags(header):
+        match = _THOUGHT_TAG.match(tag)
+        if match and not weak:
+            versions.add(int(match.group(1)))
+    return versions
+
+
+def validator_headers(etag: str | None) -> dict[str, str]:
+    if etag is None:
+        return {}
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag))
+
+
+__all__ = [
+    "collection_etag",
+    "expected_versions",
+    "none_match",
+    "not_modified",
+    "thought_etag",
+    "validator_headers",
+]
@@ -6,24 +6,85 @@ import os
 from functools import lru_cache
 from typing import Optional
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ValidationInfo, field_validator
 
 
 DEFAULT_DATABASE_URL = "sqlite:///./enso.db"
 DEFAULT_AI_MODEL_URL = "http://127.0.0.1:11434"
 ALLOWED_AI_MODES = {"local", "remote", "stub", "auto"}
+SQLITE_JOURNAL_MODES = {"wal", "delete", "truncate", "persist", "memory", "off"}
+SQLITE_SYNCHRONOUS_MODES = {"off", "normal", "full", "extra"}
+SQLITE_TEMP_STORES = {"default", "file", "memory"}
+VECTOR_SEARCH_MODES = {"auto", "exact", "ivf"}
+AI_EMBEDDERS = {"hashing", "model"}
+
+
+def is_sqlite_memory_url(url: str) -> bool:
+    return url.startswith("sqlite") and (url.endswith(":memory:") or url == "sqlite://")
 
 
 class Settings(BaseModel):
     database_url: str = DEFAULT_DATABASE_URL
+    database_async: bool = False
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456
+    sqlite_temp_store: str = "memory"
+    sqlite_foreign_keys: bool = True
+    sqlite_maintenance_interval_seconds: float = 3600.0
+    thought_cache_size: int = 2048
+    thought_cache_ttl_seconds: float = 30.0
+    write_coalescing: bool = False
+    write_coalescing_window_ms: float = 5.0
+    write_coalescing_max_batch: int = 128
+    graph_index: bool = True
+    tag_index: bool = True
+    completion_index: bool = True
+    index_refresh_interval_seconds: float = 1.0
+    vector_index: bool = True
+    vector_index_path: str | None = None
+    vector_search_mode: str = "auto"
+    vector_ivf_probes: int = 8
     api_debug: bool = False
     sync_page_size: int = 100
+    compression_min_size: int = 1024
     ai_enabled: bool = False
     ai_mode: str = "stub"
     ai_model_url: str | None = DEFAULT_AI_MODEL_URL
     ai_timeout_seconds: float = 8.0
+    ai_max_connections: int = 20
+    ai_max_keepalive_connections: int = 10
+    ai_keepalive_expiry_seconds: float = 30.0
+    ai_http2: bool = False
+    ai_cache_size: int = 1024
+    ai_cache_ttl_seconds: float = 3600.0
+    ai_cache_path: str | None = None
+    ai_cache_disk_ttl_seconds: float = 604800.0
+    ai_batch_window_ms: float = 2.0
+    ai_batch_max_size: int = 16
+    ai_backends: dict[str, str] = {}
+    ai_route_window: int = 100
+    ai_breaker_failures: int = 5
+    ai_breaker_cooldown_seconds: float = 30.0
+    ai_hedge_after_ms: float = 0.0
+    ai_embedder: str | None = None
+    ai_embedding_model: str = "nomic-embed-text"
+    ai_embedding_dimensions: int = 256
 
-    @field_validator("api_debug", mode="before")
+    @field_validator(
+        "api_debug",
+        "database_async",
+        "sqlite_foreign_keys",
+        "write_coalescing",
+        "graph_index",
+        "tag_index",
+        "completion_index",
+        "vector_index",
+        "ai_http2",
+        mode="before",
+    )
     @classmethod
     def _parse_bool(cls, value: Optional[str] | bool) -> bool:
         if isinstance(value, bool):
@@ -32,6 +93,14 @@ class Settings(BaseModel):
             return False
         return value.lower() in {"1", "true", "yes", "on"}
 
+    @field_validator("database_async")
+    @classmethod
+    def _ensure_async_database_is_shared(cls, value: bool, info: ValidationInfo) -> bool:
+        # each engine would open its own private in-memory database
+        if value and is_sqlite_memory_url(info.data.get("database_url", "")):
+            raise ValueError("database_async cannot be used with an in-memory SQLite database_url")
+        return value
+
     @field_validator("sync_page_size")
     @classmethod
     def _ensure_positive(cls, value: int) -> int:
@@ -39,6 +108,56 @@ class Settings(BaseModel):
             raise ValueError("sync_page_size must be positive")
         return value
 
+    @field_validator("compression_min_size")
+    @classmethod
+    def _ensure_not_negative(cls, value: int) -> int:
+        if value < 0:
+            raise ValueError("compression_min_size must not be negative")
+        return value
+
+    @field_validator(
+        "sqlite_busy_timeout_ms",
+        "sqlite_cache_size_kib",
+        "sqlite_mmap_size",
+        "sqlite_maintenance_interval_seconds",
+        "index_refresh_interval_seconds",
+        "write_coalescing_window_ms",
+        "thought_cache_size",
+        "thought_cache_ttl_seconds",
+        "ai_keepalive_expiry_seconds",
+        "ai_cache_size",
+        "ai_cache_ttl_seconds",
+        "ai_cache_disk_ttl_seconds",
+        "ai_batch_window_ms",
+        "ai_breaker_cooldown_seconds",
+        "ai_hedge_after_ms",
+    )
+    @classmethod
+    def _ensure_tuning_not_negative(cls, value: float, info: ValidationInfo) -> float:
+        if value < 0:
+            raise ValueError(f"{info.field_name} must not be negative")
+        return value
+
+    @field_validator("write_coalescing_max_batch")
+    @classmethod
+    def _ensure_batch_positive(cls, value: int) -> int:
+        if value < 1:
+            raise ValueError("write_coalescing_max_batch must be positive")
+        return value
+
+    @field_validator("sqlite_journal_mode", "sqlite_synchronous", "sqlite_temp_store")
+    @classmethod
+    def _validate_sqlite_choice(cls, value: str, info: ValidationInfo) -> str:
+        allowed = {
+            "sqlite_journal_mode": SQLITE_JOURNAL_MODES,
+            "sqlite_synchronous": SQLITE_SYNCHRONOUS_MODES,
+            "sqlite_temp_store": SQLITE_TEMP_STORES,
+        }[info.field_name]
+        candidate = value.lower()
+        if candidate not in allowed:
+            raise ValueError(f"{info.field_name} must be one of: {', '.join(sorted(allowed))}")
+        return candidate
+
     @field_validator("ai_enabled", mode="before")
     @classmethod
     def _parse_ai_enabled(cls, value: Optional[str] | bool) -> bool:
@@ -60,17 +179,98 @@ class Settings(BaseModel):
             raise ValueError("ai_timeout_seconds must be positive")
         return value
 
+    @field_validator(
+        "ai_max_connections",
+        "ai_max_keepalive_connections",
+        "ai_batch_max_size",
+        "ai_route_window",
+        "ai_breaker_failures",
+        "ai_embedding_dimensions",
+        "vector_ivf_probes",
+    )
+    @classmethod
+    def _ensure_pool_size_positive(cls, value: int, info: ValidationInfo) -> int:
+        if value < 1:
+            raise ValueError(f"{info.field_name} must be positive")
+        return value
+
+    @field_validator("vector_search_mode", "ai_embedder")
+    @classmethod
+    def _validate_vector_choice(cls, value: str | None, info: ValidationInfo) -> str | None:
+        if value is None:
+            return None
+        allowed = {"vector_search_mode": VECTOR_SEARCH_MODES, "ai_embedder": AI_EMBEDDERS}[info.field_name]
+        candidate = value.lower()
+        if candidate not in allowed:
+            raise ValueError(f"{info.field_name} must be one of: {', '.join(sorted(allowed))}")
+        return candidate
+
+    @field_validator("ai_backends", mode="before")
+    @classmethod
+    def _parse_backends(cls, value: Optional[str] | dict[str, str]) -> dict[str, str]:
+        """``name=url`` pairs separated by commas, in order of preference."""
+        if value is None or isinstance(value, dict):
+            return value or {}
+        backends: dict[str, str] = {}
+        for entry in filter(None, (part.strip() for part in value.split(","))):
+            name, separator, url = entry.partition("=")
+            if not separator or not name.strip() or not url.strip():
+                raise ValueError(f"ai_backends entries must look like name=url, got {entry!r}")
+            backends[name.strip()] = url.strip()
+        return backends
+
 
 @lru_cache(maxsize=1)
 def get_settings() -> Settings:
     return Settings(
         database_url=os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL),
+        database_async=os.getenv("DATABASE_ASYNC"),
+        sqlite_journal_mode=os.getenv("SQLITE_JOURNAL_MODE", "wal"),
+        sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS", "normal"),
+        sqlite_busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        sqlite_cache_size_kib=int(os.getenv("SQLITE_CACHE_SIZE_KIB", "65536")),
+        sqlite_mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", "268435456")),
+        sqlite_temp_store=os.getenv("SQLITE_TEMP_STORE", "memory"),
+        sqlite_foreign_keys=os.getenv("SQLITE_FOREIGN_KEYS", "true"),
+        sqlite_maintenance_interval_seconds=float(os.getenv("SQLITE_MAINTENANCE_INTERVAL_SECONDS", "3600")),
+        thought_cache_size=int(os.getenv("THOUGHT_CACHE_SIZE", "2048")),
+        thought_cache_ttl_seconds=float(os.getenv("THOUGHT_CACHE_TTL_SECONDS", "30")),
+        write_coalescing=os.getenv("WRITE_COALESCING"),
+        write_coalescing_window_ms=float(os.getenv("WRITE_COALESCING_WINDOW_MS", "5")),
+        write_coalescing_max_batch=int(os.getenv("WRITE_COALESCING_MAX_BATCH", "128")),
+        graph_index=os.getenv("GRAPH_INDEX", "true"),
+        tag_index=os.getenv("TAG_INDEX", "true"),
+        completion_index=os.getenv("COMPLETION_INDEX", "true"),
+        index_refresh_interval_seconds=float(os.getenv("INDEX_REFRESH_INTERVAL_SECONDS", "1")),
+        vector_index=os.getenv("VECTOR_INDEX", "true"),
+        vector_index_path=os.getenv("VECTOR_INDEX_PATH") or None,
+        vector_search_mode=os.getenv("VECTOR_SEARCH_MODE", "auto"),
+        vector_ivf_probes=int(os.getenv("VECTOR_IVF_PROBES", "8")),
         api_debug=os.getenv("API_DEBUG"),
         sync_page_size=int(os.getenv("SYNC_PAGE_SIZE", "100")),
+        compression_min_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
         ai_enabled=os.getenv("AI_ENABLED", "false"),
         ai_mode=os.getenv("AI_MODE", "stub"),
         ai_model_url=os.getenv("AI_MODEL_URL", DEFAULT_AI_MODEL_URL),
         ai_timeout_seconds=float(os.getenv("AI_TIMEOUT_SECONDS", "8.0")),
+        ai_max_connections=int(os.getenv("AI_MAX_CONNECTIONS", "20")),
+        ai_max_keepalive_connections=int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", "10")),
+        ai_keepalive_expiry_seconds=float(os.getenv("AI_KEEPALIVE_EXPIRY_SECONDS", "30")),
+        ai_http2=os.getenv("AI_HTTP2", "false"),
+        ai_cache_size=int(os.getenv("AI_CACHE_SIZE", "1024")),
+        ai_cache_ttl_seconds=float(os.getenv("AI_CACHE_TTL_SECONDS", "3600")),
+        ai_cache_path=os.getenv("AI_CACHE_PATH") or None,
+        ai_cache_disk_ttl_seconds=float(os.getenv("AI_CACHE_DISK_TTL_SECONDS", "604800")),
+        ai_batch_window_ms=float(os.getenv("AI_BATCH_WINDOW_MS", "2")),
+        ai_batch_max_size=int(os.getenv("AI_BATCH_MAX_SIZE", "16")),
+        ai_backends=os.getenv("AI_BACKENDS"),
+        ai_route_window=int(os.getenv("AI_ROUTE_WINDOW", "100")),
+        ai_breaker_failures=int(os.getenv("AI_BREAKER_FAILURES", "5")),
+        ai_breaker_cooldown_seconds=float(os.getenv("AI_BREAKER_COOLDOWN_SECONDS", "30")),
+        ai_hedge_after_ms=float(os.getenv("AI_HEDGE_AFTER_MS", "0")),
+        ai_embedder=os.getenv("AI_EMBEDDER") or None,
+        ai_embedding_model=os.getenv("AI_EMBEDDING_MODEL", "nomic-embed-text"),
+        ai_embedding_dimensions=int(os.getenv("AI_EMBEDDING_DIMENSIONS", "256")),
     )
 
 
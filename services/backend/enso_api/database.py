@@ -2,32 +2,130 @@
 
 from __future__ import annotations
 
-from contextlib import contextmanager
-from typing import Generator
-
-from sqlalchemy import create_engine
+import asyncio
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncGenerator, Generator, Sequence
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from sqlalchemy.pool import StaticPool
+from anyio import CapacityLimiter
+from anyio.to_thread import run_sync
+
+from .config import Settings, get_settings, is_sqlite_memory_url
 
-from .config import get_settings
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+# async drivers used when DATABASE_ASYNC is enabled, keyed by backend name
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def sqlite_pragmas(config: Settings) -> list[str]:
+    """PRAGMA statements run on every new SQLite connection.
+
+    ``busy_timeout`` comes first so that switching the journal mode waits for
+    other connections instead of failing with "database is locked".
+    """
+    return [
+        f"PRAGMA busy_timeout = {config.sqlite_busy_timeout_ms}",
+        f"PRAGMA journal_mode = {config.sqlite_journal_mode.upper()}",
+        f"PRAGMA synchronous = {config.sqlite_synchronous.upper()}",
+        f"PRAGMA cache_size = -{config.sqlite_cache_size_kib}",
+        f"PRAGMA mmap_size = {config.sqlite_mmap_size}",
+        f"PRAGMA temp_store = {config.sqlite_temp_store.upper()}",
+        f"PRAGMA foreign_keys = {'ON' if config.sqlite_foreign_keys else 'OFF'}",
+    ]
+
+
+def install_sqlite_pragmas(target: Engine, pragmas: Sequence[str]) -> None:
+    """Apply ``pragmas`` to each DBAPI connection ``target`` opens."""
+
+    @event.listens_for(target, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):  # noqa: ANN001
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
 connect_args: dict[str, object] = {}
 engine_kwargs: dict[str, object] = {"echo": settings.api_debug, "future": True}
 
 if settings.database_url.startswith("sqlite"):
     connect_args["check_same_thread"] = False
-    if settings.database_url.endswith(":memory:") or settings.database_url == "sqlite://":
+    if is_sqlite_memory_url(settings.database_url):
         engine_kwargs["poolclass"] = StaticPool
 
 engine = create_engine(settings.database_url, connect_args=connect_args, **engine_kwargs)
 
+if engine.dialect.name == "sqlite":
+    install_sqlite_pragmas(engine, sqlite_pragmas(settings))
+
 SessionLocal = sessionmaker(bind=engine, class_=Session, autoflush=False, autocommit=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
+def async_database_url(url: str) -> str:
+    """Rewrite a sync SQLAlchemy URL to use the matching async driver."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver configured for {backend!r} databases")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def create_async_engine_for(url: str) -> AsyncEngine:
+    kwargs: dict[str, object] = {"echo": settings.api_debug}
+    if is_sqlite_memory_url(url):
+        kwargs["poolclass"] = StaticPool
+    created = create_async_engine(async_database_url(url), **kwargs)
+    if created.dialect.name == "sqlite":
+        install_sqlite_pragmas(created.sync_engine, sqlite_pragmas(settings))
+    return created
+
+
+# Session teardown gets its own thread slots so commits can still run while
+# every default worker is blocked waiting for a pooled connection.
+_teardown_limiter = CapacityLimiter(8)
+
+async_engine: AsyncEngine | None = None
+AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = None
+
+if settings.database_async:
+    async_engine = create_async_engine_for(settings.database_url)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+def run_sqlite_maintenance(target: Engine | None = None) -> None:
+    """Refresh planner statistics and fold the WAL back into the database file.
+
+    ``PASSIVE`` checkpoints never wait on readers or writers, so this is safe
+    to run while the API is serving traffic.
+    """
+    with (target or engine).connect() as connection:
+        connection.exec_driver_sql("PRAGMA optimize")
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")
+
+
+async def sqlite_maintenance_loop(interval_seconds: float) -> None:
+    """Run :func:`run_sqlite_maintenance` every ``interval_seconds`` until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_sync(run_sqlite_maintenance)
+        except SQLAlchemyError:
+            logger.exception("SQLite maintenance failed")
+
+
 @contextmanager
 def session_scope() -> Generator[Session, None, None]:
     session = SessionLocal()
@@ -41,9 +139,62 @@ def session_scope() -> Generator[Session, None, None]:
         session.close()
 
 
+@asynccontextmanager
+async def async_session_scope() -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("DATABASE_ASYNC is not enabled")
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+
 def get_session() -> Generator[Session, None, None]:
     with session_scope() as session:
         yield session
 
 
-__all__ = ["Base", "engine", "SessionLocal", "get_session", "session_scope"]
+async def get_db_session() -> AsyncGenerator[Session | AsyncSession, None]:
+    """Request-scoped session for async route handlers.
+
+    Yields an :class:`AsyncSession` when ``DATABASE_ASYNC`` is enabled and a
+    regular :class:`Session` otherwise; blocking work on the latter is pushed
+    to the threadpool.
+    """
+    if AsyncSessionLocal is not None:
+        async with async_session_scope() as session:
+            yield session
+        return
+
+    session = SessionLocal()
+    try:
+        yield session
+        await run_sync(session.commit, limiter=_teardown_limiter)
+    except Exception:
+        await run_sync(session.rollback, limiter=_teardown_limiter)
+        raise
+    finally:
+        await run_sync(session.close, limiter=_teardown_limiter)
+
+
+__all__ = [
+    "AsyncSessionLocal",
+    "Base",
+    "async_database_url",
+    "async_engine",
+    "async_session_scope",
+    "create_async_engine_for",
+    "engine",
+    "SessionLocal",
+    "get_db_session",
+    "get_session",
+    "install_sqlite_pragmas",
+    "is_sqlite_memory_url",
+    "run_sqlite_maintenance",
+    "session_scope",
+    "sqlite_maintenance_loop",
+    "sqlite_pragmas",
+]
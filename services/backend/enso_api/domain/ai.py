@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -39,6 +39,14 @@ class AISuggestResponse(BaseModel):
     source: Optional[str] = None
 
 
+class AISuggestBatchRequest(BaseModel):
+    requests: list[AISuggestRequest] = Field(min_length=1, max_length=64)
+
+
+class AISuggestBatchResponse(BaseModel):
+    responses: list[AISuggestResponse] = Field(default_factory=list)
+
+
 class AISearchRequest(BaseModel):
     query: str
     limit: int | None = Field(default=5, ge=1, le=50)
@@ -74,11 +82,39 @@ class AISummaryResponse(BaseModel):
     source: Optional[str] = None
 
 
+class VectorIndexStats(BaseModel):
+    vectors: int
+    live_vectors: int
+    dimensions: int | None = None
+    pending: int
+    embedded: int
+    matrix_bytes: int
+    memory_mapped: bool
+    signature: str
+    ivf_lists: int | None = None
+    ivf_trained_on: int | None = None
+    ivf_overlay: int = 0
+    exact_searches: int = 0
+    ivf_searches: int = 0
+
+
+class AIBackendStatus(BaseModel):
+    name: str
+    url: str
+    state: Literal["closed", "open", "half_open"]
+    samples: int
+    error_rate: float
+    p50_ms: float | None = None
+    p95_ms: float | None = None
+    consecutive_failures: int = 0
+
+
 class AIHealthResponse(BaseModel):
     status: str
     detail: str | None = None
     mode: str
     enabled: bool
+    backends: list[AIBackendStatus] | None = None
 
 
 __all__ = [
@@ -86,10 +122,14 @@ __all__ = [
     "AISuggestion",
     "AISuggestRequest",
     "AISuggestResponse",
+    "AISuggestBatchRequest",
+    "AISuggestBatchResponse",
     "AISearchRequest",
     "AISearchResponse",
     "AISearchResult",
     "AISummaryRequest",
     "AISummaryResponse",
+    "AIBackendStatus",
+    "VectorIndexStats",
     "AIHealthResponse",
 ]
@@ -0,0 +1,35 @@
+"""Typeahead completions for thought titles and tags."""
+
+from __future__ import annotations
+
+from typing import List, Literal
+
+from pydantic import BaseModel
+
+CompletionKind = Literal["all", "titles", "tags"]
+
+
+class TitleCompletion(BaseModel):
+    id: str
+    title: str
+
+
+class TagCompletion(BaseModel):
+    tag: str
+
+
+class Completions(BaseModel):
+    titles: List[TitleCompletion]
+    tags: List[TagCompletion]
+
+
+class CompletionIndexStats(BaseModel):
+    thoughts: int
+    titles: int
+    tags: int
+    # entries added since the sorted arrays were last rebuilt
+    overlay_entries: int
+    compactions: int
+
+
+__all__ = ["CompletionIndexStats", "CompletionKind", "Completions", "TagCompletion", "TitleCompletion"]
@@ -0,0 +1,43 @@
+"""Pydantic models describing whole-graph analytics over thought links."""
+
+from __future__ import annotations
+
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class GraphComponent(BaseModel):
+    size: int
+    thought_ids: List[str]
+
+
+class GraphComponents(BaseModel):
+    total: int
+    components: List[GraphComponent]
+
+
+class GraphOrphans(BaseModel):
+    total: int
+    thought_ids: List[str]
+
+
+class GraphHub(BaseModel):
+    id: str
+    score: float
+    in_degree: int
+    out_degree: int
+
+
+class GraphIndexStats(BaseModel):
+    nodes: int
+    live_nodes: int
+    edges: int
+    pending_nodes: int
+    compactions: int
+    adjacency_bytes: int
+    id_map_bytes: int
+    bytes_per_million_edges: Optional[float] = None
+
+
+__all__ = ["GraphComponent", "GraphComponents", "GraphHub", "GraphIndexStats", "GraphOrphans"]
@@ -0,0 +1,60 @@
+"""Tag filters and facet counts over thought tags."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from .thought import _dedupe, _normalize_tag
+
+
+@dataclass(frozen=True, slots=True)
+class TagFilter:
+    """Thoughts carrying every tag in ``all_of``, at least one of ``any_of`` and none of ``none_of``."""
+
+    all_of: tuple[str, ...] = ()
+    any_of: tuple[str, ...] = ()
+    none_of: tuple[str, ...] = ()
+    # set when the tag index already resolved the filter to these ids
+    thought_ids: Optional[tuple[str, ...]] = None
+
+    @classmethod
+    def from_params(
+        cls,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        none_of: Iterable[str] = (),
+    ) -> Optional["TagFilter"]:
+        """Normalize tags the way thoughts store them; ``None`` when no tag is given."""
+        tag_filter = cls(_normalized(all_of), _normalized(any_of), _normalized(none_of))
+        return tag_filter if tag_filter.all_of or tag_filter.any_of or tag_filter.none_of else None
+
+
+def _normalized(tags: Iterable[str]) -> tuple[str, ...]:
+    return tuple(_dedupe(_normalize_tag(tag) for tag in tags if _normalize_tag(tag)))
+
+
+class TagCount(BaseModel):
+    tag: str
+    count: int
+
+
+class TagFacets(BaseModel):
+    # live thoughts matching the filter
+    total: int
+    tags: List[TagCount]
+
+
+class TagIndexStats(BaseModel):
+    thoughts: int
+    live_thoughts: int
+    tags: int
+    memberships: int
+    sparse_chunks: int
+    dense_chunks: int
+    bitmap_bytes: int
+
+
+__all__ = ["TagCount", "TagFacets", "TagFilter", "TagIndexStats"]
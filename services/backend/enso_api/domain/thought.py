@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import base64
+import json
 from datetime import datetime, timezone
 from secrets import token_urlsafe
-from typing import Iterable, List, Optional
+from typing import Annotated, Iterable, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field, field_validator, model_validator
 
@@ -23,6 +25,22 @@ def generate_thought_id() -> str:
     return f"th_{token}{stamp}"
 
 
+def encode_page_cursor(updated_at: datetime, thought_id: str) -> str:
+    """Encode the ``(updated_at, id)`` keyset position of a row as an opaque token."""
+    raw = json.dumps([updated_at.isoformat(), thought_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_page_cursor(token: str) -> tuple[datetime, str]:
+    """Decode a token produced by :func:`encode_page_cursor`."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        stamp, thought_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(stamp), str(thought_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("invalid page cursor") from exc
+
+
 def _normalize_tag(tag: str) -> str:
     return tag.strip().lower()
 
@@ -122,6 +140,30 @@ class ThoughtRead(ThoughtPublic):
     pass
 
 
+class ThoughtSearchHit(ThoughtPublic):
+    score: float
+    snippet: str
+
+
+class GraphNode(BaseModel):
+    id: str
+    title: str
+    depth: int
+
+
+class GraphEdge(BaseModel):
+    source: str
+    target: str
+
+
+class ThoughtGraph(BaseModel):
+    root: str
+    depth: int
+    nodes: List[GraphNode]
+    edges: List[GraphEdge]
+    truncated: bool = False
+
+
 class ThoughtUpdate(BaseModel):
     title: Optional[str] = None
     content: Optional[str] = None
@@ -164,22 +206,105 @@ class ThoughtUpdate(BaseModel):
         return _sanitize_links(values)
 
 
+MAX_BATCH_OPERATIONS = 1000
+
+BatchMode = Literal["atomic", "best_effort"]
+
+
+class BatchCreate(BaseModel):
+    op: Literal["create"]
+    thought: ThoughtCreate
+
+
+class BatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: str
+    changes: ThoughtUpdate
+
+
+class BatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: str
+
+
+class BatchLink(BaseModel):
+    op: Literal["link", "unlink"]
+    source: str
+    target: str
+
+
+BatchOperation = Annotated[Union[BatchCreate, BatchUpdate, BatchDelete, BatchLink], Field(discriminator="op")]
+
+
+class ThoughtBatchRequest(BaseModel):
+    mode: BatchMode = "atomic"
+    operations: List[BatchOperation] = Field(min_length=1, max_length=MAX_BATCH_OPERATIONS)
+
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: str
+    # the status the operation's own endpoint would have answered with
+    status: int
+    thought: Optional[ThoughtPublic] = None
+    error: Optional[str] = None
+
+
+class ThoughtBatchResponse(BaseModel):
+    committed: bool
+    applied: int
+    failed: int
+    results: List[BatchOperationResult]
+
+
+class ThoughtImportReport(BaseModel):
+    read: int = 0
+    imported: int = 0
+    # ids that already exist, or repeat earlier in the same input
+    skipped: int = 0
+    invalid: int = 0
+    links: int = 0
+    unresolved_links: int = 0
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+    errors: List[str] = Field(default_factory=list)
+
+
 class SyncThoughtPayload(ThoughtPublic):
     pass
 
 
 class SyncRequest(BaseModel):
     client_id: str
-    since: Optional[datetime] = None
+    since: Optional[str] = None
     changes: List[SyncThoughtPayload] = Field(default_factory=list)
 
+    @field_validator("since", mode="before")
+    @classmethod
+    def _coerce_since(cls, value: object) -> object:
+        if isinstance(value, int):
+            return str(value)
+        return value
+
 
 class SyncResponse(BaseModel):
-    cursor: datetime
+    cursor: str
     changes: List[ThoughtPublic]
     has_more: bool = False
 
 
+def parse_sync_cursor(value: Optional[str]) -> int:
+    """Return the change sequence encoded in a sync cursor.
+
+    Cursors issued before the change log existed were timestamps; those (and
+    anything else unparseable) restart the pull from the beginning so the
+    client converges through last-write-wins instead of missing rows.
+    """
+    if value and value.isdigit():
+        return int(value)
+    return 0
+
+
 def apply_update(thought: ThoughtRead, patch: ThoughtUpdate) -> ThoughtRead:
     updated = ThoughtRead(
         id=thought.id,
@@ -194,6 +319,17 @@ def apply_update(thought: ThoughtRead, patch: ThoughtUpdate) -> ThoughtRead:
     return updated
 
 
+def diverges(existing: ThoughtRead, incoming: SyncThoughtPayload) -> bool:
+    """Return ``True`` when ``incoming`` describes a different state than ``existing``."""
+    return (
+        existing.title != incoming.title
+        or existing.content != incoming.content
+        or sorted(existing.tags) != sorted(incoming.tags)
+        or sorted(existing.links) != sorted(_sanitize_links(incoming.links, existing.id))
+        or (existing.deleted_at is None) != (incoming.deleted_at is None)
+    )
+
+
 def _to_utc(value: datetime | None) -> datetime | None:
     if value is None:
         return None
@@ -236,15 +372,34 @@ def reconcile_change(existing: Optional[ThoughtRead], incoming: SyncThoughtPaylo
 
 
 __all__ = [
+    "MAX_BATCH_OPERATIONS",
+    "BatchCreate",
+    "BatchDelete",
+    "BatchLink",
+    "BatchMode",
+    "BatchOperation",
+    "BatchOperationResult",
+    "BatchUpdate",
+    "GraphEdge",
+    "GraphNode",
+    "ThoughtBatchRequest",
+    "ThoughtBatchResponse",
     "ThoughtCreate",
+    "ThoughtGraph",
+    "ThoughtImportReport",
     "ThoughtPublic",
     "ThoughtRead",
+    "ThoughtSearchHit",
     "ThoughtUpdate",
     "SyncRequest",
     "SyncResponse",
     "SyncThoughtPayload",
     "apply_update",
+    "diverges",
+    "parse_sync_cursor",
     "reconcile_change",
+    "decode_page_cursor",
+    "encode_page_cursor",
     "generate_thought_id",
     "utcnow",
 ]
@@ -0,0 +1,408 @@
+"""Content negotiation for compressed and MessagePack-encoded payloads.
+
+``ContentEncodingMiddleware`` sits in front of the thought and sync routers:
+
+* responses are compressed with zstd, brotli or gzip according to the client's
+  ``Accept-Encoding`` (small bodies are sent as-is);
+* JSON responses are re-encoded as MessagePack when the client asks for
+  ``application/msgpack``;
+* request bodies may use the same content codings and MessagePack, and are
+  normalized to plain JSON before they reach FastAPI;
+* a compressed response's ``ETag`` gets the coding appended (``"t.5-gzip"``)
+  so every representation has its own strong validator, and the suffix is
+  stripped from ``If-None-Match``/``If-Match`` before the routers compare tags.
+
+brotli, zstandard and msgpack are optional; codecs whose package is missing
+are simply not offered.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Protocol, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # pragma: no cover - optional dependency
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:  # pragma: no cover - optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:  # pragma: no cover - optional dependency
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "application/x-ndjson", "application/msgpack", "text/")
+DEFAULT_MAX_REQUEST_BYTES = 32 * 1024 * 1024
+ZSTD_READ_SIZE = 1024 * 1024
+
+
+class StreamCompressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+@dataclass(frozen=True, slots=True)
+class Codec:
+    name: str
+    compressor: Callable[[], StreamCompressor]
+    decompress: Callable[[bytes, int], bytes]
+
+
+class RequestDecodingError(ValueError):
+    def __init__(self, detail: str, status_code: int):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+class _GzipCompressor:
+    def __init__(self) -> None:
+        self._inner = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._inner.compress(data) + self._inner.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._inner.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self) -> None:
+        self._inner = brotli.Compressor(quality=5)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._inner.process(data) + self._inner.flush()
+
+    def finish(self) -> bytes:
+        return self._inner.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self) -> None:
+        self._inner = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._inner.compress(data) + self._inner.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._inner.flush()
+
+
+def _bounded(data: bytes | bytearray, limit: int) -> bytes | bytearray:
+    if len(data) > limit:
+        raise RequestDecodingError("decoded request body is too large", 413)
+    return data
+
+
+def _gunzip(data: bytes, limit: int) -> bytes:
+    with gzip.GzipFile(fileobj=io.BytesIO(data)) as stream:
+        return _bounded(stream.read(limit + 1), limit)
+
+
+def _unbrotli(data: bytes, limit: int) -> bytes:
+    # cap each step's output so a small bomb is rejected before it is inflated in full
+    decompressor = brotli.Decompressor()
+    output = bytearray(decompressor.process(data, output_buffer_limit=limit + 1))
+    while len(output) <= limit and not decompressor.can_accept_more_data():
+        output += decompressor.process(b"", output_buffer_limit=limit + 1 - len(output))
+    _bounded(output, limit)
+    if not decompressor.is_finished():
+        raise brotli.error("truncated brotli stream")
+    return bytes(output)
+
+
+def _unzstd(data: bytes, limit: int) -> bytes:
+    size = 0
+    with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as stream:
+        while chunk := stream.read(ZSTD_READ_SIZE):
+            size += len(chunk)
+            if size > limit:
+                raise RequestDecodingError("decoded request body is too large", 413)
+    # the reader stops quietly where the input ends; only a complete frame is a whole body,
+    # and it is known to fit in ``limit`` by now
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    decoded = decompressor.decompress(data)
+    if not decompressor.eof:
+        raise zstandard.ZstdError("truncated zstd frame")
+    return decoded
+
+
+def available_codecs() -> dict[str, Codec]:
+    """Return supported codecs keyed by content-coding, in server preference order."""
+    codecs: dict[str, Codec] = {}
+    if zstandard is not None:
+        codecs["zstd"] = Codec("zstd", _ZstdCompressor, _unzstd)
+    if brotli is not None:
+        codecs["br"] = Codec("br", _BrotliCompressor, _unbrotli)
+    codecs["gzip"] = Codec("gzip", _GzipCompressor, _gunzip)
+    return codecs
+
+
+def _weights(header: str) -> dict[str, float]:
+    """Map each token or media range of an ``Accept*`` header to its ``q`` value."""
+    weights: dict[str, float] = {}
+    for part in header.split(","):
+        token, *params = part.split(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[token] = quality
+    return weights
+
+
+def negotiate_encoding(accept_encoding: str, codecs: dict[str, Codec]) -> Codec | None:
+    """Pick the best codec for an ``Accept-Encoding`` header, preferring the server order on ties."""
+    weights = _weights(accept_encoding)
+    best: Codec | None = None
+    best_quality = 0.0
+    for name, codec in codecs.items():
+        quality = weights.get(name, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = codec, quality
+    return best
+
+
+def wants_msgpack(accept: str) -> bool:
+    """Whether an ``Accept`` header names MessagePack at least as strongly as JSON.
+
+    Wildcards count for JSON only: MessagePack is sent to clients that ask for it.
+    """
+    if msgpack is None:
+        return False
+    weights = _weights(accept)
+    packed = max(weights.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    plain = weights.get(JSON_MEDIA_TYPE, weights.get("application/*", weights.get("*/*", 0.0)))
+    return packed > 0 and packed >= plain
+
+
+def _coded_etag(etag: str, coding: str) -> str:
+    return f'{etag[:-1]}-{coding}"' if etag.endswith('"') else etag
+
+
+class ContentEncodingMiddleware:
+    """Negotiate compression and MessagePack for requests under ``paths``."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        paths: Sequence[str] = ("/",),
+        minimum_size: int = 1024,
+        max_request_bytes: int = DEFAULT_MAX_REQUEST_BYTES,
+    ) -> None:
+        self.app = app
+        self.paths = tuple(paths)
+        self.minimum_size = minimum_size
+        self.max_request_bytes = max_request_bytes
+        self.codecs = available_codecs()
+        self._coding_suffix = re.compile("-(%s)\"" % "|".join(map(re.escape, self.codecs)))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        try:
+            scope, receive = await self._decode_request(scope, receive, headers)
+        except RequestDecodingError as error:
+            await PlainTextResponse(str(error), status_code=error.status_code)(scope, receive, send)
+            return
+
+        codec = negotiate_encoding(headers.get("accept-encoding", ""), self.codecs)
+        cached_codings = {match.group(1) for match in self._coding_suffix.finditer(headers.get("if-none-match", ""))}
+        responder = _EncodingResponder(
+            self.app,
+            codec=codec,
+            msgpack_output=wants_msgpack(headers.get("accept", "")),
+            minimum_size=self.minimum_size,
+            revalidated_coding=codec.name if codec is not None and codec.name in cached_codings else None,
+        )
+        await responder(self._strip_etag_codings(scope), receive, send)
+
+    def _strip_etag_codings(self, scope: Scope) -> Scope:
+        """Map coded entity tags in conditional headers back to the tags the routers issue."""
+        rewritten = MutableHeaders(scope={"type": "http", "headers": list(scope["headers"])})
+        changed = False
+        for name in ("if-none-match", "if-match"):
+            if name in rewritten:
+                value = self._coding_suffix.sub('"', rewritten[name])
+                changed = changed or value != rewritten[name]
+                rewritten[name] = value
+        return {**scope, "headers": rewritten.raw} if changed else scope
+
+    async def _decode_request(self, scope: Scope, receive: Receive, headers: Headers) -> tuple[Scope, Receive]:
+        coding = headers.get("content-encoding", "identity").strip().lower()
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        is_msgpack = content_type in MSGPACK_MEDIA_TYPES
+        if coding == "identity" and not is_msgpack:
+            return scope, receive
+
+        if coding != "identity" and coding not in self.codecs:
+            raise RequestDecodingError(f"unsupported content encoding: {coding}", 415)
+        if is_msgpack and msgpack is None:
+            raise RequestDecodingError("MessagePack request bodies are not supported", 415)
+
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            body.extend(message.get("body", b""))
+            more_body = message.get("more_body", False)
+            if len(body) > self.max_request_bytes:
+                raise RequestDecodingError("request body is too large", 413)
+
+        data = bytes(body)
+        try:
+            if coding != "identity":
+                data = self.codecs[coding].decompress(data, self.max_request_bytes)
+            if is_msgpack:
+                data = json.dumps(msgpack.unpackb(data, raw=False), separators=(",", ":")).encode("utf-8")
+        except RequestDecodingError:
+            raise
+        except Exception as exc:  # codec libraries raise their own error types
+            raise RequestDecodingError(f"could not decode request body: {exc}", 400) from exc
+
+        rewritten = MutableHeaders(scope={"type": "http", "headers": list(scope["headers"])})
+        del rewritten["content-encoding"]
+        rewritten["content-length"] = str(len(data))
+        if is_msgpack:
+            rewritten["content-type"] = JSON_MEDIA_TYPE
+        scope = {**scope, "headers": rewritten.raw}
+
+        delivered = False
+
+        async def replay() -> Message:
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": data, "more_body": False}
+            return await receive()
+
+        return scope, replay
+
+
+class _EncodingResponder:
+    def __init__(
+        self,
+        app: ASGIApp,
+        codec: Codec | None,
+        msgpack_output: bool,
+        minimum_size: int,
+        revalidated_coding: str | None = None,
+    ) -> None:
+        self.app = app
+        self.codec = codec
+        self.msgpack_output = msgpack_output
+        self.minimum_size = minimum_size
+        # a 304 has no body to compress, so it echoes the coded tag the client revalidated
+        self.revalidated_coding = revalidated_coding
+        self.send: Send | None = None
+        self.start: Message | None = None
+        self.compressor: StreamCompressor | None = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self._send)
+
+    async def _send(self, message: Message) -> None:
+        assert self.send is not None
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.start is not None:
+            await self._first_body(message)
+            return
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        assert self.compressor is not None
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _first_body(self, message: Message) -> None:
+        assert self.send is not None and self.start is not None
+        start, self.start = self.start, None
+        headers = MutableHeaders(raw=list(start.get("headers", [])))
+        headers.add_vary_header("Accept-Encoding")
+        headers.add_vary_header("Accept")
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+
+        if not more_body and self.msgpack_output and media_type == JSON_MEDIA_TYPE and body:
+            body = msgpack.packb(json.loads(body), use_bin_type=True)
+            headers["content-type"] = MSGPACK_MEDIA_TYPES[0]
+            headers["content-length"] = str(len(body))
+            media_type = MSGPACK_MEDIA_TYPES[0]
+
+        compress = (
+            self.codec is not None
+            and "content-encoding" not in headers
+            and media_type.startswith(COMPRESSIBLE_MEDIA_TYPES)
+            and (more_body or len(body) >= self.minimum_size)
+        )
+        if not compress:
+            if start["status"] == 304 and self.revalidated_coding and "etag" in headers:
+                headers["etag"] = _coded_etag(headers["etag"], self.revalidated_coding)
+            self.passthrough = True
+            await self.send({**start, "headers": headers.raw})
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        assert self.codec is not None
+        self.compressor = self.codec.compressor()
+        headers["content-encoding"] = self.codec.name
+        if "etag" in headers:
+            headers["etag"] = _coded_etag(headers["etag"], self.codec.name)
+        chunk = self.compressor.compress(body)
+        if more_body:
+            del headers["content-length"]
+        else:
+            chunk += self.compressor.finish()
+            headers["content-length"] = str(len(chunk))
+        await self.send({**start, "headers": headers.raw})
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+__all__ = [
+    "Codec",
+    "ContentEncodingMiddleware",
+    "available_codecs",
+    "negotiate_encoding",
+    "wants_msgpack",
+]
@@ -0,0 +1,307 @@
+"""In-memory adjacency index over ``thought_links`` for whole-graph analytics.
+
+Thought ids are mapped to dense integer slots and outgoing links are held in
+CSR form: ``indices[indptr[v]:indptr[v + 1]]`` lists the targets of slot ``v``
+as ``int32``, so the adjacency costs 4 bytes per link and 8 per thought. The
+index is loaded once at startup and then follows the change feed
+(:mod:`enso_api.repositories.change_feed`): every committed write replaces the
+outgoing row of each thought it touched, which covers link, unlink, updates
+through ``_replace_links``, deletes (whose incoming links are dropped from
+their sources) and purges. Replaced rows wait in an overlay until enough pile
+up or an algorithm needs the whole graph, then the arrays are rebuilt in one
+vectorized pass.
+
+Connected components, orphans and hub ranking are NumPy array operations over
+the edge list. Deleted thoughts keep their slot but drop out of every result,
+together with their links.
+
+numpy is optional (the ``graph`` extra); without it the index is not built
+and the ``/graph`` endpoints answer 503.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from array import array
+from typing import Literal, Mapping
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .domain.graph import GraphComponent, GraphComponents, GraphHub, GraphIndexStats, GraphOrphans
+from .domain.thought import ThoughtRead
+from .models import Thought, ThoughtLink
+
+try:  # pragma: no cover - optional dependency
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+HubRanking = Literal["pagerank", "degree"]
+
+# replaced adjacency rows held in the overlay before the CSR arrays are rebuilt
+COMPACT_THRESHOLD = 4096
+LOAD_BATCH_SIZE = 10_000
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-6
+PAGERANK_MAX_ITERATIONS = 100
+
+
+class LinkGraphIndex:
+    """Thread-safe CSR adjacency of thought links, kept current by committed writes."""
+
+    def __init__(self) -> None:
+        if np is None:
+            raise RuntimeError("the link graph index requires numpy (install enso-backend[graph])")
+        self.compactions = 0
+        self._lock = threading.Lock()
+        self._ids: list[str] = []
+        self._slots: dict[str, int] = {}
+        self._id_bytes = 0
+        # grown by doubling; only the first len(self._ids) entries are meaningful
+        self._live = np.zeros(0, dtype=bool)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._pending: dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def load(self, session: Session) -> None:
+        """Replace the contents of the index with the thoughts and links currently stored."""
+        ids: list[str] = []
+        slots: dict[str, int] = {}
+        id_bytes = 0
+        live = array("b")
+        thoughts = select(Thought.id, Thought.deleted_at.is_(None)).execution_options(yield_per=LOAD_BATCH_SIZE)
+        for partition in session.execute(thoughts).partitions():
+            for thought_id, alive in partition:
+                slots[thought_id] = len(ids)
+                ids.append(thought_id)
+                id_bytes += sys.getsizeof(thought_id)
+                live.append(bool(alive))
+
+        sources, targets = array("i"), array("i")
+        links = select(ThoughtLink.source_id, ThoughtLink.target_id).execution_options(yield_per=LOAD_BATCH_SIZE)
+        for partition in session.execute(links).partitions():
+            for source_id, target_id in partition:
+                source, target = slots.get(source_id), slots.get(target_id)
+                if source is not None and target is not None:
+                    sources.append(source)
+                    targets.append(target)
+
+        indptr, indices = _assemble(
+            len(ids), np.frombuffer(sources, dtype=np.int32), np.frombuffer(targets, dtype=np.int32)
+        )
+        with self._lock:
+            self._ids, self._slots, self._id_bytes = ids, slots, id_bytes
+            self._live = np.frombuffer(live, dtype=np.int8).astype(bool)
+            self._indptr, self._indices = indptr, indices
+            self._pending.clear()
+
+    def apply(self, changes: Mapping[str, ThoughtRead | None]) -> None:
+        """Change feed subscriber: replace the outgoing links of every committed thought."""
+        with self._lock:
+            for thought_id, record in changes.items():
+                slot = self._slots.get(thought_id)
+                if record is None:
+                    # purged; sources that linked to it arrive in the same delivery
+                    if slot is not None:
+                        self._live[slot] = False
+                        self._pending[slot] = np.zeros(0, dtype=np.int32)
+                    continue
+                slot = self._slot(thought_id)
+                self._live[slot] = record.deleted_at is None
+                self._pending[slot] = np.array([self._slot(target_id) for target_id in record.links], dtype=np.int32)
+            if len(self._pending) >= COMPACT_THRESHOLD:
+                self._compact()
+
+    def successors(self, thought_id: str) -> list[str]:
+        """Stored link targets of ``thought_id``, deleted thoughts included."""
+        with self._lock:
+            slot = self._slots.get(thought_id)
+            if slot is None:
+                return []
+            row = self._pending.get(slot)
+            if row is None:
+                row = self._indices[self._indptr[slot] : self._indptr[slot + 1]] if slot < len(self._indptr) - 1 else ()
+            return sorted(self._ids[target] for target in row)
+
+    # ------------------------------------------------------------------
+    # Analytics
+    # ------------------------------------------------------------------
+    def components(self, limit: int = 20, max_members: int = 100) -> GraphComponents:
+        """Weakly connected components of live thoughts, largest first.
+
+        Labels start as slot numbers and repeatedly take the smallest label
+        across each link, with pointer jumping, until no link joins two labels.
+        """
+        live, sources, targets, ids = self._edge_list()
+        labels = np.arange(len(live), dtype=np.int64)
+        while True:
+            lowest = labels.copy()
+            np.minimum.at(lowest, sources, labels[targets])
+            np.minimum.at(lowest, targets, labels[sources])
+            lowest = lowest[lowest]
+            if np.array_equal(lowest, labels):
+                break
+            labels = lowest
+
+        members = np.flatnonzero(live)
+        _, grouping, sizes = np.unique(labels[members], return_inverse=True, return_counts=True)
+        by_component = members[np.argsort(grouping, kind="stable")]
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        largest = np.argsort(-sizes, kind="stable")[:limit]
+        components = []
+        for component in largest:
+            start = offsets[component]
+            shown = by_component[start : start + min(max_members, sizes[component])]
+            components.append(
+                GraphComponent.model_construct(size=int(sizes[component]), thought_ids=[ids[slot] for slot in shown])
+            )
+        return GraphComponents.model_construct(total=len(sizes), components=components)
+
+    def orphans(self, limit: int = 100) -> GraphOrphans:
+        """Live thoughts with no link to or from another live thought."""
+        live, sources, targets, ids = self._edge_list()
+        size = len(live)
+        degree = np.bincount(sources, minlength=size) + np.bincount(targets, minlength=size)
+        found = np.flatnonzero(live & (degree == 0))
+        return GraphOrphans.model_construct(total=len(found), thought_ids=[ids[slot] for slot in found[:limit]])
+
+    def hubs(self, limit: int = 20, ranking: HubRanking = "pagerank") -> list[GraphHub]:
+        """The ``limit`` most central live thoughts by PageRank or by total degree."""
+        live, sources, targets, ids = self._edge_list()
+        size = len(live)
+        out_degree = np.bincount(sources, minlength=size)
+        in_degree = np.bincount(targets, minlength=size)
+        if ranking == "degree":
+            scores = (in_degree + out_degree).astype(np.float64)
+        else:
+            scores = _pagerank(live, sources, targets, out_degree)
+
+        candidates = np.flatnonzero(live)
+        if limit < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        ranked = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [
+            GraphHub.model_construct(
+                id=ids[slot],
+                score=float(scores[slot]),
+                in_degree=int(in_degree[slot]),
+                out_degree=int(out_degree[slot]),
+            )
+            for slot in ranked
+        ]
+
+    def stats(self) -> GraphIndexStats:
+        with self._lock:
+            size = len(self._ids)
+            base_rows = len(self._indptr) - 1
+            edges = int(self._indptr[-1])
+            pending_bytes = 0
+            for slot, row in self._pending.items():
+                if slot < base_rows:
+                    edges -= int(self._indptr[slot + 1] - self._indptr[slot])
+                edges += len(row)
+                pending_bytes += row.nbytes
+            adjacency_bytes = self._indptr.nbytes + self._indices.nbytes + self._live.nbytes + pending_bytes
+            id_map_bytes = self._id_bytes + sys.getsizeof(self._ids) + sys.getsizeof(self._slots)
+            return GraphIndexStats.model_construct(
+                nodes=size,
+                live_nodes=int(np.count_nonzero(self._live[:size])),
+                edges=edges,
+                pending_nodes=len(self._pending),
+                compactions=self.compactions,
+                adjacency_bytes=adjacency_bytes,
+                id_map_bytes=id_map_bytes,
+                bytes_per_million_edges=(adjacency_bytes + id_map_bytes) * 1_000_000 / edges if edges else None,
+            )
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _slot(self, thought_id: str) -> int:
+        slot = self._slots.get(thought_id)
+        if slot is not None:
+            return slot
+        slot = len(self._ids)
+        self._ids.append(thought_id)
+        self._slots[thought_id] = slot
+        self._id_bytes += sys.getsizeof(thought_id)
+        if slot >= len(self._live):
+            grown = np.zeros(max(16, 2 * len(self._live)), dtype=bool)
+            grown[: len(self._live)] = self._live
+            self._live = grown
+        # not live until its own record arrives
+        self._live[slot] = False
+        return slot
+
+    def _compact(self) -> None:
+        """Fold the overlay into fresh CSR arrays; the caller holds the lock."""
+        size = len(self._ids)
+        sources = np.repeat(np.arange(len(self._indptr) - 1, dtype=np.int32), np.diff(self._indptr))
+        targets = self._indices
+        if self._pending:
+            replaced = np.fromiter(self._pending, dtype=np.int32, count=len(self._pending))
+            rows = list(self._pending.values())
+            stale = np.zeros(size, dtype=bool)
+            stale[replaced] = True
+            keep = ~stale[sources]
+            lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+            sources = np.concatenate((sources[keep], np.repeat(replaced, lengths)))
+            targets = np.concatenate((targets[keep], *rows))
+        self._indptr, self._indices = _assemble(size, sources, targets)
+        self._pending.clear()
+        self.compactions += 1
+
+    def _edge_list(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+        """Liveness per slot plus (sources, targets) of links between live thoughts.
+
+        Compaction swaps in new arrays instead of mutating them, so the
+        algorithms run on these references without holding the lock.
+        """
+        with self._lock:
+            if self._pending or len(self._indptr) - 1 < len(self._ids):
+                self._compact()
+            live = self._live[: len(self._ids)].copy()
+            indptr, indices, ids = self._indptr, self._indices, self._ids
+        sources = np.repeat(np.arange(len(live), dtype=np.int32), np.diff(indptr))
+        between_live = live[sources] & live[indices]
+        return live, sources[between_live], indices[between_live], ids
+
+
+def _assemble(size: int, sources: np.ndarray, targets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """CSR ``(indptr, indices)`` for ``size`` slots from parallel source/target arrays."""
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=size), out=indptr[1:])
+    return indptr, targets[np.argsort(sources, kind="stable")].astype(np.int32, copy=False)
+
+
+def _pagerank(live: np.ndarray, sources: np.ndarray, targets: np.ndarray, out_degree: np.ndarray) -> np.ndarray:
+    count = int(np.count_nonzero(live))
+    if count == 0:
+        return np.zeros(len(live))
+    teleport = live / count
+    rank = teleport.copy()
+    share = 1.0 / out_degree[sources]
+    dangling = live & (out_degree == 0)
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        spread = np.bincount(targets, weights=rank[sources] * share, minlength=len(live))
+        following = (1 - PAGERANK_DAMPING) * teleport + PAGERANK_DAMPING * (spread + rank[dangling].sum() * teleport)
+        converged = np.abs(following - rank).sum() < PAGERANK_TOLERANCE
+        rank = following
+        if converged:
+            break
+    return rank
+
+
+def graph_index_available() -> bool:
+    return np is not None
+
+
+__all__ = ["HubRanking", "LinkGraphIndex", "graph_index_available"]
@@ -2,20 +2,159 @@
 
 from __future__ import annotations
 
-from contextlib import asynccontextmanager
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+from dataclasses import asdict
+from typing import Callable, Mapping, Protocol
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from .completion import CompletionIndex
 from .config import get_settings
-from .database import Base, engine
-from .routers import thoughts, sync, ai
+from .database import Base, async_engine, engine, is_sqlite_memory_url, session_scope, sqlite_maintenance_loop
+from .domain.thought import ThoughtRead
+from .encoding import ContentEncodingMiddleware
+from .graph import LinkGraphIndex, graph_index_available
+from .repositories import change_feed
+from .repositories.thought_cache import get_thought_cache
+from .repositories.thoughts import ThoughtRepository
+from .routers import thoughts, sync, ai, graph
+from .search import ensure_search_index
+from .services.ai import build_model_client
+from .services.ai_batcher import ModelBatcher, build_model_batcher
+from .services.ai_cache import AIResponseCache, build_response_cache
+from .services.ai_router import ModelRouter, build_model_router
+from .services.semantic import SemanticSearch, build_semantic_search
+from .tags import TagIndex
+from .write_queue import GroupCommitWriter
+
+logger = logging.getLogger(__name__)
+
+
+def _prepare_database() -> None:
+    """Catch databases created with ``create_all`` by an older release up with the current schema."""
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        if ensure_search_index(session.connection()):
+            indexed = repo.rebuild_search_index()
+            logger.info("Created the full-text index and indexed %d existing thoughts", indexed)
+        logged = repo.backfill_change_log()
+        if logged:
+            logger.info("Added %d existing thoughts to the change log", logged)
+
+
+class _DerivedIndex(Protocol):
+    def load(self, session: Session) -> None: ...
+
+    def apply(self, changes: Mapping[str, ThoughtRead | None]) -> None: ...
+
+
+def _build_graph_index() -> LinkGraphIndex | None:
+    if not settings.graph_index:
+        return None
+    if not graph_index_available():
+        logger.warning("GRAPH_INDEX is enabled but numpy is not installed; /graph endpoints are unavailable")
+        return None
+    return LinkGraphIndex()
+
+
+async def _start_index(app: FastAPI, attr: str, factory: Callable[[], _DerivedIndex | None]) -> None:
+    """Build an index from the thought tables, keep it current and store it as ``app.state.<attr>``."""
+    index = factory()
+    setattr(app.state, attr, index)
+    if index is None:
+        return
+    # subscribe first: writes committed while loading are replayed on top of it
+    change_feed.subscribe(index.apply)
+
+    def load() -> None:
+        with session_scope() as session:
+            index.load(session)
+
+    await run_in_threadpool(load)
+
+
+def _stop_index(app: FastAPI, attr: str) -> None:
+    index: _DerivedIndex | None = getattr(app.state, attr)
+    if index is not None:
+        change_feed.unsubscribe(index.apply)
+        setattr(app.state, attr, None)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
+    _prepare_database()
+    maintenance: asyncio.Task | None = None
+    interval = settings.sqlite_maintenance_interval_seconds
+    if engine.dialect.name == "sqlite" and not is_sqlite_memory_url(settings.database_url) and interval > 0:
+        maintenance = asyncio.create_task(sqlite_maintenance_loop(interval))
+    writer: GroupCommitWriter | None = None
+    if settings.write_coalescing:
+        writer = GroupCommitWriter(
+            window_seconds=settings.write_coalescing_window_ms / 1000,
+            max_batch=settings.write_coalescing_max_batch,
+        )
+        await writer.start()
+    app.state.write_queue = writer
+    # marked before any index loads: later commits by other processes are replayed on top
+    follower = change_feed.ChangeLogFollower(engine)
+    await run_in_threadpool(follower.mark)
+    await _start_index(app, "graph_index", _build_graph_index)
+    await _start_index(app, "tag_index", lambda: TagIndex() if settings.tag_index else None)
+    await _start_index(app, "completion_index", lambda: CompletionIndex() if settings.completion_index else None)
+    # AI_MODE=auto: the router owns a client and batcher per backend
+    app.state.ai_router = build_model_router(settings)
+    app.state.ai_client = build_model_client(settings) if app.state.ai_router is None else None
+    app.state.ai_cache = build_response_cache(settings)
+    app.state.ai_batcher = build_model_batcher(settings, app.state.ai_client)
+    if app.state.ai_batcher is not None:
+        await app.state.ai_batcher.start()
+    if app.state.ai_router is not None:
+        await app.state.ai_router.start()
+    await _start_index(app, "semantic_search", lambda: build_semantic_search(settings))
+    semantic: SemanticSearch | None = app.state.semantic_search
+    if semantic is not None:
+        await semantic.start()
+    refresh: asyncio.Task | None = None
+    if settings.index_refresh_interval_seconds > 0:
+        refresh = asyncio.create_task(change_feed.follow_change_log(follower, settings.index_refresh_interval_seconds))
     yield
+    if refresh is not None:
+        refresh.cancel()
+        with suppress(asyncio.CancelledError):
+            await refresh
+    _stop_index(app, "semantic_search")
+    if semantic is not None:
+        await semantic.stop()
+    if app.state.ai_router is not None:
+        await app.state.ai_router.aclose()
+        app.state.ai_router = None
+    if app.state.ai_batcher is not None:
+        await app.state.ai_batcher.stop()
+        app.state.ai_batcher = None
+    if app.state.ai_cache is not None:
+        app.state.ai_cache.close()
+        app.state.ai_cache = None
+    if app.state.ai_client is not None:
+        await app.state.ai_client.aclose()
+        app.state.ai_client = None
+    _stop_index(app, "completion_index")
+    _stop_index(app, "tag_index")
+    _stop_index(app, "graph_index")
+    if writer is not None:
+        await writer.stop()
+        app.state.write_queue = None
+    if maintenance is not None:
+        maintenance.cancel()
+        with suppress(asyncio.CancelledError):
+            await maintenance
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 settings = get_settings()
@@ -30,12 +169,18 @@ cors_origins = [
 if settings.api_debug:
     cors_origins.append("*")
 
+app.add_middleware(
+    ContentEncodingMiddleware,
+    paths=(thoughts.router.prefix, sync.router.prefix, graph.router.prefix),
+    minimum_size=settings.compression_min_size,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[thoughts.NEXT_CURSOR_HEADER, "ETag"],
 )
 
 
@@ -44,6 +189,30 @@ def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/stats", tags=["system"])
+def runtime_stats() -> dict[str, object]:
+    writer: GroupCommitWriter | None = getattr(app.state, "write_queue", None)
+    graph_index: LinkGraphIndex | None = getattr(app.state, "graph_index", None)
+    tag_index: TagIndex | None = getattr(app.state, "tag_index", None)
+    completion_index: CompletionIndex | None = getattr(app.state, "completion_index", None)
+    ai_cache: AIResponseCache | None = getattr(app.state, "ai_cache", None)
+    ai_batcher: ModelBatcher | None = getattr(app.state, "ai_batcher", None)
+    ai_router: ModelRouter | None = getattr(app.state, "ai_router", None)
+    semantic: SemanticSearch | None = getattr(app.state, "semantic_search", None)
+    return {
+        "thought_cache": get_thought_cache().snapshot(),
+        "write_queue": asdict(writer.stats) if writer is not None else None,
+        "graph_index": graph_index.stats().model_dump() if graph_index is not None else None,
+        "tag_index": tag_index.stats().model_dump() if tag_index is not None else None,
+        "completion_index": completion_index.stats().model_dump() if completion_index is not None else None,
+        "ai_cache": ai_cache.snapshot() if ai_cache is not None else None,
+        "ai_batcher": ai_batcher.snapshot() if ai_batcher is not None else None,
+        "ai_router": ai_router.snapshot() if ai_router is not None else None,
+        "vector_index": semantic.index.stats().model_dump() if semantic is not None else None,
+    }
+
+
 app.include_router(thoughts.router)
 app.include_router(sync.router)
 app.include_router(ai.router)
+app.include_router(graph.router)
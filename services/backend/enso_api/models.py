@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -37,7 +37,11 @@ class Thought(Base):
 
 class ThoughtTag(Base):
     __tablename__ = "thought_tags"
-    __table_args__ = (UniqueConstraint("thought_id", "tag", name="uq_thought_tags"),)
+    __table_args__ = (
+        UniqueConstraint("thought_id", "tag", name="uq_thought_tags"),
+        # serves tag filters and facet counts without touching the table
+        Index("ix_thought_tags_tag", "tag", "thought_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     thought_id: Mapped[str] = mapped_column(ForeignKey("thoughts.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -65,3 +69,18 @@ class ThoughtLink(Base):
         back_populates="incoming_links",
     )
 
+
+class ThoughtChange(Base):
+    """Latest server-assigned change sequence per thought; drives the sync cursor."""
+
+    __tablename__ = "thought_changes"
+    # AUTOINCREMENT keeps SQLite from reusing the sequence of deleted rows
+    __table_args__ = (
+        UniqueConstraint("thought_id", name="uq_thought_changes_thought_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    thought_id: Mapped[str] = mapped_column(ForeignKey("thoughts.id", ondelete="CASCADE"), nullable=False)
+    # sync client that produced the change; NULL for API and server-side writes
+    client_id: Mapped[str | None] = mapped_column(String(128), nullable=True)
@@ -0,0 +1,180 @@
+"""Committed thought writes, delivered to in-process indexes.
+
+Indexes derived from the thought tables subscribe here instead of hooking
+every repository method. Once the outermost transaction of a session commits,
+the ids it wrote (everything that went through ``mark_written``) are read back
+on a fresh session and passed to each subscriber as ``{id: ThoughtRead}``,
+with ``None`` for thoughts that no longer exist. Reading committed rows rather
+than replaying the session's own edits keeps writes undone by a rolled back
+savepoint out of the indexes.
+
+Reads run outside the lock, so two commits touching the same thought can
+finish loading in either order. Each delivery takes a ticket after its commit
+and a thought is only passed on from a later ticket than the last one
+delivered for it; a later ticket's read started after every earlier commit,
+so the copy it skips is never the newer one. Subscribers are called under the
+feed lock and must not do I/O.
+
+Commits made by other processes (other workers, ``enso-admin import``) never
+fire this process's session events. :class:`ChangeLogFollower` picks them up
+from ``thought_changes``: it remembers the highest sequence it has seen and
+periodically publishes every thought logged past it. Writes made here are
+delivered a second time that way, which subscribers treat as a no-op. A purge
+removes the thought's change row, so purges by another process are only seen
+on the next load.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import threading
+from typing import Callable, Collection, Mapping
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, SessionTransaction
+from starlette.concurrency import run_in_threadpool
+
+from ..domain.thought import ThoughtRead
+from .thought_cache import DIRTY_IDS_KEY
+from .thoughts import ThoughtRepository
+
+logger = logging.getLogger(__name__)
+
+COMMITTED_IDS_KEY = "change_feed_committed_ids"
+# delivered tickets are remembered per thought; trimmed past this many entries
+PRUNE_THRESHOLD = 4096
+# change-log rows read per query by ChangeLogFollower.poll
+FOLLOW_BATCH_SIZE = 500
+
+Subscriber = Callable[[Mapping[str, ThoughtRead | None]], None]
+
+_subscribers: list[Subscriber] = []
+_lock = threading.Lock()
+_tickets = itertools.count(1)
+_in_flight: set[int] = set()
+_delivered: dict[str, int] = {}
+
+
+def subscribe(subscriber: Subscriber) -> None:
+    with _lock:
+        _subscribers.append(subscriber)
+
+
+def unsubscribe(subscriber: Subscriber) -> None:
+    with _lock:
+        if subscriber in _subscribers:
+            _subscribers.remove(subscriber)
+
+
+def publish(bind: Engine | Connection, thought_ids: Collection[str]) -> bool:
+    """Read ``thought_ids`` back through ``bind`` and deliver them to every subscriber.
+
+    Returns ``False`` when the thoughts could not be read.
+    """
+    if not _subscribers or not thought_ids:
+        return True
+    with _lock:
+        ticket = next(_tickets)
+        _in_flight.add(ticket)
+    try:
+        with Session(bind=bind) as session:
+            found = {record.id: record for record in ThoughtRepository(session).get_many(thought_ids)}
+    except Exception:
+        with _lock:
+            _in_flight.discard(ticket)
+        logger.exception("Could not load %d committed thoughts; derived indexes are stale", len(thought_ids))
+        return False
+
+    with _lock:
+        _in_flight.discard(ticket)
+        fresh: dict[str, ThoughtRead | None] = {}
+        for thought_id in thought_ids:
+            if _delivered.get(thought_id, 0) < ticket:
+                _delivered[thought_id] = ticket
+                fresh[thought_id] = found.get(thought_id)
+        if len(_delivered) > PRUNE_THRESHOLD:
+            _prune()
+        if not fresh:
+            return True
+        for subscriber in list(_subscribers):
+            try:
+                subscriber(fresh)
+            except Exception:
+                logger.exception("Change feed subscriber %r failed", subscriber)
+    return True
+
+
+def _prune() -> None:
+    # every delivery still to come holds a ticket at or above the floor
+    floor = min(_in_flight, default=next(_tickets))
+    for thought_id in [thought_id for thought_id, ticket in _delivered.items() if ticket < floor]:
+        del _delivered[thought_id]
+
+
+class ChangeLogFollower:
+    """Publish thoughts logged in ``thought_changes`` past the highest sequence seen so far.
+
+    Call :meth:`mark` before the subscribed indexes load, so every change
+    committed after their snapshot is published again on top of it.
+    Sequences become visible in commit order (see
+    ``ThoughtRepository._lock_change_log``), so nothing lands behind the mark.
+    """
+
+    def __init__(self, bind: Engine, batch_size: int = FOLLOW_BATCH_SIZE) -> None:
+        self.bind = bind
+        self.batch_size = batch_size
+        self.seq = 0
+
+    def mark(self) -> None:
+        with Session(bind=self.bind) as session:
+            self.seq = ThoughtRepository(session).collection_version()[0]
+
+    def poll(self) -> int:
+        """Publish every thought logged since the last poll and return how many were published."""
+        published = 0
+        while True:
+            with Session(bind=self.bind) as session:
+                rows = ThoughtRepository(session).change_log_after(self.seq, self.batch_size)
+            if not rows or not publish(self.bind, [thought_id for _, thought_id in rows]):
+                return published
+            self.seq = rows[-1][0]
+            published += len(rows)
+            if len(rows) < self.batch_size:
+                return published
+
+
+async def follow_change_log(follower: ChangeLogFollower, interval_seconds: float) -> None:
+    """Run :meth:`ChangeLogFollower.poll` every ``interval_seconds`` until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(follower.poll)
+        except SQLAlchemyError:
+            logger.exception("Could not read the change log; derived indexes may be stale")
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_committed(session: Session) -> None:
+    # savepoint releases fire this too; only the outermost commit is durable
+    if session.get_nested_transaction() is not None or not _subscribers:
+        return
+    written = session.info.get(DIRTY_IDS_KEY)
+    if written:
+        session.info[COMMITTED_IDS_KEY] = list(written)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _publish_committed(session: Session, transaction: SessionTransaction) -> None:
+    # by now the session has handed its connection back, so reading on a new one cannot starve the pool
+    if transaction.parent is not None:
+        return
+    committed = session.info.pop(COMMITTED_IDS_KEY, None)
+    if committed:
+        publish(session.get_bind(), committed)
+
+
+__all__ = ["ChangeLogFollower", "Subscriber", "follow_change_log", "publish", "subscribe", "unsubscribe"]
@@ -0,0 +1,62 @@
+"""Process-wide cache of hydrated thoughts in front of ``ThoughtRepository.get``.
+
+Writes invalidate twice: when the repository records the change, so no other
+request reads the old copy from the cache while the write is in flight, and
+again when the outermost transaction ends, so a copy loaded from the database
+before the commit cannot outlive it. Ids written by a session are tracked in
+``session.info``; that session bypasses the cache for them until its
+transaction ends, which keeps uncommitted (and possibly rolled back) state
+out of the cache entirely.
+
+The cache is per process. With several workers, another worker's writes are
+only picked up once entries expire, which is what the TTL bounds.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+from ..cache import LRUCache
+from ..config import get_settings
+from ..domain.thought import ThoughtRead
+from ..models import Thought
+
+DIRTY_IDS_KEY = "thought_cache_dirty_ids"
+
+
+@lru_cache(maxsize=1)
+def get_thought_cache() -> LRUCache[str, ThoughtRead]:
+    settings = get_settings()
+    return LRUCache(settings.thought_cache_size, settings.thought_cache_ttl_seconds)
+
+
+def mark_written(session: Session, thought_ids: Iterable[str]) -> None:
+    ids = list(thought_ids)
+    session.info.setdefault(DIRTY_IDS_KEY, set()).update(ids)
+    get_thought_cache().invalidate(ids)
+
+
+def written_in(session: Session, thought_id: str) -> bool:
+    return thought_id in session.info.get(DIRTY_IDS_KEY, ())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _invalidate_after_transaction(session: Session, transaction: SessionTransaction) -> None:
+    # savepoints end too; only the outermost transaction decides what is committed
+    if transaction.parent is not None:
+        return
+    written = session.info.pop(DIRTY_IDS_KEY, None)
+    if written:
+        get_thought_cache().invalidate(written)
+
+
+@event.listens_for(Thought.__table__, "after_drop")
+def _clear_after_drop(target, connection, **kw) -> None:  # noqa: ANN001
+    get_thought_cache().clear()
+
+
+__all__ = ["get_thought_cache", "mark_written", "written_in"]
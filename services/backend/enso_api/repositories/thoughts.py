@@ -2,68 +2,230 @@
 
 from __future__ import annotations
 
+from collections import defaultdict
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Iterable, Optional
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Callable, Collection, Iterable, Iterator, Literal, Optional, Sequence, TypeVar
 
-from sqlalchemy import func, or_, select
+from sqlalchemy import ColumnElement, Select, Table, and_, case, delete, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from ..cache import LRUCache
+from ..domain.tags import TagFilter
 from ..domain.thought import (
+    BatchCreate,
+    BatchDelete,
+    BatchOperation,
+    BatchOperationResult,
+    BatchUpdate,
+    GraphEdge,
+    GraphNode,
+    ThoughtBatchResponse,
     ThoughtCreate,
+    ThoughtGraph,
     ThoughtPublic,
     ThoughtRead,
+    ThoughtSearchHit,
     ThoughtUpdate,
     SyncThoughtPayload,
     apply_update,
+    diverges,
     generate_thought_id,
     reconcile_change,
     utcnow,
 )
-from ..models import Thought, ThoughtLink, ThoughtTag
+from ..models import Thought, ThoughtChange, ThoughtLink, ThoughtTag
+from ..search import SearchDocument, SearchIndex, get_search_index
+from .thought_cache import get_thought_cache, mark_written, written_in
+
+if TYPE_CHECKING:
+    from ..write_queue import GroupCommitWriter
+
+# Upper bound on bound parameters per ``IN (...)`` clause; stays well below
+# SQLite's historical 999 variable limit.
+HYDRATE_CHUNK_SIZE = 500
+
+# Postgres advisory lock held from a transaction's first change-log insert to
+# its commit, so sequence numbers become visible in the order they were handed out.
+CHANGE_LOG_LOCK_KEY = 0x656E736F
+
+
+T = TypeVar("T")
+
+GraphDirection = Literal["out", "in", "both"]
+
+
+def _chunked(values: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+@dataclass(slots=True)
+class ChangePage:
+    changes: list[ThoughtRead]
+    cursor: int
+    has_more: bool
+
+
+class StaleVersionError(Exception):
+    """Raised when a conditional write names a version that is no longer current."""
+
+    def __init__(self, thought_id: str, current: int | None):
+        super().__init__(f"Thought {thought_id} has changed (current version {current})")
+        self.thought_id = thought_id
+        self.current = current
+
+
+class _BatchOperationError(Exception):
+    """A batch operation that cannot apply; carries the status its own endpoint would answer with."""
+
+    def __init__(self, status: HTTPStatus, detail: str):
+        super().__init__(detail)
+        self.status = status
 
 
 class ThoughtRepository:
     """Persist and retrieve thought records."""
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, cache: LRUCache[str, ThoughtRead] | None = None):
         self.session = session
+        self.cache = cache if cache is not None else get_thought_cache()
 
     # ------------------------------------------------------------------
     # CRUD operations
     # ------------------------------------------------------------------
-    def list(self, include_deleted: bool = False) -> list[ThoughtRead]:
-        query = select(Thought).order_by(Thought.updated_at.desc())
+    def list(
+        self,
+        include_deleted: bool = False,
+        *,
+        limit: int | None = None,
+        after: tuple[datetime, str] | None = None,
+        tags: TagFilter | None = None,
+    ) -> list[ThoughtRead]:
+        query = select(Thought)
         if not include_deleted:
             query = query.where(Thought.deleted_at.is_(None))
+        query = self._filter_tags(query, tags)
+        query = self._paginate(query, limit=limit, after=after)
         results = self.session.scalars(query).all()
-        return [self._to_domain(row) for row in results]
+        return self._hydrate(results)
 
-    def search(self, query_text: str) -> list[ThoughtRead]:
-        normalized = query_text.strip().lower()
-        if not normalized:
-            return self.list()
+    def search(
+        self,
+        query_text: str,
+        *,
+        limit: int | None = None,
+        after: tuple[datetime, str] | None = None,
+        tags: TagFilter | None = None,
+    ) -> list[ThoughtRead]:
+        """Newest-first page of live thoughts matching every word of ``query_text`` in the full-text index.
 
-        pattern = f"%{normalized}%"
-        query = (
-            select(Thought)
-            .where(
-                Thought.deleted_at.is_(None),
-                or_(
-                    func.lower(Thought.title).like(pattern),
-                    func.lower(Thought.content).like(pattern),
-                    Thought.tags.any(ThoughtTag.tag.like(pattern)),
-                ),
-            )
-            .order_by(Thought.updated_at.desc())
-        )
+        Each word matches the start of a word in the title, content or tags
+        (``road`` finds "Roadmap", ``map`` does not), case- and accent-insensitively.
+        """
+        if not query_text.strip():
+            return self.list(limit=limit, after=after, tags=tags)
+
+        matching = self._search_index.matching_ids(query_text)
+        if matching is None:
+            return []
+
+        query = select(Thought).where(Thought.deleted_at.is_(None), Thought.id.in_(matching))
+        query = self._filter_tags(query, tags)
+        query = self._paginate(query, limit=limit, after=after)
         results = self.session.scalars(query).all()
-        return [self._to_domain(row) for row in results]
+        return self._hydrate(results)
+
+    def iter_batches(
+        self,
+        query_text: str | None = None,
+        *,
+        include_deleted: bool = False,
+        batch_size: int = HYDRATE_CHUNK_SIZE,
+        tags: TagFilter | None = None,
+    ) -> Iterator[list[ThoughtRead]]:
+        """Stream matching thoughts newest-first in hydrated batches.
+
+        Rows are fetched through a server-side cursor (``yield_per``) as plain
+        column tuples, so only one batch is held in memory at a time.
+        """
+        query = select(*self._columns())
+        if not include_deleted:
+            query = query.where(Thought.deleted_at.is_(None))
+        if query_text and query_text.strip():
+            matching = self._search_index.matching_ids(query_text)
+            if matching is None:
+                return
+            query = query.where(Thought.id.in_(matching))
+        query = self._filter_tags(query, tags)
+        query = self._paginate(query, limit=None, after=None).execution_options(yield_per=batch_size)
+
+        for partition in self.session.execute(query).partitions():
+            yield self._hydrate(partition)
+
+    def search_ranked(self, query_text: str, limit: int) -> list[ThoughtSearchHit]:
+        """Return the best matches for ``query_text`` ordered by relevance, with highlighted snippets."""
+        hits = self._search_index.search(self.session, query_text, limit)
+        if not hits:
+            return []
+
+        rows = self.session.scalars(
+            select(Thought).where(Thought.id.in_([hit.thought_id for hit in hits]), Thought.deleted_at.is_(None))
+        ).all()
+        records = {record.id: record for record in self._hydrate(rows)}
+        return [
+            ThoughtSearchHit.model_construct(**dict(records[hit.thought_id]), score=hit.score, snippet=hit.snippet)
+            for hit in hits
+            if hit.thought_id in records
+        ]
+
+    def rebuild_search_index(self, batch_size: int = HYDRATE_CHUNK_SIZE) -> int:
+        """Re-populate the full-text index from the thoughts table and return the number of indexed rows."""
+        index = self._search_index
+        index.create(self.session.connection())
+        index.clear(self.session)
+        indexed = 0
+        after: tuple[datetime, str] | None = None
+        while True:
+            batch = self.list(limit=batch_size, after=after)
+            if not batch:
+                break
+            for record in batch:
+                index.upsert(self.session, record.id, record.title, record.content, record.tags)
+            indexed += len(batch)
+            after = (batch[-1].updated_at, batch[-1].id)
+        self.session.flush()
+        return indexed
 
     def get(self, thought_id: str) -> Optional[ThoughtRead]:
-        row = self.session.get(Thought, thought_id)
-        if not row:
+        if not self._cacheable(thought_id):
+            row = self.session.get(Thought, thought_id)
+            if not row:
+                return None
+            return self._to_domain(row)
+
+        cached = self.cache.get(thought_id)
+        if cached is not None:
+            return cached
+        token = self.cache.token()
+        # read columns directly so a stale identity-map copy never reaches the cache
+        rows = self.session.execute(select(*self._columns()).where(Thought.id == thought_id)).all()
+        if not rows:
             return None
-        return self._to_domain(row)
+        record = self._hydrate(rows)[0]
+        self.cache.put(thought_id, record, token)
+        return record
+
+    def get_many(self, thought_ids: Collection[str]) -> list[ThoughtRead]:
+        """Load ``thought_ids`` from the database, deleted ones included; unknown ids are skipped."""
+        rows: list[Row] = []
+        for chunk in _chunked(list(thought_ids), HYDRATE_CHUNK_SIZE):
+            rows.extend(self.session.execute(select(*self._columns()).where(Thought.id.in_(chunk))).all())
+        return self._hydrate(rows)
 
     def create(self, draft: ThoughtCreate) -> ThoughtRead:
         thought_id = draft.id or generate_thought_id()
@@ -79,13 +241,62 @@ class ThoughtRepository:
         self.session.flush()
         self._replace_tags(entity, draft.tags)
         self._replace_links(entity, draft.links)
+        self._reindex(entity, draft.tags)
         self.session.flush()
+        self._record_changes([entity.id])
         return self._to_domain(entity)
 
-    def update(self, thought_id: str, patch: ThoughtUpdate) -> ThoughtRead:
+    def version(self, thought_id: str) -> int | None:
+        """Change sequence of the thought's latest write; moves on every mutation, links included."""
+        return self.session.scalar(select(ThoughtChange.seq).where(ThoughtChange.thought_id == thought_id))
+
+    def collection_version(self) -> tuple[int, int]:
+        """Highest change sequence and number of logged thoughts.
+
+        Every write appends a higher sequence and a purge drops a row, so the
+        pair differs for any two states of the table.
+        """
+        row = self.session.execute(select(func.max(ThoughtChange.seq), func.count())).one()
+        return row[0] or 0, row[1]
+
+    def change_log_after(self, cursor: int, limit: int) -> list[tuple[int, str]]:
+        """``(seq, thought_id)`` of up to ``limit`` change-log rows past ``cursor``, oldest first."""
+        rows = self.session.execute(
+            select(ThoughtChange.seq, ThoughtChange.thought_id)
+            .where(ThoughtChange.seq > cursor)
+            .order_by(ThoughtChange.seq.asc())
+            .limit(limit)
+        )
+        return [(seq, thought_id) for seq, thought_id in rows]
+
+    def backfill_change_log(self) -> int:
+        """Log every thought that has no change row yet, oldest first, and return how many were added.
+
+        Migration 0003 seeds the log on upgrade; databases built with
+        ``create_all`` before the log existed are caught up here at startup.
+        """
+        missing = (
+            select(Thought.id)
+            .where(~select(ThoughtChange.seq).where(ThoughtChange.thought_id == Thought.id).exists())
+            .order_by(Thought.updated_at.asc(), Thought.id.asc())
+        )
+        self._lock_change_log()
+        return self.session.execute(insert(ThoughtChange).from_select(["thought_id"], missing)).rowcount
+
+    def update(
+        self,
+        thought_id: str,
+        patch: ThoughtUpdate,
+        *,
+        expected_versions: Collection[int] | None = None,
+    ) -> ThoughtRead:
         existing = self.session.get(Thought, thought_id)
         if not existing:
             raise ValueError(f"Thought {thought_id} not found")
+        if expected_versions is not None:
+            current = self.version(thought_id)
+            if current not in expected_versions:
+                raise StaleVersionError(thought_id, current)
 
         domain_existing = self._to_domain(existing)
         next_value = apply_update(domain_existing, patch)
@@ -97,7 +308,9 @@ class ThoughtRepository:
 
         self._replace_tags(existing, next_value.tags)
         self._replace_links(existing, next_value.links)
+        self._reindex(existing, next_value.tags)
         self.session.flush()
+        self._record_changes([existing.id])
         return self._to_domain(existing)
 
     def delete(self, thought_id: str) -> None:
@@ -108,14 +321,21 @@ class ThoughtRepository:
         stamp = utcnow()
         existing.deleted_at = stamp
         existing.updated_at = stamp
-        # remove incoming links referencing this thought
+        # remove incoming links referencing this thought; their sources change too
+        sources = self.session.scalars(select(ThoughtLink.source_id).where(ThoughtLink.target_id == thought_id)).all()
         self.session.query(ThoughtLink).filter(ThoughtLink.target_id == thought_id).delete(synchronize_session=False)
+        self._search_index.remove(self.session, [thought_id])
         self.session.flush()
+        self._record_changes([thought_id, *sources])
 
     def purge(self, thought_id: str) -> None:
         existing = self.session.get(Thought, thought_id)
         if not existing:
             return
+        sources = self.session.scalars(select(ThoughtLink.source_id).where(ThoughtLink.target_id == thought_id)).all()
+        mark_written(self.session, [thought_id, *sources])
+        self._search_index.remove(self.session, [thought_id])
+        self.session.execute(delete(ThoughtChange).where(ThoughtChange.thought_id == thought_id))
         self.session.delete(existing)
         self.session.flush()
 
@@ -133,6 +353,7 @@ class ThoughtRepository:
 
         self._ensure_link(source, target_id)
         self.session.flush()
+        self._record_changes([source_id])
         return self._to_domain(source)
 
     def unlink(self, source_id: str, target_id: str) -> ThoughtRead:
@@ -145,12 +366,148 @@ class ThoughtRepository:
             ThoughtLink.target_id == target_id,
         ).delete(synchronize_session=False)
         self.session.flush()
+        self._record_changes([source_id])
         return self._to_domain(source)
 
+    # ------------------------------------------------------------------
+    # Batch operations
+    # ------------------------------------------------------------------
+    def apply_batch(self, operations: Sequence[BatchOperation], *, atomic: bool = True) -> ThoughtBatchResponse:
+        """Apply create/update/delete/link/unlink operations in order with set-based writes.
+
+        Each operation sees the effects of the ones before it and fails with
+        the status its single-thought endpoint would answer with. Every
+        referenced thought, plus the sources linking to deleted ones, is
+        prefetched with ``IN (...)`` queries; the operations run against that
+        in-memory state and the net difference is written in bulk, as for a
+        sync batch. With ``atomic`` one failure discards the whole batch,
+        otherwise failed operations are skipped and the rest are written.
+        """
+        self.session.flush()
+        referenced: set[str] = set()
+        deleted: list[str] = []
+        for operation in operations:
+            if isinstance(operation, BatchCreate):
+                referenced.update(operation.thought.links)
+                if operation.thought.id:
+                    referenced.add(operation.thought.id)
+            elif isinstance(operation, BatchUpdate):
+                referenced.add(operation.id)
+                referenced.update(operation.changes.links or ())
+            elif isinstance(operation, BatchDelete):
+                referenced.add(operation.id)
+                deleted.append(operation.id)
+            else:
+                referenced.update((operation.source, operation.target))
+        for chunk in _chunked(deleted, HYDRATE_CHUNK_SIZE):
+            referenced.update(self.session.scalars(select(ThoughtLink.source_id).where(ThoughtLink.target_id.in_(chunk))))
+        original = {record.id: record for record in self.get_many(referenced)}
+
+        state = dict(original)
+        results: list[BatchOperationResult] = []
+        for index, operation in enumerate(operations):
+            try:
+                status, record = self._apply_batch_operation(state, operation)
+            except _BatchOperationError as exc:
+                status, record, error = exc.status, None, str(exc)
+            else:
+                error = None
+            results.append(
+                BatchOperationResult.model_construct(
+                    index=index, op=operation.op, status=int(status), thought=record, error=error
+                )
+            )
+
+        failed = sum(result.error is not None for result in results)
+        if atomic and failed:
+            for result in results:
+                if result.error is None:
+                    result.status = int(HTTPStatus.FAILED_DEPENDENCY)
+                    result.thought = None
+                    result.error = "Not applied: another operation in the batch failed"
+            return ThoughtBatchResponse.model_construct(committed=False, applied=0, failed=failed, results=results)
+
+        changed = [record for thought_id, record in state.items() if record is not original.get(thought_id)]
+        if changed:
+            self._write_sync_batch(changed, original)
+            self._record_changes(record.id for record in changed)
+        return ThoughtBatchResponse.model_construct(
+            committed=True, applied=len(results) - failed, failed=failed, results=results
+        )
+
+    # ------------------------------------------------------------------
+    # Bulk loading
+    # ------------------------------------------------------------------
+    def existing_ids(self, thought_ids: Collection[str]) -> set[str]:
+        found: set[str] = set()
+        for chunk in _chunked(list(thought_ids), HYDRATE_CHUNK_SIZE):
+            found.update(self.session.scalars(select(Thought.id).where(Thought.id.in_(chunk))))
+        return found
+
+    def bulk_insert(self, records: Sequence[ThoughtRead]) -> None:
+        """Insert new thoughts with their tags and links, skipping per-row ORM work.
+
+        Rows go through ``executemany`` (``COPY`` on Postgres with psycopg 3).
+        Ids must be new and link targets must exist or be part of ``records``.
+        """
+        if not records:
+            return
+        self.session.flush()
+        self._insert_rows(
+            Thought.__table__,
+            [
+                {
+                    "id": record.id,
+                    "title": record.title,
+                    "content": record.content,
+                    "created_at": record.created_at,
+                    "updated_at": record.updated_at,
+                    "deleted_at": record.deleted_at,
+                }
+                for record in records
+            ],
+        )
+        self._insert_rows(
+            ThoughtTag.__table__,
+            [{"thought_id": record.id, "tag": tag} for record in records for tag in record.tags],
+        )
+        self._insert_rows(
+            ThoughtLink.__table__,
+            [{"source_id": record.id, "target_id": target} for record in records for target in record.links],
+        )
+        self._search_index.upsert_many(
+            self.session,
+            [
+                SearchDocument(record.id, record.title, record.content, record.tags)
+                for record in records
+                if record.deleted_at is None
+            ],
+        )
+        self._record_changes(record.id for record in records)
+
+    def bulk_link(self, pairs: Iterable[tuple[str, str]]) -> int:
+        """Add ``(source, target)`` links that are not stored yet; returns how many were added."""
+        wanted = {(source, target) for source, target in pairs if source != target}
+        sources = sorted({source for source, _ in wanted})
+        for chunk in _chunked(sources, HYDRATE_CHUNK_SIZE):
+            wanted.difference_update(
+                self.session.execute(
+                    select(ThoughtLink.source_id, ThoughtLink.target_id).where(ThoughtLink.source_id.in_(chunk))
+                ).tuples()
+            )
+        if not wanted:
+            return 0
+        self.session.flush()
+        self._insert_rows(
+            ThoughtLink.__table__, [{"source_id": source, "target_id": target} for source, target in sorted(wanted)]
+        )
+        self._record_changes(source for source, _ in sorted(wanted))
+        return len(wanted)
+
     # ------------------------------------------------------------------
     # Sync operations
     # ------------------------------------------------------------------
-    def upsert_sync_payload(self, payload: SyncThoughtPayload) -> ThoughtRead:
+    def upsert_sync_payload(self, payload: SyncThoughtPayload, client_id: str | None = None) -> ThoughtRead:
         lookup_id = payload.id or generate_thought_id()
         existing = self.session.get(Thought, lookup_id)
         domain_existing = self._to_domain(existing) if existing else None
@@ -178,21 +535,411 @@ class ThoughtRepository:
 
         self._replace_tags(entity, merged.tags)
         self._replace_links(entity, merged.links)
+        self._reindex(entity, merged.tags)
         self.session.flush()
+        if merged is not domain_existing:
+            self._record_changes([merged.id], client_id=client_id)
+        elif diverges(domain_existing, payload):
+            # a rejected (older) push is re-logged so the sender receives the winning version
+            self._record_changes([merged.id])
         return self._to_domain(entity)
 
-    def fetch_changed_since(self, since: datetime, limit: int) -> list[ThoughtRead]:
+    def apply_sync_batch(
+        self,
+        payloads: Sequence[SyncThoughtPayload],
+        client_id: str | None = None,
+    ) -> list[ThoughtRead]:
+        """Apply many sync changes at once with the same outcome as calling
+        :meth:`upsert_sync_payload` for each of them in order.
+
+        Every referenced thought and link target is prefetched with ``IN (...)``
+        queries, changes are reconciled in memory, and the net difference is
+        written with bulk statements.
+        """
+        if not payloads:
+            return []
+        self.session.flush()
+
+        ids = list(dict.fromkeys(payload.id for payload in payloads))
+        original: dict[str, ThoughtRead] = {}
+        for chunk in _chunked(ids, HYDRATE_CHUNK_SIZE):
+            rows = self.session.execute(select(*self._columns()).where(Thought.id.in_(chunk))).all()
+            original.update((record.id, record) for record in self._hydrate(rows))
+
+        referenced = list({target for payload in payloads for target in payload.links} - original.keys())
+        known_ids = set(original)
+        for chunk in _chunked(referenced, HYDRATE_CHUNK_SIZE):
+            known_ids.update(self.session.scalars(select(Thought.id).where(Thought.id.in_(chunk))))
+
+        state = dict(original)
+        results: list[ThoughtRead] = []
+        # latest writer per thought, mirroring the log entries the per-change path would leave
+        writers: dict[str, str | None] = {}
+        for payload in payloads:
+            current = state.get(payload.id)
+            merged = reconcile_change(current, payload)
+            if merged is not current:
+                writers[merged.id] = client_id
+            elif diverges(current, payload):
+                # a rejected (older) push is re-logged so the sender receives the winning version
+                writers[current.id] = None
+            previous_links = set(current.links) if current else set()
+            for target_id in merged.links:
+                if target_id not in previous_links and target_id not in known_ids:
+                    raise ValueError(f"Target thought {target_id} not found")
+            state[merged.id] = merged
+            known_ids.add(merged.id)
+            results.append(merged)
+
+        changed = [record for thought_id, record in state.items() if record is not original.get(thought_id)]
+        if changed:
+            self._write_sync_batch(changed, original)
+        for writer in set(writers.values()):
+            self._record_changes(
+                [thought_id for thought_id, candidate in writers.items() if candidate == writer], client_id=writer
+            )
+        return results
+
+    def fetch_changes_after(self, cursor: int, limit: int, exclude_client: str | None = None) -> ChangePage:
+        """Return up to ``limit`` thoughts whose latest change sequence is past ``cursor``.
+
+        The upper bound is read first so the returned cursor never skips a
+        change that was not part of this page. Writers allocate sequences under
+        a lock held until commit (see :meth:`_lock_change_log`), so no lower
+        sequence can still become visible after ``max(seq)`` was read. Changes
+        whose latest writer is ``exclude_client`` are skipped; the cursor still
+        moves past them.
+        """
+        upper = self.session.scalar(select(func.max(ThoughtChange.seq))) or 0
         query = (
-            select(Thought)
-            .where(Thought.updated_at > since)
-            .order_by(Thought.updated_at.asc())
-            .limit(limit)
+            select(ThoughtChange.seq, *self._columns())
+            .join(Thought, Thought.id == ThoughtChange.thought_id)
+            .where(ThoughtChange.seq > cursor, ThoughtChange.seq <= upper)
+            .order_by(ThoughtChange.seq.asc())
+            .limit(limit + 1)
+        )
+        if exclude_client is not None:
+            query = query.where(or_(ThoughtChange.client_id.is_(None), ThoughtChange.client_id != exclude_client))
+        rows = self.session.execute(query).all()
+        has_more = len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+            next_cursor = rows[-1].seq
+        else:
+            next_cursor = max(upper, cursor)
+        return ChangePage(changes=self._hydrate(rows), cursor=next_cursor, has_more=has_more)
+
+    # ------------------------------------------------------------------
+    # Graph queries
+    # ------------------------------------------------------------------
+    def neighborhood(
+        self,
+        root_id: str,
+        depth: int,
+        *,
+        direction: GraphDirection = "both",
+        max_nodes: int,
+        max_edges: int,
+    ) -> Optional[ThoughtGraph]:
+        """Live thoughts within ``depth`` link hops of ``root_id`` and the links between them.
+
+        One recursive CTE walks ``thought_links`` through the source/target
+        indexes. ``UNION`` drops repeated (thought, depth) pairs and the depth
+        bound stops cycles. Deleted thoughts are neither returned nor walked
+        through. Nodes are ranked by distance, then id, and cut at ``max_nodes``.
+        Edges are cut at ``max_edges`` (``0`` skips the edge query).
+        ``truncated`` reports either cut.
+        """
+        root_title = self.session.scalar(
+            select(Thought.title).where(Thought.id == root_id, Thought.deleted_at.is_(None))
+        )
+        if root_title is None:
+            return None
+
+        reach = select(literal(root_id).label("id"), literal(0).label("depth")).cte("reach", recursive=True)
+        if direction == "out":
+            neighbor = ThoughtLink.target_id
+            hop = ThoughtLink.source_id == reach.c.id
+        elif direction == "in":
+            neighbor = ThoughtLink.source_id
+            hop = ThoughtLink.target_id == reach.c.id
+        else:
+            neighbor = case((ThoughtLink.source_id == reach.c.id, ThoughtLink.target_id), else_=ThoughtLink.source_id)
+            hop = or_(ThoughtLink.source_id == reach.c.id, ThoughtLink.target_id == reach.c.id)
+        step = (
+            select(neighbor.label("id"), (reach.c.depth + 1).label("depth"))
+            .select_from(reach)
+            .join(ThoughtLink, hop)
+            .join(Thought, and_(Thought.id == neighbor, Thought.deleted_at.is_(None)))
+            .where(reach.c.depth < depth)
         )
-        return [self._to_domain(row) for row in self.session.scalars(query).all()]
+        reach = reach.union(step)
+
+        distance = func.min(reach.c.depth).label("depth")
+        rows = self.session.execute(
+            select(reach.c.id, distance, Thought.title)
+            .join(Thought, Thought.id == reach.c.id)
+            .group_by(reach.c.id, Thought.title)
+            .order_by(distance, reach.c.id)
+            .limit(max_nodes + 1)
+        ).all()
+        truncated = len(rows) > max_nodes
+        nodes = [GraphNode.model_construct(id=row.id, title=row.title, depth=row.depth) for row in rows[:max_nodes]]
+
+        members = {node.id for node in nodes}
+        edges: list[GraphEdge] = []
+        for chunk in _chunked(sorted(members) if max_edges else [], HYDRATE_CHUNK_SIZE):
+            links = self.session.execute(
+                select(ThoughtLink.source_id, ThoughtLink.target_id)
+                .where(ThoughtLink.source_id.in_(chunk))
+                .order_by(ThoughtLink.source_id, ThoughtLink.target_id)
+            )
+            edges.extend(
+                GraphEdge.model_construct(source=source, target=target) for source, target in links if target in members
+            )
+        if len(edges) > max_edges:
+            edges = edges[:max_edges]
+            truncated = True
+        return ThoughtGraph.model_construct(root=root_id, depth=depth, nodes=nodes, edges=edges, truncated=truncated)
 
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
+    @staticmethod
+    def _columns() -> tuple:
+        return (
+            Thought.id,
+            Thought.title,
+            Thought.content,
+            Thought.created_at,
+            Thought.updated_at,
+            Thought.deleted_at,
+        )
+
+    def _cacheable(self, thought_id: str) -> bool:
+        if not self.cache.enabled or written_in(self.session, thought_id):
+            return False
+        entity = self.session.identity_map.get(self.session.identity_key(Thought, thought_id))
+        return entity is None or not (entity in self.session.dirty or entity in self.session.new)
+
+    def _record_changes(self, thought_ids: Iterable[str], client_id: str | None = None) -> None:
+        """Move each thought to the head of the change log with a fresh sequence number.
+
+        Every mutation goes through here, so it also invalidates cached copies.
+        """
+        ids = list(dict.fromkeys(thought_ids))
+        if not ids:
+            return
+        mark_written(self.session, ids)
+        self._lock_change_log()
+        for chunk in _chunked(ids, HYDRATE_CHUNK_SIZE):
+            self.session.execute(delete(ThoughtChange).where(ThoughtChange.thought_id.in_(chunk)))
+        self.session.execute(
+            insert(ThoughtChange), [{"thought_id": thought_id, "client_id": client_id} for thought_id in ids]
+        )
+
+    def _lock_change_log(self) -> None:
+        """Serialize change-log writers on Postgres until this transaction ends.
+
+        A sequence drawn by a transaction that commits later would otherwise
+        appear below a ``max(seq)`` a sync reader already handed out as its
+        cursor, and that change would never be delivered. SQLite has a single
+        writer, so sequences are already committed in order there.
+        """
+        if self.session.get_bind().dialect.name == "postgresql":
+            self.session.execute(select(func.pg_advisory_xact_lock(CHANGE_LOG_LOCK_KEY)))
+
+    def _apply_batch_operation(
+        self, state: dict[str, ThoughtRead], operation: BatchOperation
+    ) -> tuple[HTTPStatus, ThoughtRead | None]:
+        """Apply one batch operation to ``state`` in place; mirrors the single-thought methods."""
+        if isinstance(operation, BatchCreate):
+            draft = operation.thought
+            thought_id = draft.id or generate_thought_id()
+            if thought_id in state:
+                raise _BatchOperationError(HTTPStatus.CONFLICT, f"Thought {thought_id} already exists")
+            links = sorted(target_id for target_id in draft.links if target_id != thought_id)
+            _require_targets(state, links)
+            record = ThoughtRead.model_construct(
+                id=thought_id,
+                title=draft.title,
+                content=draft.content,
+                tags=sorted(draft.tags),
+                links=links,
+                created_at=draft.created_at,
+                updated_at=draft.updated_at,
+                deleted_at=None,
+            )
+            state[thought_id] = record
+            return HTTPStatus.CREATED, record
+
+        if isinstance(operation, BatchUpdate):
+            current = state.get(operation.id)
+            if current is None:
+                raise _BatchOperationError(HTTPStatus.NOT_FOUND, f"Thought {operation.id} not found")
+            patched = apply_update(current, operation.changes)
+            _require_targets(state, set(patched.links) - set(current.links))
+            record = patched.model_copy(update={"tags": sorted(patched.tags), "links": sorted(patched.links)})
+            state[record.id] = record
+            return HTTPStatus.OK, record
+
+        if isinstance(operation, BatchDelete):
+            current = state.get(operation.id)
+            if current is None:
+                # DELETE is idempotent; a missing thought is not an error
+                return HTTPStatus.NO_CONTENT, None
+            stamp = utcnow()
+            state[current.id] = current.model_copy(update={"deleted_at": stamp, "updated_at": stamp})
+            for source_id, source in list(state.items()):
+                if current.id in source.links:
+                    state[source_id] = source.model_copy(
+                        update={"links": [target_id for target_id in source.links if target_id != current.id]}
+                    )
+            return HTTPStatus.NO_CONTENT, None
+
+        source = state.get(operation.source)
+        if operation.op == "link":
+            if operation.source == operation.target:
+                raise _BatchOperationError(HTTPStatus.BAD_REQUEST, "cannot link a thought to itself")
+            if source is None or operation.target not in state:
+                raise _BatchOperationError(HTTPStatus.BAD_REQUEST, "source or target thought not found")
+            if operation.target not in source.links:
+                source = source.model_copy(update={"links": sorted([*source.links, operation.target])})
+        else:
+            if source is None:
+                raise _BatchOperationError(HTTPStatus.NOT_FOUND, "source thought not found")
+            if operation.target in source.links:
+                source = source.model_copy(
+                    update={"links": [target_id for target_id in source.links if target_id != operation.target]}
+                )
+        state[source.id] = source
+        return HTTPStatus.OK, source
+
+    def _write_sync_batch(self, changed: Sequence[ThoughtRead], original: dict[str, ThoughtRead]) -> None:
+        rows = [
+            {
+                "id": record.id,
+                "title": record.title,
+                "content": record.content,
+                "created_at": record.created_at,
+                "updated_at": record.updated_at,
+                "deleted_at": record.deleted_at,
+            }
+            for record in changed
+        ]
+        inserts = [row for row in rows if row["id"] not in original]
+        updates = [row for row in rows if row["id"] in original]
+        if inserts:
+            self.session.execute(insert(Thought), inserts)
+        if updates:
+            self.session.execute(update(Thought), updates)
+
+        stale_tags: list[tuple[str, str]] = []
+        new_tags: list[dict[str, str]] = []
+        stale_links: list[tuple[str, str]] = []
+        new_links: list[dict[str, str]] = []
+        for record in changed:
+            before = original.get(record.id)
+            before_tags = set(before.tags) if before else set()
+            before_links = set(before.links) if before else set()
+            stale_tags.extend((record.id, tag) for tag in before_tags - set(record.tags))
+            new_tags.extend({"thought_id": record.id, "tag": tag} for tag in record.tags if tag not in before_tags)
+            stale_links.extend((record.id, target) for target in before_links - set(record.links))
+            new_links.extend(
+                {"source_id": record.id, "target_id": target} for target in record.links if target not in before_links
+            )
+
+        for chunk in _chunked(stale_tags, HYDRATE_CHUNK_SIZE):
+            self.session.execute(
+                delete(ThoughtTag).where(tuple_(ThoughtTag.thought_id, ThoughtTag.tag).in_(chunk)),
+                execution_options={"synchronize_session": False},
+            )
+        for chunk in _chunked(stale_links, HYDRATE_CHUNK_SIZE):
+            self.session.execute(
+                delete(ThoughtLink).where(tuple_(ThoughtLink.source_id, ThoughtLink.target_id).in_(chunk)),
+                execution_options={"synchronize_session": False},
+            )
+        if new_tags:
+            self.session.execute(insert(ThoughtTag), new_tags)
+        if new_links:
+            self.session.execute(insert(ThoughtLink), new_links)
+
+        index = self._search_index
+        index.upsert_many(
+            self.session,
+            [
+                SearchDocument(record.id, record.title, record.content, record.tags)
+                for record in changed
+                if record.deleted_at is None
+            ],
+        )
+        index.remove(self.session, [record.id for record in changed if record.deleted_at is not None])
+
+        # rows were written behind the identity map's back; drop any cached copies
+        for record in changed:
+            cached = self.session.identity_map.get(self.session.identity_key(Thought, record.id))
+            if cached is not None:
+                self.session.expire(cached)
+
+    def _insert_rows(self, table: Table, rows: list[dict[str, object]]) -> None:
+        if not rows:
+            return
+        connection = self.session.connection()
+        if connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg":
+            columns = list(rows[0])
+            cursor = connection.connection.cursor()
+            with cursor.copy(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row([row[column] for column in columns])
+            return
+        self.session.execute(insert(table), rows)
+
+    @property
+    def _search_index(self) -> SearchIndex:
+        return get_search_index(self.session.get_bind().dialect.name)
+
+    def _reindex(self, entity: Thought, tags: Iterable[str]) -> None:
+        if entity.deleted_at is None:
+            self._search_index.upsert(self.session, entity.id, entity.title, entity.content, tags)
+        else:
+            self._search_index.remove(self.session, [entity.id])
+
+    @staticmethod
+    def _filter_tags(query: Select, tags: TagFilter | None) -> Select:
+        """Restrict ``query`` to ``tags``: by the ids the tag index resolved, else by tag subqueries."""
+        if tags is None:
+            return query
+        if tags.thought_ids is not None:
+            return query.where(Thought.id.in_(tags.thought_ids))
+        for tag in tags.all_of:
+            query = query.where(_tagged([tag]))
+        if tags.any_of:
+            query = query.where(_tagged(tags.any_of))
+        if tags.none_of:
+            query = query.where(~_tagged(tags.none_of))
+        return query
+
+    @staticmethod
+    def _paginate(
+        query: Select,
+        *,
+        limit: int | None,
+        after: tuple[datetime, str] | None,
+    ) -> Select:
+        """Order newest-first and seek past the ``(updated_at, id)`` keyset position."""
+        if after is not None:
+            updated_at, thought_id = after
+            query = query.where(
+                or_(
+                    Thought.updated_at < updated_at,
+                    and_(Thought.updated_at == updated_at, Thought.id < thought_id),
+                )
+            )
+        query = query.order_by(Thought.updated_at.desc(), Thought.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
     def _replace_tags(self, entity: Thought, tags: Iterable[str]) -> None:
         existing = {tag.tag: tag for tag in entity.tags}
         next_values = {tag: None for tag in tags}
@@ -235,20 +982,192 @@ class ThoughtRepository:
 
         entity.outgoing_links.append(ThoughtLink(target_id=target_id))
 
+    def _hydrate(self, entities: Sequence[Thought] | Sequence[Row]) -> list[ThoughtRead]:
+        """Build domain models for many rows with a fixed number of queries.
+
+        Tags and links are loaded for the whole result set with chunked
+        ``IN (...)`` selects instead of touching the lazy relationships per row.
+        """
+        if not entities:
+            return []
+
+        ids = [entity.id for entity in entities]
+        tags: dict[str, list[str]] = defaultdict(list)
+        links: dict[str, list[str]] = defaultdict(list)
+        for chunk in _chunked(ids, HYDRATE_CHUNK_SIZE):
+            tag_rows = self.session.execute(
+                select(ThoughtTag.thought_id, ThoughtTag.tag).where(ThoughtTag.thought_id.in_(chunk))
+            )
+            for thought_id, tag in tag_rows:
+                tags[thought_id].append(tag)
+            link_rows = self.session.execute(
+                select(ThoughtLink.source_id, ThoughtLink.target_id).where(ThoughtLink.source_id.in_(chunk))
+            )
+            for source_id, target_id in link_rows:
+                links[source_id].append(target_id)
+
+        return [
+            self._build(entity, sorted(tags.get(entity.id, ())), sorted(links.get(entity.id, ())))
+            for entity in entities
+        ]
+
     def _to_domain(self, entity: Thought | None) -> ThoughtRead | None:
         if entity is None:
             return None
 
-        return ThoughtRead(
+        return self._build(
+            entity,
+            sorted(tag.tag for tag in entity.tags),
+            sorted(link.target_id for link in entity.outgoing_links),
+        )
+
+    @staticmethod
+    def _build(entity: Thought | Row, tags: list[str], links: list[str]) -> ThoughtRead:
+        # Stored rows were normalized on the way in (see ThoughtBase validators),
+        # so skip re-running the validators for every row read back out.
+        return ThoughtRead.model_construct(
             id=entity.id,
             title=entity.title,
             content=entity.content,
-            tags=sorted(tag.tag for tag in entity.tags),
-            links=sorted(link.target_id for link in entity.outgoing_links),
+            tags=tags,
+            links=links,
             created_at=entity.created_at,
             updated_at=entity.updated_at,
             deleted_at=entity.deleted_at,
         )
 
 
-__all__ = ["ThoughtRepository"]
+def _tagged(tags: Sequence[str]) -> ColumnElement[bool]:
+    return select(ThoughtTag.id).where(ThoughtTag.thought_id == Thought.id, ThoughtTag.tag.in_(tags)).exists()
+
+
+def _require_targets(state: dict[str, ThoughtRead], target_ids: Iterable[str]) -> None:
+    for target_id in target_ids:
+        if target_id not in state:
+            raise _BatchOperationError(HTTPStatus.NOT_FOUND, f"Target thought {target_id} not found")
+
+
+class AsyncThoughtRepository:
+    """Awaitable facade over :class:`ThoughtRepository` for async route handlers.
+
+    With an :class:`AsyncSession` every call runs through ``run_sync`` on the
+    async driver; with a plain :class:`Session` it is pushed to the threadpool.
+    Either way the query logic lives in one place. Mutations go through
+    ``writer`` instead when group commit is enabled.
+    """
+
+    def __init__(self, session: Session | AsyncSession, writer: GroupCommitWriter | None = None):
+        self.session = session
+        self.writer = writer
+
+    async def run(self, operation: Callable[[ThoughtRepository], T]) -> T:
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(lambda sync_session: operation(ThoughtRepository(sync_session)))
+        return await run_in_threadpool(operation, ThoughtRepository(self.session))
+
+    async def write(self, operation: Callable[[ThoughtRepository], T]) -> T:
+        if self.writer is not None:
+            return await self.writer.submit(operation)
+        return await self.run(operation)
+
+    async def list(
+        self,
+        include_deleted: bool = False,
+        *,
+        limit: int | None = None,
+        after: tuple[datetime, str] | None = None,
+        tags: TagFilter | None = None,
+    ) -> list[ThoughtRead]:
+        return await self.run(lambda repo: repo.list(include_deleted, limit=limit, after=after, tags=tags))
+
+    async def search(
+        self,
+        query_text: str,
+        *,
+        limit: int | None = None,
+        after: tuple[datetime, str] | None = None,
+        tags: TagFilter | None = None,
+    ) -> list[ThoughtRead]:
+        return await self.run(lambda repo: repo.search(query_text, limit=limit, after=after, tags=tags))
+
+    async def search_ranked(self, query_text: str, limit: int) -> list[ThoughtSearchHit]:
+        return await self.run(lambda repo: repo.search_ranked(query_text, limit))
+
+    async def get(self, thought_id: str) -> Optional[ThoughtRead]:
+        return await self.run(lambda repo: repo.get(thought_id))
+
+    async def create(self, draft: ThoughtCreate) -> ThoughtRead:
+        return await self.write(lambda repo: repo.create(draft))
+
+    async def version(self, thought_id: str) -> int | None:
+        return await self.run(lambda repo: repo.version(thought_id))
+
+    async def collection_version(self) -> tuple[int, int]:
+        return await self.run(lambda repo: repo.collection_version())
+
+    async def update(
+        self,
+        thought_id: str,
+        patch: ThoughtUpdate,
+        *,
+        expected_versions: Collection[int] | None = None,
+    ) -> ThoughtRead:
+        return await self.write(lambda repo: repo.update(thought_id, patch, expected_versions=expected_versions))
+
+    async def update_with_version(
+        self,
+        thought_id: str,
+        patch: ThoughtUpdate,
+        *,
+        expected_versions: Collection[int] | None = None,
+    ) -> tuple[ThoughtRead, int | None]:
+        """Update and read the new version in the same transaction, so the two always agree."""
+
+        def apply(repo: ThoughtRepository) -> tuple[ThoughtRead, int | None]:
+            record = repo.update(thought_id, patch, expected_versions=expected_versions)
+            return record, repo.version(thought_id)
+
+        return await self.write(apply)
+
+    async def delete(self, thought_id: str) -> None:
+        await self.write(lambda repo: repo.delete(thought_id))
+
+    async def purge(self, thought_id: str) -> None:
+        await self.write(lambda repo: repo.purge(thought_id))
+
+    async def link(self, source_id: str, target_id: str) -> ThoughtRead:
+        return await self.write(lambda repo: repo.link(source_id, target_id))
+
+    async def unlink(self, source_id: str, target_id: str) -> ThoughtRead:
+        return await self.write(lambda repo: repo.unlink(source_id, target_id))
+
+    async def apply_batch(self, operations: Sequence[BatchOperation], *, atomic: bool = True) -> ThoughtBatchResponse:
+        return await self.write(lambda repo: repo.apply_batch(operations, atomic=atomic))
+
+    async def apply_sync_batch(
+        self,
+        payloads: Sequence[SyncThoughtPayload],
+        client_id: str | None = None,
+    ) -> list[ThoughtRead]:
+        return await self.write(lambda repo: repo.apply_sync_batch(payloads, client_id))
+
+    async def fetch_changes_after(self, cursor: int, limit: int, exclude_client: str | None = None) -> ChangePage:
+        return await self.run(lambda repo: repo.fetch_changes_after(cursor, limit, exclude_client))
+
+    async def neighborhood(
+        self,
+        root_id: str,
+        depth: int,
+        *,
+        direction: GraphDirection = "both",
+        max_nodes: int,
+        max_edges: int,
+    ) -> Optional[ThoughtGraph]:
+        return await self.run(
+            lambda repo: repo.neighborhood(
+                root_id, depth, direction=direction, max_nodes=max_nodes, max_edges=max_edges
+            )
+        )
+
+
+__all__ = ["AsyncThoughtRepository", "ChangePage", "GraphDirection", "StaleVersionError", "ThoughtRepository"]
@@ -1,5 +1,5 @@
 """API routers."""
 
-from . import thoughts, sync, ai
+from . import thoughts, sync, ai, graph
 
-__all__ = ["thoughts", "sync", "ai"]
+__all__ = ["thoughts", "sync", "ai", "graph"]
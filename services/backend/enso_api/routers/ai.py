@@ -8,6 +8,8 @@ from ..domain.ai import (
     AIHealthResponse,
     AISearchRequest,
     AISearchResponse,
+    AISuggestBatchRequest,
+    AISuggestBatchResponse,
     AISuggestRequest,
     AISuggestResponse,
     AISummaryRequest,
@@ -34,6 +36,17 @@ async def suggest(
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(error)) from error
 
 
+@router.post("/suggest/batch", response_model=AISuggestBatchResponse)
+async def suggest_batch(
+    payload: AISuggestBatchRequest,
+    service: AIService = Depends(get_ai_service)
+) -> AISuggestBatchResponse:
+    try:
+        return await service.suggest_batch(payload)
+    except ModelUnavailableError as error:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(error)) from error
+
+
 @router.post("/search", response_model=AISearchResponse)
 async def search(
     payload: AISearchRequest,
@@ -0,0 +1,51 @@
+"""Whole-graph analytics over thought links, served from the in-memory index."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from starlette.concurrency import run_in_threadpool
+
+from ..domain.graph import GraphComponents, GraphHub, GraphIndexStats, GraphOrphans
+from ..graph import HubRanking, LinkGraphIndex
+
+router = APIRouter(prefix="/graph", tags=["graph"])
+
+MAX_RESULTS = 1000
+
+
+def _index(request: Request) -> LinkGraphIndex:
+    index: LinkGraphIndex | None = getattr(request.app.state, "graph_index", None)
+    if index is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Link graph index is disabled")
+    return index
+
+
+@router.get("/components", response_model=GraphComponents)
+async def components(
+    limit: int = Query(default=20, ge=1, le=MAX_RESULTS),
+    max_members: int = Query(default=100, ge=0, le=MAX_RESULTS),
+    index: LinkGraphIndex = Depends(_index),
+) -> GraphComponents:
+    return await run_in_threadpool(index.components, limit, max_members)
+
+
+@router.get("/orphans", response_model=GraphOrphans)
+async def orphans(
+    limit: int = Query(default=100, ge=1, le=MAX_RESULTS),
+    index: LinkGraphIndex = Depends(_index),
+) -> GraphOrphans:
+    return await run_in_threadpool(index.orphans, limit)
+
+
+@router.get("/hubs", response_model=list[GraphHub])
+async def hubs(
+    limit: int = Query(default=20, ge=1, le=MAX_RESULTS),
+    ranking: HubRanking = "pagerank",
+    index: LinkGraphIndex = Depends(_index),
+) -> list[GraphHub]:
+    return await run_in_threadpool(index.hubs, limit, ranking)
+
+
+@router.get("/stats", response_model=GraphIndexStats)
+async def index_stats(index: LinkGraphIndex = Depends(_index)) -> GraphIndexStats:
+    return index.stats()
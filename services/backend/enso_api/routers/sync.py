@@ -2,37 +2,40 @@
 
 from __future__ import annotations
 
-from datetime import datetime, timezone
-
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..config import get_settings
-from ..database import get_session
-from ..domain.thought import SyncRequest, SyncResponse, utcnow
-from ..repositories.thoughts import ThoughtRepository
+from ..database import get_db_session
+from ..domain.thought import SyncRequest, SyncResponse, parse_sync_cursor
+from ..repositories.thoughts import AsyncThoughtRepository
+from ..serialization import SYNC_RESPONSE_ADAPTER, render
 
 router = APIRouter(prefix="/sync", tags=["sync"])
 
 
-def _repository(session: Session = Depends(get_session)) -> ThoughtRepository:
-    return ThoughtRepository(session)
+def _repository(
+    request: Request, session: Session | AsyncSession = Depends(get_db_session)
+) -> AsyncThoughtRepository:
+    return AsyncThoughtRepository(session, writer=getattr(request.app.state, "write_queue", None))
 
 
 @router.post("/thoughts", response_model=SyncResponse)
-def sync_thoughts(payload: SyncRequest, repo: ThoughtRepository = Depends(_repository)) -> SyncResponse:
+async def sync_thoughts(
+    request: Request,
+    payload: SyncRequest,
+    repo: AsyncThoughtRepository = Depends(_repository),
+) -> Response:
     settings = get_settings()
 
-    for change in payload.changes:
-        repo.upsert_sync_payload(change)
-
-    cursor = utcnow()
-    since = payload.since or datetime.fromtimestamp(0, tz=timezone.utc)
-    limit = settings.sync_page_size
-    changes = repo.fetch_changed_since(since, limit + 1)
-    has_more = len(changes) > limit
-    if has_more:
-        changes = changes[:limit]
+    await repo.apply_sync_batch(payload.changes, client_id=payload.client_id)
 
-    return SyncResponse(cursor=cursor, changes=changes, has_more=has_more)
+    page = await repo.fetch_changes_after(
+        parse_sync_cursor(payload.since),
+        settings.sync_page_size,
+        exclude_client=payload.client_id,
+    )
+    result = SyncResponse.model_construct(cursor=str(page.cursor), changes=page.changes, has_more=page.has_more)
+    return render(request, SYNC_RESPONSE_ADAPTER, result)
 
@@ -2,52 +2,289 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from tempfile import SpooledTemporaryFile
+from typing import Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from ..database import get_session
-from ..domain.thought import ThoughtCreate, ThoughtPublic, ThoughtUpdate
-from ..repositories.thoughts import ThoughtRepository
+from .. import bulk
+from ..conditional import (
+    collection_etag,
+    expected_versions,
+    none_match,
+    not_modified,
+    thought_etag,
+    validator_headers,
+)
+from ..completion import CompletionIndex
+from ..database import get_db_session, session_scope
+from ..domain.completion import CompletionKind, Completions
+from ..domain.tags import TagFacets, TagFilter
+from ..domain.thought import (
+    GraphNode,
+    ThoughtBatchRequest,
+    ThoughtBatchResponse,
+    ThoughtCreate,
+    ThoughtGraph,
+    ThoughtImportReport,
+    ThoughtPublic,
+    ThoughtSearchHit,
+    ThoughtUpdate,
+    decode_page_cursor,
+    encode_page_cursor,
+)
+from ..repositories.thoughts import (
+    HYDRATE_CHUNK_SIZE,
+    AsyncThoughtRepository,
+    GraphDirection,
+    StaleVersionError,
+    ThoughtRepository,
+)
+from ..tags import TagIndex
+from ..serialization import (
+    BATCH_RESPONSE_ADAPTER,
+    GRAPH_ADAPTER,
+    GRAPH_NODES_ADAPTER,
+    SEARCH_HITS_ADAPTER,
+    THOUGHT_ADAPTER,
+    THOUGHT_LIST_ADAPTER,
+    dump_ndjson_lines,
+    render,
+)
 
 router = APIRouter(prefix="/thoughts", tags=["thoughts"])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+TAR_MEDIA_TYPE = "application/x-tar"
+STREAM_BATCH_SIZE = 500
+MAX_GRAPH_DEPTH = 5
+MAX_GRAPH_NODES = 2000
+MAX_GRAPH_EDGES = 10000
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+MAX_FACETS = 1000
+MAX_COMPLETIONS = 50
+
+
+def _repository(
+    request: Request, session: Session | AsyncSession = Depends(get_db_session)
+) -> AsyncThoughtRepository:
+    return AsyncThoughtRepository(session, writer=getattr(request.app.state, "write_queue", None))
+
+
+def _tag_params(
+    tags_all: list[str] = Query(default=[]),
+    tags_any: list[str] = Query(default=[]),
+    tags_none: list[str] = Query(default=[]),
+) -> TagFilter | None:
+    return TagFilter.from_params(tags_all, tags_any, tags_none)
+
+
+def _tag_filter(request: Request, tag_filter: TagFilter | None = Depends(_tag_params)) -> TagFilter | None:
+    index: TagIndex | None = getattr(request.app.state, "tag_index", None)
+    if tag_filter is None or index is None:
+        return tag_filter
+    # a selective filter becomes a primary-key lookup; a broad one stays a tag subquery in SQL
+    return index.narrow(tag_filter, HYDRATE_CHUNK_SIZE)
 
-def _repository(session: Session = Depends(get_session)) -> ThoughtRepository:
-    return ThoughtRepository(session)
 
+def _wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
 
-@router.get("/", response_model=list[ThoughtPublic])
-def list_thoughts(search: str | None = None, repo: ThoughtRepository = Depends(_repository)) -> list[ThoughtPublic]:
+
+def _ndjson_stream(search: str | None, include_deleted: bool, tags: TagFilter | None = None) -> Iterator[bytes]:
+    # request-scoped sessions close before the body is sent, so the stream owns its own
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        batches = repo.iter_batches(search, include_deleted=include_deleted, batch_size=STREAM_BATCH_SIZE, tags=tags)
+        for batch in batches:
+            yield dump_ndjson_lines(batch)
+
+
+@router.get(
+    "/",
+    response_model=list[ThoughtPublic],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def list_thoughts(
+    request: Request,
+    search: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    tags: TagFilter | None = Depends(_tag_filter),
+    repo: AsyncThoughtRepository = Depends(_repository),
+) -> Response:
+    if _wants_ndjson(request):
+        # streaming replaces paging: the whole result is sent one batch at a time
+        return StreamingResponse(
+            _ndjson_stream(search, include_deleted=False, tags=tags), media_type=NDJSON_MEDIA_TYPE
+        )
+
+    after = None
+    if cursor:
+        try:
+            after = decode_page_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    # read the version before the rows: a tag may be older than the body it
+    # comes with (costing one extra full response later) but never newer
+    etag = collection_etag(request, await repo.collection_version())
+    if none_match(request, etag):
+        return not_modified(etag)
+
+    # fetch one extra row to learn whether another page exists
+    fetch_limit = limit + 1 if limit is not None else None
     if search:
-        return repo.search(search)
-    return repo.list()
+        records = await repo.search(search, limit=fetch_limit, after=after, tags=tags)
+    else:
+        records = await repo.list(limit=fetch_limit, after=after, tags=tags)
+
+    headers = validator_headers(etag)
+    if limit is not None and len(records) > limit:
+        records = records[:limit]
+        last = records[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_page_cursor(last.updated_at, last.id)
+    return render(request, THOUGHT_LIST_ADAPTER, records, headers=headers)
+
+
+def _markdown_stream(include_deleted: bool) -> Iterator[bytes]:
+    with session_scope() as session:
+        yield from bulk.iter_markdown_tar(session, include_deleted=include_deleted, batch_size=STREAM_BATCH_SIZE)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}, TAR_MEDIA_TYPE: {}}}},
+)
+async def export_thoughts(
+    include_deleted: bool = False, data_format: bulk.BulkFormat = Query(default="jsonl", alias="format")
+) -> StreamingResponse:
+    if data_format == "markdown":
+        # one Markdown file per thought, in the layout `POST /thoughts/import?format=markdown` reads back
+        return StreamingResponse(
+            _markdown_stream(include_deleted),
+            media_type=TAR_MEDIA_TYPE,
+            headers={"Content-Disposition": 'attachment; filename="thoughts.tar"'},
+        )
+    return StreamingResponse(
+        _ndjson_stream(None, include_deleted=include_deleted),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="thoughts.ndjson"'},
+    )
+
+
+@router.post("/import", response_model=ThoughtImportReport)
+async def import_thoughts(
+    request: Request,
+    data_format: bulk.BulkFormat = Query(default="jsonl", alias="format"),
+    chunk_size: int = Query(default=bulk.DEFAULT_CHUNK_SIZE, ge=1, le=10000),
+) -> ThoughtImportReport:
+    # the body is JSON Lines, or a (optionally compressed) tar of Markdown files;
+    # spool it so large uploads go to disk instead of memory
+    with SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        try:
+            return await run_in_threadpool(bulk.import_file, spool, data_format, chunk_size=chunk_size)
+        except bulk.ImportFormatError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
+@router.get("/facets", response_model=TagFacets)
+async def tag_facets(
+    request: Request,
+    limit: int = Query(default=50, ge=1, le=MAX_FACETS),
+    tags: TagFilter | None = Depends(_tag_params),
+) -> TagFacets:
+    # counts within the thoughts the tag filter (if any) matches, most used first
+    index: TagIndex | None = getattr(request.app.state, "tag_index", None)
+    if index is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Tag index is disabled")
+    return index.facets(tags, limit)
+
+
+@router.get("/complete", response_model=Completions)
+async def complete_thoughts(
+    request: Request,
+    prefix: str = Query(min_length=1, max_length=200),
+    kind: CompletionKind = "all",
+    limit: int = Query(default=10, ge=1, le=MAX_COMPLETIONS),
+) -> Completions:
+    # typeahead for link targets and #tags; ids and titles only, never content
+    index: CompletionIndex | None = getattr(request.app.state, "completion_index", None)
+    if index is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Completion index is disabled")
+    return index.complete(prefix, limit, kind)
+
+
+@router.get("/search", response_model=list[ThoughtSearchHit])
+async def search_thoughts(
+    request: Request,
+    q: str = Query(min_length=1),
+    limit: int = Query(default=20, ge=1, le=100),
+    repo: AsyncThoughtRepository = Depends(_repository),
+) -> Response:
+    return render(request, SEARCH_HITS_ADAPTER, await repo.search_ranked(q, limit))
 
 
 @router.post("/", response_model=ThoughtPublic, status_code=status.HTTP_201_CREATED)
-def create_thought(payload: ThoughtCreate, repo: ThoughtRepository = Depends(_repository)) -> ThoughtPublic:
-    record = repo.create(payload)
-    return record
+async def create_thought(
+    request: Request,
+    payload: ThoughtCreate,
+    repo: AsyncThoughtRepository = Depends(_repository),
+) -> Response:
+    record = await repo.create(payload)
+    return render(request, THOUGHT_ADAPTER, record, status_code=status.HTTP_201_CREATED)
 
 
-@router.get("/{thought_id}", response_model=ThoughtPublic)
-def get_thought(thought_id: str, repo: ThoughtRepository = Depends(_repository)) -> ThoughtPublic:
-    record = repo.get(thought_id)
+@router.post("/batch", response_model=ThoughtBatchResponse)
+async def batch_thoughts(
+    request: Request,
+    payload: ThoughtBatchRequest,
+    repo: AsyncThoughtRepository = Depends(_repository),
+) -> Response:
+    # always 200: each result carries its own status and `committed` says whether anything was written
+    outcome = await repo.apply_batch(payload.operations, atomic=payload.mode == "atomic")
+    return render(request, BATCH_RESPONSE_ADAPTER, outcome)
+
+
+@router.get("/{thought_id}", response_model=ThoughtPublic, responses={304: {"description": "Not modified"}})
+async def get_thought(request: Request, thought_id: str, repo: AsyncThoughtRepository = Depends(_repository)) -> Response:
+    version = await repo.version(thought_id)
+    etag = thought_etag(request, version) if version is not None else None
+    if etag is not None and none_match(request, etag):
+        return not_modified(etag)
+    record = await repo.get(thought_id)
     if not record:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Thought not found")
-    return record
+    return render(request, THOUGHT_ADAPTER, record, headers=validator_headers(etag))
 
 
-@router.patch("/{thought_id}", response_model=ThoughtPublic)
-def update_thought(
+@router.patch("/{thought_id}", response_model=ThoughtPublic, responses={412: {"description": "If-Match did not match"}})
+async def update_thought(
+    request: Request,
     thought_id: str,
     payload: ThoughtUpdate,
-    repo: ThoughtRepository = Depends(_repository),
-) -> ThoughtPublic:
+    repo: AsyncThoughtRepository = Depends(_repository),
+) -> Response:
     try:
-        record = repo.update(thought_id, payload)
+        record, version = await repo.update_with_version(
+            thought_id, payload, expected_versions=expected_versions(request)
+        )
+    except StaleVersionError as exc:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=str(exc)) from exc
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
-    return record
+    etag = thought_etag(request, version) if version is not None else None
+    return render(request, THOUGHT_ADAPTER, record, headers=validator_headers(etag))
 
 
 @router.delete(
@@ -55,32 +292,67 @@ def update_thought(
     status_code=status.HTTP_204_NO_CONTENT,
     response_class=Response,
 )
-def delete_thought(thought_id: str, repo: ThoughtRepository = Depends(_repository)) -> Response:
-    repo.delete(thought_id)
+async def delete_thought(thought_id: str, repo: AsyncThoughtRepository = Depends(_repository)) -> Response:
+    await repo.delete(thought_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post("/{thought_id}/links/{target_id}", response_model=ThoughtPublic)
-def link_thought(
+async def link_thought(
+    request: Request,
     thought_id: str,
     target_id: str,
-    repo: ThoughtRepository = Depends(_repository),
-) -> ThoughtPublic:
+    repo: AsyncThoughtRepository = Depends(_repository),
+) -> Response:
     try:
-        record = repo.link(thought_id, target_id)
+        record = await repo.link(thought_id, target_id)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
-    return record
+    return render(request, THOUGHT_ADAPTER, record)
 
 
 @router.delete("/{thought_id}/links/{target_id}", response_model=ThoughtPublic)
-def unlink_thought(
+async def unlink_thought(
+    request: Request,
     thought_id: str,
     target_id: str,
-    repo: ThoughtRepository = Depends(_repository),
-) -> ThoughtPublic:
+    repo: AsyncThoughtRepository = Depends(_repository),
+) -> Response:
     try:
-        record = repo.unlink(thought_id, target_id)
+        record = await repo.unlink(thought_id, target_id)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
-    return record
+    return render(request, THOUGHT_ADAPTER, record)
+
+
+@router.get("/{thought_id}/backlinks", response_model=list[GraphNode])
+async def thought_backlinks(
+    request: Request,
+    thought_id: str,
+    depth: int = Query(default=1, ge=1, le=MAX_GRAPH_DEPTH),
+    limit: int = Query(default=200, ge=1, le=MAX_GRAPH_NODES),
+    repo: AsyncThoughtRepository = Depends(_repository),
+) -> Response:
+    graph = await repo.neighborhood(thought_id, depth, direction="in", max_nodes=limit + 1, max_edges=0)
+    if graph is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Thought not found")
+    # the root is always the first node (depth 0)
+    return render(request, GRAPH_NODES_ADAPTER, graph.nodes[1:])
+
+
+@router.get("/{thought_id}/graph", response_model=ThoughtGraph)
+async def thought_graph(
+    request: Request,
+    thought_id: str,
+    depth: int = Query(default=1, ge=1, le=MAX_GRAPH_DEPTH),
+    direction: GraphDirection = "both",
+    max_nodes: int = Query(default=200, ge=1, le=MAX_GRAPH_NODES),
+    max_edges: int = Query(default=1000, ge=0, le=MAX_GRAPH_EDGES),
+    repo: AsyncThoughtRepository = Depends(_repository),
+) -> Response:
+    graph = await repo.neighborhood(
+        thought_id, depth, direction=direction, max_nodes=max_nodes, max_edges=max_edges
+    )
+    if graph is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Thought not found")
+    return render(request, GRAPH_ADAPTER, graph)
@@ -0,0 +1,348 @@
+"""Full-text search index for thoughts.
+
+SQLite databases use an FTS5 virtual table ranked with BM25; Postgres databases
+use a ``tsvector`` column behind a GIN index. Both live next to the ORM tables
+and are created and dropped together with ``thoughts``; databases created
+before the index existed get it at startup (see :func:`ensure_search_index`).
+"""
+
+from __future__ import annotations
+
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Sequence
+
+from sqlalchemy import String, bindparam, event, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.selectable import TextualSelect
+
+from .models import Thought
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+SNIPPET_TOKENS = 12
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(slots=True)
+class SearchHit:
+    thought_id: str
+    score: float
+    snippet: str
+
+
+@dataclass(slots=True)
+class SearchDocument:
+    thought_id: str
+    title: str
+    content: str
+    tags: Sequence[str]
+
+
+def tokenize_query(query_text: str) -> list[str]:
+    """Split free text into lowercase word tokens safe to embed in a match expression."""
+    return [token.lower() for token in _TOKEN_PATTERN.findall(query_text)]
+
+
+class SearchIndex(ABC):
+    """Dialect-specific full-text index keyed by thought id."""
+
+    dialect: str = ""
+    table: str = ""
+
+    def create(self, connection: Connection) -> None:
+        for statement in self.create_statements():
+            connection.execute(text(statement))
+
+    def ensure(self, connection: Connection) -> bool:
+        """Create the index if it is missing; return ``True`` when it had to be created (and is empty)."""
+        missing = not inspect(connection).has_table(self.table)
+        self.create(connection)
+        return missing
+
+    def drop(self, connection: Connection) -> None:
+        for statement in self.drop_statements():
+            connection.execute(text(statement))
+
+    @abstractmethod
+    def create_statements(self) -> Sequence[str]: ...
+
+    @abstractmethod
+    def drop_statements(self) -> Sequence[str]: ...
+
+    def upsert(self, session: Session, thought_id: str, title: str, content: str, tags: Iterable[str]) -> None:
+        self.upsert_many(session, [SearchDocument(thought_id, title, content, tuple(tags))])
+
+    @abstractmethod
+    def upsert_many(self, session: Session, documents: Sequence[SearchDocument]) -> None: ...
+
+    @abstractmethod
+    def remove(self, session: Session, thought_ids: Sequence[str]) -> None: ...
+
+    @abstractmethod
+    def clear(self, session: Session) -> None: ...
+
+    @abstractmethod
+    def matching_ids(self, query_text: str) -> TextualSelect | None:
+        """Return a ``SELECT thought_id`` for rows matching ``query_text``, or ``None`` if nothing can match."""
+
+    @abstractmethod
+    def search(self, session: Session, query_text: str, limit: int) -> list[SearchHit]: ...
+
+
+class SqliteSearchIndex(SearchIndex):
+    """FTS5 table plus a docid map, since thought ids are not integer rowids."""
+
+    dialect = "sqlite"
+    table = "thoughts_fts"
+
+    def create_statements(self) -> Sequence[str]:
+        return (
+            "CREATE TABLE IF NOT EXISTS thoughts_fts_docs ("
+            "docid INTEGER PRIMARY KEY AUTOINCREMENT, thought_id VARCHAR(64) NOT NULL UNIQUE)",
+            "CREATE VIRTUAL TABLE IF NOT EXISTS thoughts_fts USING fts5("
+            "title, content, tags, tokenize = 'unicode61 remove_diacritics 2')",
+        )
+
+    def drop_statements(self) -> Sequence[str]:
+        return ("DROP TABLE IF EXISTS thoughts_fts", "DROP TABLE IF EXISTS thoughts_fts_docs")
+
+    def upsert_many(self, session: Session, documents: Sequence[SearchDocument]) -> None:
+        if not documents:
+            return
+        session.execute(
+            text("INSERT OR IGNORE INTO thoughts_fts_docs (thought_id) VALUES (:thought_id)"),
+            [{"thought_id": document.thought_id} for document in documents],
+        )
+        docids = dict(
+            session.execute(
+                text("SELECT thought_id, docid FROM thoughts_fts_docs WHERE thought_id IN :ids").bindparams(
+                    bindparam("ids", expanding=True)
+                ),
+                {"ids": [document.thought_id for document in documents]},
+            ).all()
+        )
+        session.execute(
+            text("DELETE FROM thoughts_fts WHERE rowid IN :docids").bindparams(bindparam("docids", expanding=True)),
+            {"docids": list(docids.values())},
+        )
+        session.execute(
+            text("INSERT INTO thoughts_fts (rowid, title, content, tags) VALUES (:docid, :title, :content, :tags)"),
+            [
+                {
+                    "docid": docids[document.thought_id],
+                    "title": document.title,
+                    "content": document.content,
+                    "tags": " ".join(document.tags),
+                }
+                for document in documents
+            ],
+        )
+
+    def remove(self, session: Session, thought_ids: Sequence[str]) -> None:
+        if not thought_ids:
+            return
+        params = {"ids": list(thought_ids)}
+        session.execute(
+            text(
+                "DELETE FROM thoughts_fts WHERE rowid IN "
+                "(SELECT docid FROM thoughts_fts_docs WHERE thought_id IN :ids)"
+            ).bindparams(bindparam("ids", expanding=True)),
+            params,
+        )
+        session.execute(
+            text("DELETE FROM thoughts_fts_docs WHERE thought_id IN :ids").bindparams(bindparam("ids", expanding=True)),
+            params,
+        )
+
+    def clear(self, session: Session) -> None:
+        session.execute(text("DELETE FROM thoughts_fts"))
+        session.execute(text("DELETE FROM thoughts_fts_docs"))
+
+    @staticmethod
+    def _match_expression(query_text: str) -> str | None:
+        tokens = tokenize_query(query_text)
+        if not tokens:
+            return None
+        # every token must match, each as a prefix so partial words still hit
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    def matching_ids(self, query_text: str) -> TextualSelect | None:
+        expression = self._match_expression(query_text)
+        if expression is None:
+            return None
+        clause: TextClause = text(
+            "SELECT d.thought_id FROM thoughts_fts "
+            "JOIN thoughts_fts_docs AS d ON d.docid = thoughts_fts.rowid "
+            "WHERE thoughts_fts MATCH :fts_query"
+        ).bindparams(fts_query=expression)
+        return clause.columns(thought_id=String)
+
+    def search(self, session: Session, query_text: str, limit: int) -> list[SearchHit]:
+        expression = self._match_expression(query_text)
+        if expression is None:
+            return []
+        rows = session.execute(
+            text(
+                "SELECT d.thought_id, bm25(thoughts_fts, 10.0, 1.0, 5.0) AS rank, "
+                "snippet(thoughts_fts, -1, :start, :end, '…', :tokens) AS snippet "
+                "FROM thoughts_fts JOIN thoughts_fts_docs AS d ON d.docid = thoughts_fts.rowid "
+                "WHERE thoughts_fts MATCH :fts_query "
+                "ORDER BY rank LIMIT :limit"
+            ),
+            {
+                "fts_query": expression,
+                "start": HIGHLIGHT_START,
+                "end": HIGHLIGHT_END,
+                "tokens": SNIPPET_TOKENS,
+                "limit": limit,
+            },
+        )
+        # bm25() is "lower is better"; flip it so callers get a positive relevance score
+        return [SearchHit(thought_id=row[0], score=-float(row[1]), snippet=row[2] or "") for row in rows]
+
+
+class PostgresSearchIndex(SearchIndex):
+    """``tsvector`` documents with a GIN index, weighted title > tags > content."""
+
+    dialect = "postgresql"
+    table = "thought_search"
+
+    _document = (
+        "setweight(to_tsvector('simple', :title), 'A') || "
+        "setweight(to_tsvector('simple', :tags), 'B') || "
+        "setweight(to_tsvector('simple', :content), 'C')"
+    )
+
+    def create_statements(self) -> Sequence[str]:
+        return (
+            "CREATE TABLE IF NOT EXISTS thought_search ("
+            "thought_id VARCHAR(64) PRIMARY KEY REFERENCES thoughts (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS ix_thought_search_document ON thought_search USING GIN (document)",
+        )
+
+    def drop_statements(self) -> Sequence[str]:
+        return ("DROP TABLE IF EXISTS thought_search",)
+
+    def upsert_many(self, session: Session, documents: Sequence[SearchDocument]) -> None:
+        if not documents:
+            return
+        session.execute(
+            text(
+                f"INSERT INTO thought_search (thought_id, document) VALUES (:thought_id, {self._document}) "
+                f"ON CONFLICT (thought_id) DO UPDATE SET document = EXCLUDED.document"
+            ),
+            [
+                {
+                    "thought_id": document.thought_id,
+                    "title": document.title,
+                    "content": document.content,
+                    "tags": " ".join(document.tags),
+                }
+                for document in documents
+            ],
+        )
+
+    def remove(self, session: Session, thought_ids: Sequence[str]) -> None:
+        if not thought_ids:
+            return
+        session.execute(
+            text("DELETE FROM thought_search WHERE thought_id IN :ids").bindparams(bindparam("ids", expanding=True)),
+            {"ids": list(thought_ids)},
+        )
+
+    def clear(self, session: Session) -> None:
+        session.execute(text("DELETE FROM thought_search"))
+
+    @staticmethod
+    def _tsquery(query_text: str) -> str | None:
+        tokens = tokenize_query(query_text)
+        if not tokens:
+            return None
+        return " & ".join(f"{token}:*" for token in tokens)
+
+    def matching_ids(self, query_text: str) -> TextualSelect | None:
+        tsquery = self._tsquery(query_text)
+        if tsquery is None:
+            return None
+        clause: TextClause = text(
+            "SELECT thought_id FROM thought_search WHERE document @@ to_tsquery('simple', :ts_query)"
+        ).bindparams(ts_query=tsquery)
+        return clause.columns(thought_id=String)
+
+    def search(self, session: Session, query_text: str, limit: int) -> list[SearchHit]:
+        tsquery = self._tsquery(query_text)
+        if tsquery is None:
+            return []
+        rows = session.execute(
+            text(
+                "SELECT s.thought_id, ts_rank_cd(s.document, q.query) AS rank, "
+                # excerpt the content, or the title when only the title matched
+                "ts_headline('simple', CASE WHEN to_tsvector('simple', t.content) @@ q.query "
+                "THEN t.content ELSE t.title END, q.query, :options) AS snippet "
+                "FROM thought_search AS s "
+                "JOIN thoughts AS t ON t.id = s.thought_id, "
+                "to_tsquery('simple', :ts_query) AS q(query) "
+                "WHERE s.document @@ q.query "
+                "ORDER BY rank DESC LIMIT :limit"
+            ),
+            {
+                "ts_query": tsquery,
+                "options": f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords={SNIPPET_TOKENS * 2}, MinWords=5",
+                "limit": limit,
+            },
+        )
+        return [SearchHit(thought_id=row[0], score=float(row[1]), snippet=row[2] or "") for row in rows]
+
+
+_INDEXES: dict[str, type[SearchIndex]] = {
+    SqliteSearchIndex.dialect: SqliteSearchIndex,
+    PostgresSearchIndex.dialect: PostgresSearchIndex,
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_index(dialect: str) -> SearchIndex:
+    try:
+        return _INDEXES[dialect]()
+    except KeyError as exc:
+        raise RuntimeError(f"full-text search is not supported on {dialect!r} databases") from exc
+
+
+def ensure_search_index(connection: Connection) -> bool:
+    """Create the full-text index on databases made before it existed; ``True`` if it needs a rebuild."""
+    if connection.dialect.name not in _INDEXES:
+        return False
+    return get_search_index(connection.dialect.name).ensure(connection)
+
+
+def _create_index(target, connection: Connection, **_: object) -> None:  # noqa: ANN001
+    if connection.dialect.name in _INDEXES:
+        get_search_index(connection.dialect.name).create(connection)
+
+
+def _drop_index(target, connection: Connection, **_: object) -> None:  # noqa: ANN001
+    if connection.dialect.name in _INDEXES:
+        get_search_index(connection.dialect.name).drop(connection)
+
+
+event.listen(Thought.__table__, "after_create", _create_index)
+event.listen(Thought.__table__, "before_drop", _drop_index)
+
+
+__all__ = [
+    "SearchDocument",
+    "SearchHit",
+    "SearchIndex",
+    "SqliteSearchIndex",
+    "PostgresSearchIndex",
+    "ensure_search_index",
+    "get_search_index",
+    "tokenize_query",
+]
@@ -0,0 +1,74 @@
+"""Trusted-output rendering for repository results.
+
+Thoughts leaving :class:`~enso_api.repositories.thoughts.ThoughtRepository`
+are already normalized (tags lower-cased and sorted, links de-duplicated and
+never self-referencing), so routes can skip FastAPI's ``response_model``
+re-validation and serialize them straight to bytes with pydantic-core's Rust
+encoder. Returning a :class:`fastapi.Response` bypasses the response model;
+declared ``response_model`` values still drive the OpenAPI schema.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Mapping, TypeVar
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from .domain.thought import (
+    GraphNode,
+    SyncResponse,
+    ThoughtBatchResponse,
+    ThoughtGraph,
+    ThoughtPublic,
+    ThoughtSearchHit,
+)
+from .encoding import MSGPACK_MEDIA_TYPES, msgpack, wants_msgpack
+
+T = TypeVar("T")
+
+JSON_MEDIA_TYPE = "application/json"
+
+THOUGHT_ADAPTER: TypeAdapter[ThoughtPublic] = TypeAdapter(ThoughtPublic)
+THOUGHT_LIST_ADAPTER: TypeAdapter[list[ThoughtPublic]] = TypeAdapter(list[ThoughtPublic])
+SEARCH_HITS_ADAPTER: TypeAdapter[list[ThoughtSearchHit]] = TypeAdapter(list[ThoughtSearchHit])
+SYNC_RESPONSE_ADAPTER: TypeAdapter[SyncResponse] = TypeAdapter(SyncResponse)
+GRAPH_ADAPTER: TypeAdapter[ThoughtGraph] = TypeAdapter(ThoughtGraph)
+GRAPH_NODES_ADAPTER: TypeAdapter[list[GraphNode]] = TypeAdapter(list[GraphNode])
+BATCH_RESPONSE_ADAPTER: TypeAdapter[ThoughtBatchResponse] = TypeAdapter(ThoughtBatchResponse)
+
+
+def render(
+    request: Request | None,
+    adapter: TypeAdapter[T],
+    value: T,
+    *,
+    status_code: int = 200,
+    headers: Mapping[str, str] | None = None,
+) -> Response:
+    """Serialize ``value`` without re-validating it, as MessagePack when the client asks for it."""
+    if request is not None and wants_msgpack(request.headers.get("accept", "")):
+        body = msgpack.packb(adapter.dump_python(value, mode="json"), use_bin_type=True)
+        media_type = MSGPACK_MEDIA_TYPES[0]
+    else:
+        body = adapter.dump_json(value)
+        media_type = JSON_MEDIA_TYPE
+    return Response(content=body, status_code=status_code, headers=dict(headers or {}), media_type=media_type)
+
+
+def dump_ndjson_lines(records: list[Any]) -> bytes:
+    """Encode already-normalized thoughts as newline-delimited JSON."""
+    return b"".join(THOUGHT_ADAPTER.dump_json(record) + b"\n" for record in records)
+
+
+__all__ = [
+    "BATCH_RESPONSE_ADAPTER",
+    "GRAPH_ADAPTER",
+    "GRAPH_NODES_ADAPTER",
+    "SEARCH_HITS_ADAPTER",
+    "SYNC_RESPONSE_ADAPTER",
+    "THOUGHT_ADAPTER",
+    "THOUGHT_LIST_ADAPTER",
+    "dump_ndjson_lines",
+    "render",
+]
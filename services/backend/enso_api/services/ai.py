@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
+import time
 from dataclasses import dataclass
-from typing import Callable, Optional, TypeVar
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Callable, Optional, TypeVar
 
 import httpx
-from fastapi import Depends
+from fastapi import Depends, Request
 
 from ..config import Settings, get_settings
 from ..domain.ai import (
@@ -14,6 +18,8 @@ from ..domain.ai import (
     AISearchRequest,
     AISearchResponse,
     AISearchResult,
+    AISuggestBatchRequest,
+    AISuggestBatchResponse,
     AISuggestRequest,
     AISuggestResponse,
     AISuggestion,
@@ -21,18 +27,75 @@ from ..domain.ai import (
     AISummaryRequest,
     AISummaryResponse,
 )
+from .ai_cache import AIResponseCache, CacheKind, request_key
+
+if TYPE_CHECKING:
+    from .ai_batcher import ModelBatcher
+    from .ai_router import ModelRouter
+    from .semantic import SemanticSearch
 
 T = TypeVar("T")
+R = TypeVar("R", AISuggestResponse, AISummaryResponse)
+
+logger = logging.getLogger(__name__)
 
 
 class ModelUnavailableError(RuntimeError):
     """Raised when the underlying model endpoint cannot service a request."""
 
 
+def build_model_client(settings: Settings) -> httpx.AsyncClient | None:
+    """Create the pooled client for the model server, or ``None`` when no request would leave the process.
+
+    The app creates one in ``lifespan`` and shares it across requests, so
+    connections are kept alive between calls instead of being set up per call.
+    """
+    if not settings.ai_enabled or settings.ai_mode == "stub" or not settings.ai_model_url:
+        return None
+    http2 = settings.ai_http2
+    if http2 and find_spec("h2") is None:
+        logger.warning("AI_HTTP2 is enabled but h2 is not installed; the model client falls back to HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(
+        base_url=settings.ai_model_url.rstrip("/"),
+        timeout=settings.ai_timeout_seconds,
+        limits=httpx.Limits(
+            max_connections=settings.ai_max_connections,
+            max_keepalive_connections=settings.ai_max_keepalive_connections,
+            keepalive_expiry=settings.ai_keepalive_expiry_seconds,
+        ),
+        http2=http2,
+    )
+
+
+async def request_model(
+    client: httpx.AsyncClient, method: str, path: str, body: object | None = None
+) -> httpx.Response:
+    """Send one request to the model server; failures of any kind surface as :class:`ModelUnavailableError`."""
+    try:
+        response = await client.request(method, path, json=body)
+        response.raise_for_status()
+    except httpx.RequestError as exc:
+        raise ModelUnavailableError(str(exc)) from exc
+    except httpx.HTTPStatusError as exc:
+        detail = exc.response.text or f"model responded with {exc.response.status_code}"
+        raise ModelUnavailableError(detail) from exc
+    return response
+
+
 @dataclass(slots=True)
 class AIService:
     settings: Settings
     client_factory: Callable[[], httpx.AsyncClient] | None = None
+    # shared client owned by the app; without one each call opens (and closes) its own
+    client: httpx.AsyncClient | None = None
+    cache: AIResponseCache | None = None
+    # app-wide single flight and micro-batching of suggest and summary calls
+    batcher: ModelBatcher | None = None
+    # AI_MODE=auto: spreads calls over several backends and owns their clients and batchers
+    router: ModelRouter | None = None
+    # in-process vector index over stored thoughts; answers search instead of the model
+    semantic: SemanticSearch | None = None
 
     async def suggest(self, payload: AISuggestRequest) -> AISuggestResponse:
         if not self.settings.ai_enabled:
@@ -41,16 +104,34 @@ class AIService:
         if self.settings.ai_mode == "stub":
             return self._stub_suggest(payload)
 
-        return await self._post("/suggest", payload, AISuggestResponse)
+        try:
+            return await self._cached("suggest", "/suggest", payload, AISuggestResponse)
+        except ModelUnavailableError:
+            if self.router is None:
+                raise
+            return self._stub_suggest(payload)
+
+    async def suggest_batch(self, payload: AISuggestBatchRequest) -> AISuggestBatchResponse:
+        # each item still goes through the cache and the batcher, which folds them into one upstream call
+        responses = await asyncio.gather(*(self.suggest(request) for request in payload.requests))
+        return AISuggestBatchResponse(responses=list(responses))
 
     async def search(self, payload: AISearchRequest) -> AISearchResponse:
         if not self.settings.ai_enabled:
             return AISearchResponse(results=[], source="disabled")
 
+        if self.semantic is not None:
+            return await self.semantic.search(payload)
+
         if self.settings.ai_mode == "stub":
             return AISearchResponse(results=self._stub_search(payload), source="stub")
 
-        return await self._post("/search", payload, AISearchResponse)
+        if self.router is None:
+            return await self._post("/search", payload, AISearchResponse)
+        try:
+            return AISearchResponse.model_validate(await self.router.call("/search", None, self._dump(payload)))
+        except ModelUnavailableError:
+            return AISearchResponse(results=self._stub_search(payload), source="stub")
 
     async def summarize(self, payload: AISummaryRequest) -> AISummaryResponse:
         if not self.settings.ai_enabled:
@@ -59,7 +140,12 @@ class AIService:
         if self.settings.ai_mode == "stub":
             return self._stub_summary(payload)
 
-        return await self._post("/summary", payload, AISummaryResponse)
+        try:
+            return await self._cached("summary", "/summary", payload, AISummaryResponse)
+        except ModelUnavailableError:
+            if self.router is None:
+                raise
+            return self._stub_summary(payload)
 
     async def health(self) -> AIHealthResponse:
         if not self.settings.ai_enabled:
@@ -68,23 +154,51 @@ class AIService:
         if self.settings.ai_mode == "stub":
             return AIHealthResponse(status="ok", detail="Stub responses", mode="stub", enabled=True)
 
+        if self.router is not None:
+            backends = self.router.statuses()
+            if any(backend.state != "open" for backend in backends):
+                return AIHealthResponse(status="ok", mode="auto", enabled=True, backends=backends)
+            detail = "every model backend is failing; answering from the stub"
+            return AIHealthResponse(status="degraded", detail=detail, mode="auto", enabled=True, backends=backends)
+
         try:
             await self._get("/health")
             return AIHealthResponse(status="ok", mode=self.settings.ai_mode, enabled=True)
         except ModelUnavailableError as error:
             return AIHealthResponse(status="unavailable", detail=str(error), mode=self.settings.ai_mode, enabled=True)
 
+    async def _cached(
+        self,
+        kind: CacheKind,
+        path: str,
+        payload: AISuggestRequest | AISummaryRequest,
+        model: type[R],
+    ) -> R:
+        started = time.perf_counter()
+        key = self.cache.key(kind, payload) if self.cache is not None else request_key(kind, payload)
+        if self.cache is not None:
+            body = await self.cache.get(key)
+            if body is not None:
+                return model.model_validate_json(body).model_copy(
+                    update={"source": "cache", "latency_ms": _elapsed_ms(started)}
+                )
+        if self.router is not None:
+            response = model.model_validate(await self.router.call(path, key, self._dump(payload)))
+        elif self.batcher is not None:
+            response = model.model_validate(await self.batcher.submit(path, key, self._dump(payload)))
+        else:
+            response = await self._post(path, payload, model)
+        if self.cache is not None:
+            await self.cache.put(key, response)
+        if response.latency_ms is None:
+            response = response.model_copy(update={"latency_ms": _elapsed_ms(started)})
+        return response
+
     async def _post(self, path: str, payload: object, model: type[T]) -> T:
         client, managed = self._build_client()
         try:
-            response = await client.post(path, json=self._dump(payload))
-            response.raise_for_status()
+            response = await request_model(client, "POST", path, self._dump(payload))
             return model.model_validate(response.json())  # type: ignore[attr-defined]
-        except httpx.RequestError as exc:
-            raise ModelUnavailableError(str(exc)) from exc
-        except httpx.HTTPStatusError as exc:
-            detail = exc.response.text or f"model responded with {exc.response.status_code}"
-            raise ModelUnavailableError(detail) from exc
         finally:
             if managed:
                 await client.aclose()
@@ -92,13 +206,7 @@ class AIService:
     async def _get(self, path: str) -> None:
         client, managed = self._build_client()
         try:
-            response = await client.get(path)
-            response.raise_for_status()
-        except httpx.RequestError as exc:
-            raise ModelUnavailableError(str(exc)) from exc
-        except httpx.HTTPStatusError as exc:
-            detail = exc.response.text or f"model responded with {exc.response.status_code}"
-            raise ModelUnavailableError(detail) from exc
+            await request_model(client, "GET", path)
         finally:
             if managed:
                 await client.aclose()
@@ -106,10 +214,12 @@ class AIService:
     def _build_client(self) -> tuple[httpx.AsyncClient, bool]:
         if self.client_factory:
             return self.client_factory(), False
-        if not self.settings.ai_model_url:
+        if self.client is not None:
+            return self.client, False
+        client = build_model_client(self.settings)
+        if client is None:
             raise ModelUnavailableError("AI_MODEL_URL is not configured")
-        base_url = self.settings.ai_model_url.rstrip("/")
-        return httpx.AsyncClient(base_url=base_url, timeout=self.settings.ai_timeout_seconds), True
+        return client, True
 
     @staticmethod
     def _dump(payload: object) -> dict[str, object]:
@@ -170,8 +280,20 @@ class AIService:
         return AISummaryResponse(summary=summary, highlights=None, source="stub")
 
 
-def get_ai_service(settings: Settings = Depends(get_settings)) -> AIService:
-    return AIService(settings=settings)
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def get_ai_service(request: Request, settings: Settings = Depends(get_settings)) -> AIService:
+    state = request.app.state
+    return AIService(
+        settings=settings,
+        client=getattr(state, "ai_client", None),
+        cache=getattr(state, "ai_cache", None),
+        batcher=getattr(state, "ai_batcher", None),
+        router=getattr(state, "ai_router", None),
+        semantic=getattr(state, "semantic_search", None),
+    )
 
 
-__all__ = ["AIService", "ModelUnavailableError", "get_ai_service"]
+__all__ = ["AIService", "ModelUnavailableError", "build_model_client", "get_ai_service", "request_model"]
@@ -0,0 +1,214 @@
+"""Single flight and micro-batching for suggest and summary calls.
+
+Editors fire a suggest request on every pause, so the model runner sees
+bursts of small, often identical requests. :class:`ModelBatcher` sits
+between :class:`~enso_api.services.ai.AIService` and the shared client:
+
+* identical requests (same :func:`~enso_api.services.ai_cache.request_key`)
+  that arrive while one is in flight wait for that call instead of sending
+  their own;
+* distinct requests queued within ``window_seconds`` of each other go out as
+  one ``POST {path}/batch`` call carrying ``{"requests": [...]}`` and answered
+  with ``{"responses": [...]}`` in the same order, so the runner can fill one
+  forward pass instead of many.
+
+A runner that does not implement the batch routes (``404``, ``405`` or
+``501``) is remembered per path and served with concurrent single calls from
+then on; single flight still applies.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import httpx
+
+from ..config import Settings
+from .ai import ModelUnavailableError, request_model
+
+logger = logging.getLogger(__name__)
+
+# statuses that mean "no batch route here", not "the model is down"
+BATCH_UNSUPPORTED_STATUSES = frozenset({404, 405, 501})
+
+
+@dataclass(slots=True)
+class _PendingCall:
+    path: str
+    body: dict[str, object]
+    future: asyncio.Future
+
+
+@dataclass(slots=True)
+class ModelBatcherStats:
+    calls: int = 0
+    coalesced: int = 0
+    upstream_calls: int = 0
+    batches: int = 0
+    batched_calls: int = 0
+    largest_batch: int = 0
+    failed_calls: int = 0
+
+
+class _BatchUnsupported(Exception):
+    pass
+
+
+class ModelBatcher:
+    """Coalesce identical and group concurrent model calls.
+
+    The batcher waits at most ``window_seconds`` after the first queued call
+    for others to join, and never sends more than ``max_batch`` requests in
+    one upstream call.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, *, window_seconds: float = 0.002, max_batch: int = 16) -> None:
+        self.client = client
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.stats = ModelBatcherStats()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._unbatched: set[str] = set()
+        self._queue: asyncio.Queue[_PendingCall | None] | None = None
+        self._task: asyncio.Task | None = None
+        self._dispatches: set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Send calls already queued and wait for their answers, then stop accepting new ones."""
+        if self._task is None or self._queue is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+
+    async def submit(self, path: str, key: str, body: dict[str, object]) -> Any:
+        """Decoded JSON answer to ``body`` posted to ``path``, shared with identical calls in flight."""
+        if not self.running or self._queue is None:
+            raise RuntimeError("the model batcher is not running")
+        self.stats.calls += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._settle(key, done))
+            await self._queue.put(_PendingCall(path, body, future))
+        # one caller giving up must not cancel the call for everyone sharing it
+        return await asyncio.shield(future)
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            **asdict(self.stats),
+            "in_flight": len(self._inflight),
+            "unbatched_paths": sorted(self._unbatched),
+        }
+
+    def _settle(self, key: str, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()  # retrieved even when every caller has gone
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            group = [first]
+            deadline = loop.time() + self.window_seconds
+            while len(group) < self.max_batch:
+                remaining = deadline - loop.time()
+                try:
+                    pending = self._queue.get_nowait() if remaining <= 0 else await asyncio.wait_for(
+                        self._queue.get(), remaining
+                    )
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                group.append(pending)
+
+            by_path: dict[str, list[_PendingCall]] = defaultdict(list)
+            for pending in group:
+                by_path[pending.path].append(pending)
+            # the upstream round trip must not hold up collecting the next group
+            for path, calls in by_path.items():
+                task = asyncio.create_task(self._dispatch(path, calls))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, path: str, calls: list[_PendingCall]) -> None:
+        results: list[Any] | None = None
+        if len(calls) > 1 and path not in self._unbatched:
+            try:
+                results = await self._post_batch(path, [call.body for call in calls])
+            except _BatchUnsupported:
+                logger.info("model runner has no %s/batch route; sending %s calls one by one", path, path)
+                self._unbatched.add(path)
+            except Exception as exc:  # reported to every caller in the batch
+                results = [exc] * len(calls)
+        if results is None:
+            results = await asyncio.gather(*(self._post_one(path, call.body) for call in calls), return_exceptions=True)
+
+        for call, result in zip(calls, results):
+            if call.future.done():
+                continue
+            if isinstance(result, BaseException):
+                self.stats.failed_calls += 1
+                call.future.set_exception(result)
+            else:
+                call.future.set_result(result)
+
+    async def _post_one(self, path: str, body: dict[str, object]) -> Any:
+        self.stats.upstream_calls += 1
+        response = await request_model(self.client, "POST", path, body)
+        return response.json()
+
+    async def _post_batch(self, path: str, bodies: list[dict[str, object]]) -> list[Any]:
+        self.stats.upstream_calls += 1
+        try:
+            response = await request_model(self.client, "POST", f"{path}/batch", {"requests": bodies})
+        except ModelUnavailableError as exc:
+            cause = exc.__cause__
+            if isinstance(cause, httpx.HTTPStatusError) and cause.response.status_code in BATCH_UNSUPPORTED_STATUSES:
+                raise _BatchUnsupported from exc
+            raise
+        payload = response.json()
+        responses = payload.get("responses") if isinstance(payload, dict) else None
+        if not isinstance(responses, list) or len(responses) != len(bodies):
+            raise ModelUnavailableError(f"model answered a batch of {len(bodies)} with a malformed body")
+        self.stats.batches += 1
+        self.stats.batched_calls += len(bodies)
+        self.stats.largest_batch = max(self.stats.largest_batch, len(bodies))
+        return responses
+
+
+def build_model_batcher(settings: Settings, client: httpx.AsyncClient | None) -> ModelBatcher | None:
+    """The app-wide batcher around ``client``, or ``None`` when no model is called."""
+    if client is None:
+        return None
+    return ModelBatcher(client, window_seconds=settings.ai_batch_window_ms / 1000, max_batch=settings.ai_batch_max_size)
+
+
+__all__ = ["BATCH_UNSUPPORTED_STATUSES", "ModelBatcher", "ModelBatcherStats", "build_model_batcher"]
@@ -0,0 +1,174 @@
+"""Content-addressed cache for model responses to suggest and summary requests.
+
+Requests are keyed by a BLAKE2 hash of their normalized fields (content,
+focus, length, tags, mode and context) together with the model URL, so an
+autosave that re-sends unchanged text is answered without a model call. The
+memory tier is an :class:`~enso_api.cache.LRUCache` of serialized responses;
+an optional SQLite file (``AI_CACHE_PATH``) adds a second tier that survives
+restarts. Disk reads and writes run in the threadpool.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from ..cache import LRUCache
+from ..config import Settings
+from ..domain.ai import AISuggestRequest, AISummaryRequest
+
+CacheKind = Literal["suggest", "summary"]
+
+# expired disk rows are swept after this many writes
+DISK_SWEEP_INTERVAL = 256
+
+
+def request_key(kind: CacheKind, payload: AISuggestRequest | AISummaryRequest, namespace: str = "") -> str:
+    """Hash of the fields that decide the model's answer; whitespace-only edits do not change it."""
+    fields: dict[str, object] = {
+        "kind": kind,
+        "namespace": namespace,
+        "content": "\n".join(line.rstrip() for line in payload.content.strip().splitlines()),
+        "mode": payload.mode.strip().lower(),
+    }
+    if isinstance(payload, AISuggestRequest):
+        fields["tags"] = sorted({tag.strip().lower() for tag in payload.tags if tag.strip()})
+        fields["context"] = payload.context
+    else:
+        fields["focus"] = (payload.focus or "").strip().lower()
+        fields["length"] = (payload.length or "").strip().lower()
+    canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+@dataclass(slots=True)
+class ResponseCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+
+class DiskCache:
+    """SQLite table of serialized responses with an expiry per row."""
+
+    def __init__(self, path: Path, ttl_seconds: float) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS ai_responses ("
+            "key TEXT PRIMARY KEY, body BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.sweep()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT body FROM ai_responses WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, body: bytes) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO ai_responses (key, body, expires_at) VALUES (?, ?, ?)",
+                (key, body, time.time() + self.ttl_seconds),
+            )
+            self._writes += 1
+            if self._writes % DISK_SWEEP_INTERVAL == 0:
+                self._connection.execute("DELETE FROM ai_responses WHERE expires_at <= ?", (time.time(),))
+
+    def sweep(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM ai_responses WHERE expires_at <= ?", (time.time(),))
+
+    def usage(self) -> tuple[int, int]:
+        """``(entries, bytes)`` currently stored."""
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT count(*), coalesce(sum(length(body)), 0) FROM ai_responses"
+            ).fetchone()
+        return entries, size
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class AIResponseCache:
+    """Two-tier (memory, then optional disk) cache of model responses."""
+
+    def __init__(self, memory: LRUCache[str, bytes], disk: DiskCache | None = None, namespace: str = "") -> None:
+        self.memory = memory
+        self.disk = disk
+        self.namespace = namespace
+        self.stats = ResponseCacheStats()
+
+    def key(self, kind: CacheKind, payload: AISuggestRequest | AISummaryRequest) -> str:
+        return request_key(kind, payload, self.namespace)
+
+    async def get(self, key: str) -> bytes | None:
+        body = self.memory.get(key)
+        if body is not None:
+            self.stats.memory_hits += 1
+            return body
+        if self.disk is not None:
+            body = await run_in_threadpool(self.disk.get, key)
+            if body is not None:
+                self.stats.disk_hits += 1
+                self.memory.put(key, body)
+                return body
+        self.stats.misses += 1
+        return None
+
+    async def put(self, key: str, response: BaseModel) -> None:
+        body = response.model_dump_json().encode()
+        self.memory.put(key, body)
+        if self.disk is not None:
+            await run_in_threadpool(self.disk.put, key, body)
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+    def snapshot(self) -> dict[str, object]:
+        lookups = self.stats.memory_hits + self.stats.disk_hits + self.stats.misses
+        hits = self.stats.memory_hits + self.stats.disk_hits
+        snapshot: dict[str, object] = {
+            **asdict(self.stats),
+            "hit_ratio": hits / lookups if lookups else None,
+            "memory": self.memory.snapshot(),
+            "disk": None,
+        }
+        if self.disk is not None:
+            entries, size = self.disk.usage()
+            snapshot["disk"] = {"entries": entries, "bytes": size, "ttl_seconds": self.disk.ttl_seconds}
+        return snapshot
+
+
+def build_response_cache(settings: Settings) -> AIResponseCache | None:
+    """The app-wide response cache, or ``None`` when caching is off or no model is called."""
+    if not settings.ai_enabled or settings.ai_mode == "stub" or settings.ai_cache_size <= 0:
+        return None
+    memory: LRUCache[str, bytes] = LRUCache(settings.ai_cache_size, settings.ai_cache_ttl_seconds, sizeof=len)
+    disk = DiskCache(Path(settings.ai_cache_path), settings.ai_cache_disk_ttl_seconds) if settings.ai_cache_path else None
+    # responses from one model runner must not answer for another
+    namespace = settings.ai_model_url or ""
+    if settings.ai_mode == "auto" and settings.ai_backends:
+        namespace = ",".join(settings.ai_backends.values())
+    return AIResponseCache(memory, disk, namespace=namespace)
+
+
+__all__ = ["AIResponseCache", "CacheKind", "DiskCache", "build_response_cache", "request_key"]
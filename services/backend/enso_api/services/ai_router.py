@@ -0,0 +1,327 @@
+"""Latency-aware routing between model backends for ``AI_MODE=auto``.
+
+Every backend configured in ``AI_BACKENDS`` gets its own pooled client (and
+:class:`~enso_api.services.ai_batcher.ModelBatcher`), a rolling window of
+the latencies and outcomes of its last calls, and a circuit breaker.
+
+* Calls go to the open-for-business backend with the lowest expected
+  latency: the window's median scaled up by its error rate. A backend
+  without samples scores zero, so new and recovered backends get tried.
+* After ``AI_BREAKER_FAILURES`` consecutive failures, or once half of a
+  full window failed, the breaker opens and the backend is skipped without
+  waiting for a timeout. After ``AI_BREAKER_COOLDOWN_SECONDS`` one call is
+  let through as a probe; its outcome closes or re-opens the breaker.
+* With ``AI_HEDGE_AFTER_MS`` set, a call still unanswered after that delay
+  is also sent to the next backend, and whichever answers first wins.
+
+A failed call moves on to the next backend. When none is left the router
+raises :class:`~enso_api.services.ai.ModelUnavailableError` and
+:class:`~enso_api.services.ai.AIService` answers from its stub.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import statistics
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Literal
+
+import httpx
+
+from ..config import Settings
+from ..domain.ai import AIBackendStatus
+from .ai import ModelUnavailableError, build_model_client, request_model
+from .ai_batcher import ModelBatcher, build_model_batcher
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+# a full window is at least this many calls before its error rate can open the breaker
+MIN_ERROR_RATE_SAMPLES = 10
+ERROR_RATE_TO_OPEN = 0.5
+
+
+class LatencyWindow:
+    """The last ``size`` calls to a backend: how long each took and whether it succeeded."""
+
+    def __init__(self, size: int) -> None:
+        self._samples: deque[tuple[float, bool]] = deque(maxlen=size)
+
+    def record(self, latency_ms: float, ok: bool) -> None:
+        self._samples.append((latency_ms, ok))
+
+    def clear(self) -> None:
+        self._samples.clear()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    @property
+    def error_rate(self) -> float:
+        if not self._samples:
+            return 0.0
+        return sum(not ok for _, ok in self._samples) / len(self._samples)
+
+    def percentile(self, fraction: float) -> float | None:
+        latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def median(self) -> float | None:
+        latencies = [latency for latency, ok in self._samples if ok]
+        return statistics.median(latencies) if latencies else None
+
+
+class CircuitBreaker:
+    """Closed until a backend keeps failing, then open for ``cooldown_seconds``, then one probe."""
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state: BreakerState = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in the half-open state only one probe at a time."""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown_seconds:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def record_failure(self, error_rate: float, samples: int) -> None:
+        self.consecutive_failures += 1
+        self._probing = False
+        if (
+            self.state == "half_open"
+            or self.consecutive_failures >= self.failure_threshold
+            or (samples >= MIN_ERROR_RATE_SAMPLES and error_rate >= ERROR_RATE_TO_OPEN)
+        ):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """A call that was let through ended without an outcome (a hedge that lost)."""
+        self._probing = False
+
+
+class ModelBackend:
+    def __init__(
+        self,
+        name: str,
+        client: httpx.AsyncClient,
+        *,
+        batcher: ModelBatcher | None = None,
+        window_size: int = 100,
+        failure_threshold: int = 5,
+        cooldown_seconds: float = 30.0,
+    ) -> None:
+        self.name = name
+        self.client = client
+        self.batcher = batcher
+        self.window = LatencyWindow(window_size)
+        self.breaker = CircuitBreaker(failure_threshold, cooldown_seconds)
+
+    @property
+    def url(self) -> str:
+        return str(self.client.base_url)
+
+    def score(self) -> float:
+        """Expected latency in ms; lower is better."""
+        median = self.window.median()
+        if median is None:
+            # untried backends get tried; ones that only ever failed go last
+            return math.inf if len(self.window) else 0.0
+        return median / max(1.0 - self.window.error_rate, 0.05)
+
+    async def call(self, path: str, key: str | None, body: dict[str, object]) -> Any:
+        if self.batcher is not None and key is not None:
+            return await self.batcher.submit(path, key, body)
+        response = await request_model(self.client, "POST", path, body)
+        return response.json()
+
+    def record(self, latency_ms: float, ok: bool) -> None:
+        was_open = self.breaker.state != "closed"
+        self.window.record(latency_ms, ok)
+        if ok:
+            self.breaker.record_success()
+            if was_open:
+                # the samples from before the outage no longer describe this backend
+                self.window.clear()
+                self.window.record(latency_ms, ok)
+        else:
+            self.breaker.record_failure(self.window.error_rate, len(self.window))
+
+    def status(self) -> AIBackendStatus:
+        return AIBackendStatus(
+            name=self.name,
+            url=self.url,
+            state=self.breaker.state,
+            samples=len(self.window),
+            error_rate=self.window.error_rate,
+            p50_ms=self.window.median(),
+            p95_ms=self.window.percentile(0.95),
+            consecutive_failures=self.breaker.consecutive_failures,
+        )
+
+
+@dataclass(slots=True)
+class ModelRouterStats:
+    calls: int = 0
+    failovers: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    exhausted: int = 0
+
+
+class ModelRouter:
+    """Send each call to the best available backend, failing over (and optionally hedging) to the rest."""
+
+    def __init__(self, backends: list[ModelBackend], *, hedge_after_seconds: float = 0.0) -> None:
+        if not backends:
+            raise ValueError("the router needs at least one backend")
+        self.backends = backends
+        self.hedge_after_seconds = hedge_after_seconds
+        self.stats = ModelRouterStats()
+
+    async def start(self) -> None:
+        for backend in self.backends:
+            if backend.batcher is not None:
+                await backend.batcher.start()
+
+    async def aclose(self) -> None:
+        for backend in self.backends:
+            if backend.batcher is not None:
+                await backend.batcher.stop()
+            await backend.client.aclose()
+
+    def ranked(self) -> list[ModelBackend]:
+        """Backends a call may go to, best first; config order breaks ties."""
+        allowed = [(index, backend) for index, backend in enumerate(self.backends) if backend.breaker.allow()]
+        # a backend back from an open breaker goes first: that call is its probe
+        allowed.sort(key=lambda item: (0.0 if item[1].breaker.state == "half_open" else item[1].score(), item[0]))
+        return [backend for _, backend in allowed]
+
+    async def call(self, path: str, key: str | None, body: dict[str, object]) -> Any:
+        """Decoded JSON answer from the first backend that can give one."""
+        self.stats.calls += 1
+        remaining = self.ranked()
+        error: BaseException | None = None
+        try:
+            while remaining:
+                if error is not None:
+                    self.stats.failovers += 1
+                attempts = {asyncio.create_task(self._attempt(remaining.pop(0), path, key, body))}
+                if self.hedge_after_seconds > 0 and remaining:
+                    done, _ = await asyncio.wait(attempts, timeout=self.hedge_after_seconds)
+                    if not done:
+                        self.stats.hedges += 1
+                        hedge = asyncio.create_task(self._attempt(remaining.pop(0), path, key, body))
+                        hedge.add_done_callback(self._count_hedge_win)
+                        attempts.add(hedge)
+                try:
+                    while attempts:
+                        done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                        for attempt in done:
+                            if attempt.exception() is None:
+                                return attempt.result()
+                            error = attempt.exception()
+                finally:
+                    for attempt in attempts:
+                        attempt.cancel()
+        finally:
+            # breakers that let this call through but were not used stay free for the next one
+            for backend in remaining:
+                backend.breaker.abandon()
+        self.stats.exhausted += 1
+        raise error or ModelUnavailableError("every model backend is unavailable")
+
+    async def _attempt(self, backend: ModelBackend, path: str, key: str | None, body: dict[str, object]) -> Any:
+        started = time.perf_counter()
+        try:
+            result = await backend.call(path, key, body)
+        except asyncio.CancelledError:
+            backend.breaker.abandon()
+            raise
+        except ModelUnavailableError:
+            backend.record((time.perf_counter() - started) * 1000, False)
+            raise
+        except Exception as exc:
+            backend.record((time.perf_counter() - started) * 1000, False)
+            raise ModelUnavailableError(f"{backend.name}: {exc}") from exc
+        backend.record((time.perf_counter() - started) * 1000, True)
+        return result
+
+    def _count_hedge_win(self, attempt: asyncio.Task) -> None:
+        if not attempt.cancelled() and attempt.exception() is None:
+            self.stats.hedge_wins += 1
+
+    def statuses(self) -> list[AIBackendStatus]:
+        return [backend.status() for backend in self.backends]
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            **asdict(self.stats),
+            "backends": [
+                {
+                    **backend.status().model_dump(),
+                    "batcher": backend.batcher.snapshot() if backend.batcher is not None else None,
+                }
+                for backend in self.backends
+            ],
+        }
+
+
+def model_backends(settings: Settings) -> dict[str, str]:
+    """Backends ``AI_MODE=auto`` routes between: ``AI_BACKENDS``, or the one ``AI_MODEL_URL``."""
+    if settings.ai_backends:
+        return dict(settings.ai_backends)
+    return {"local": settings.ai_model_url} if settings.ai_model_url else {}
+
+
+def build_model_router(settings: Settings) -> ModelRouter | None:
+    """The app-wide router, or ``None`` unless ``AI_MODE=auto`` has backends to route between."""
+    if not settings.ai_enabled or settings.ai_mode != "auto":
+        return None
+    backends = []
+    for name, url in model_backends(settings).items():
+        client = build_model_client(settings.model_copy(update={"ai_model_url": url}))
+        assert client is not None
+        backends.append(
+            ModelBackend(
+                name,
+                client,
+                batcher=build_model_batcher(settings, client),
+                window_size=settings.ai_route_window,
+                failure_threshold=settings.ai_breaker_failures,
+                cooldown_seconds=settings.ai_breaker_cooldown_seconds,
+            )
+        )
+    if not backends:
+        return None
+    return ModelRouter(backends, hedge_after_seconds=settings.ai_hedge_after_ms / 1000)
+
+
+__all__ = [
+    "CircuitBreaker",
+    "LatencyWindow",
+    "ModelBackend",
+    "ModelRouter",
+    "ModelRouterStats",
+    "build_model_router",
+    "model_backends",
+]
@@ -0,0 +1,268 @@
+"""Semantic search over stored thoughts for ``/api/ai/search``.
+
+:class:`SemanticSearch` owns a :class:`~enso_api.vectors.VectorIndex` and the
+embedder that fills it. A background task drains the index's queue of new
+and edited thoughts in batches: it reads text the change feed did not carry,
+asks the embedder for vectors and stores them. Queries are embedded the same
+way, ranked by the index and hydrated from the thoughts table, so every
+result carries a real thought id.
+
+Embedders:
+
+* ``hashing`` (default) - :class:`~enso_api.vectors.HashingEmbedder`, offline
+  and deterministic, run in the threadpool;
+* ``model`` - the model runner's ``/api/embed`` route with the request and
+  response shape Ollama uses (``{"model", "input"}`` in,
+  ``{"embeddings"}`` out).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from contextlib import suppress
+from typing import Callable, Mapping, Sequence
+
+import httpx
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..config import Settings
+from ..database import SessionLocal
+from ..domain.ai import AISearchRequest, AISearchResponse, AISearchResult
+from ..domain.thought import ThoughtRead
+from ..repositories.thoughts import ThoughtRepository
+from ..vectors import DEFAULT_PROBES, HashingEmbedder, SearchMode, VectorIndex, thought_text, vector_index_available
+from .ai import ModelUnavailableError, build_model_client, request_model
+
+try:  # pragma: no cover - optional dependency
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+EMBED_PATH = "/api/embed"
+EMBED_BATCH_SIZE = 64
+# pause before retrying after the embedder failed
+RETRY_SECONDS = 5.0
+SNIPPET_CHARS = 200
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class ModelEmbedder:
+    """Embeddings from the model runner; dimensions are whatever the model returns."""
+
+    dimensions: int | None = None
+
+    def __init__(self, client: httpx.AsyncClient, model: str) -> None:
+        self.client = client
+        self.model = model
+        self.signature = f"model:{client.base_url}:{model}"
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        response = await request_model(self.client, "POST", EMBED_PATH, {"model": self.model, "input": list(texts)})
+        payload = response.json()
+        embeddings = payload.get("embeddings") if isinstance(payload, dict) else None
+        if not isinstance(embeddings, list) or len(embeddings) != len(texts):
+            raise ModelUnavailableError(f"model answered {len(texts)} texts with a malformed embedding body")
+        return np.asarray(embeddings, dtype=np.float32)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class LocalEmbedder:
+    """:class:`~enso_api.vectors.HashingEmbedder` off the event loop."""
+
+    def __init__(self, dimensions: int) -> None:
+        self._hashing = HashingEmbedder(dimensions)
+        self.dimensions: int | None = dimensions
+        self.signature = self._hashing.signature
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return await run_in_threadpool(self._hashing.embed, list(texts))
+
+    async def aclose(self) -> None:
+        return None
+
+
+Embedder = ModelEmbedder | LocalEmbedder
+
+
+class SemanticSearch:
+    """Keep the vector index embedded in the background and answer semantic queries from it."""
+
+    def __init__(
+        self,
+        index: VectorIndex,
+        embedder: Embedder,
+        session_factory: Callable[[], Session] = SessionLocal,
+        *,
+        mode: SearchMode = "auto",
+        probes: int = DEFAULT_PROBES,
+        batch_size: int = EMBED_BATCH_SIZE,
+    ) -> None:
+        self.index = index
+        self.embedder = embedder
+        self.mode = mode
+        self.probes = probes
+        self.batch_size = batch_size
+        self.failures = 0
+        self._session_factory = session_factory
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._wake.set()
+        self.index.listener = self._notify
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop embedding; whatever is still queued is picked up again by the next load."""
+        self.index.listener = None
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.embedder.aclose()
+        self.index.close()
+
+    def load(self, session: Session) -> None:
+        """Load the vector index from ``session`` and train it if it has grown enough."""
+        self.index.load(session)
+        self.index.maybe_train()
+
+    def apply(self, changes: Mapping[str, ThoughtRead | None]) -> None:
+        """Change-feed subscriber; see :meth:`VectorIndex.apply`."""
+        self.index.apply(changes)
+
+    async def drain(self) -> None:
+        """Embed everything queued so far."""
+        while await self._embed_next():
+            pass
+
+    async def search(self, payload: AISearchRequest) -> AISearchResponse:
+        started = time.perf_counter()
+        query = payload.query.strip()
+        if not query:
+            return AISearchResponse(results=[], source="vector", latency_ms=0.0)
+        vector = (await self.embedder.embed([query]))[0]
+        # a request may ask for one mode explicitly; anything else means the configured one
+        mode: SearchMode = payload.mode if payload.mode in ("exact", "ivf") else self.mode  # type: ignore[assignment]
+        hits, used = await run_in_threadpool(self.index.search, vector, payload.limit or 5, mode, self.probes)
+        records = await run_in_threadpool(self._read, [thought_id for thought_id, _ in hits])
+        results = [
+            AISearchResult(
+                id=thought_id,
+                title=records[thought_id].title,
+                snippet=_snippet(records[thought_id].content),
+                score=score,
+                metadata={"source": "vector", "mode": used},
+            )
+            for thought_id, score in hits
+            if thought_id in records
+        ]
+        return AISearchResponse(results=results, source="vector", latency_ms=(time.perf_counter() - started) * 1000)
+
+    def _notify(self) -> None:
+        # called from whichever thread committed the write
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self) -> None:
+        assert self._wake is not None
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            try:
+                await self.drain()
+                await run_in_threadpool(self.index.maybe_train)
+            except ModelUnavailableError as error:
+                self.failures += 1
+                logger.warning("Embedding failed (%s); retrying in %.0f s", error, RETRY_SECONDS)
+                await asyncio.sleep(RETRY_SECONDS)
+                self._wake.set()
+
+    async def _embed_next(self) -> bool:
+        batch = self.index.take_pending(self.batch_size)
+        if not batch:
+            return False
+        texts = {thought_id: text for thought_id, text in batch if text is not None}
+        unread = [thought_id for thought_id, text in batch if text is None]
+        if unread:
+            records = await run_in_threadpool(self._read, unread)
+            texts.update((thought_id, thought_text(record.title, record.content)) for thought_id, record in records.items())
+        self.index.drop([thought_id for thought_id, _ in batch if thought_id not in texts])
+        ids = [thought_id for thought_id, _ in batch if thought_id in texts]
+        if not ids:
+            return True
+        try:
+            vectors = await self.embedder.embed([texts[thought_id] for thought_id in ids])
+            await run_in_threadpool(self.index.upsert, ids, [texts[thought_id] for thought_id in ids], vectors)
+        except ModelUnavailableError:
+            self.index.requeue([(thought_id, texts[thought_id]) for thought_id in ids])
+            raise
+        except Exception:
+            # not worth retrying in a loop; the next load queues these thoughts again
+            logger.exception("Could not embed %d thoughts", len(ids))
+            self.index.drop(ids)
+        return True
+
+    def _read(self, thought_ids: list[str]) -> dict[str, ThoughtRead]:
+        if not thought_ids:
+            return {}
+        session = self._session_factory()
+        try:
+            records = ThoughtRepository(session).get_many(thought_ids)
+        finally:
+            session.close()
+        return {record.id: record for record in records if record.deleted_at is None}
+
+
+def _snippet(content: str) -> str:
+    text = _WHITESPACE.sub(" ", content).strip()
+    return text if len(text) <= SNIPPET_CHARS else text[: SNIPPET_CHARS - 1].rstrip() + "…"
+
+
+def resolve_embedder(settings: Settings) -> str:
+    """``AI_EMBEDDER`` when set; otherwise the model runner if one is configured, else local hashing."""
+    if settings.ai_embedder is not None:
+        return settings.ai_embedder
+    return "model" if settings.ai_mode != "stub" and settings.ai_model_url else "hashing"
+
+
+def build_semantic_search(settings: Settings) -> SemanticSearch | None:
+    """The app-wide semantic index, or ``None`` when AI features or the index are off or numpy is missing."""
+    if not settings.ai_enabled or not settings.vector_index:
+        return None
+    if not vector_index_available():
+        logger.warning("VECTOR_INDEX is enabled but numpy is not installed; /api/ai/search is not semantic")
+        return None
+    embedder: Embedder | None = None
+    if resolve_embedder(settings) == "model":
+        client = build_model_client(settings)
+        if client is not None:
+            embedder = ModelEmbedder(client, settings.ai_embedding_model)
+        else:
+            logger.warning("AI_EMBEDDER=model needs a model runner (AI_MODE=%s); embedding locally", settings.ai_mode)
+    if embedder is None:
+        embedder = LocalEmbedder(settings.ai_embedding_dimensions)
+    index = VectorIndex(settings.vector_index_path, signature=embedder.signature, dimensions=embedder.dimensions)
+    return SemanticSearch(index, embedder, mode=settings.vector_search_mode, probes=settings.vector_ivf_probes)  # type: ignore[arg-type]
+
+
+__all__ = ["LocalEmbedder", "ModelEmbedder", "SemanticSearch", "build_semantic_search", "resolve_embedder"]
@@ -0,0 +1,414 @@
+"""In-memory tag dictionary with per-tag bitmaps for tag filters and facet counts.
+
+Tag strings are interned to dense integer ids and thoughts to dense slots.
+Each tag keeps a roaring-style bitmap of the live thoughts that carry it: the
+slot space is cut into chunks of 2**16, and a chunk is stored as a sorted
+``array('H')`` of offsets (two bytes per member) while it holds at most
+``SPARSE_LIMIT`` members and as a 65536-bit ``int`` once it is denser, so rare
+tags stay small and common ones answer ``&``, ``|`` and ``bit_count`` at C
+speed. Tag cardinalities are counted as members come and go, which makes
+unfiltered facets a sort over counters.
+
+Like the link graph index, the tag index is loaded at startup and then follows
+the change feed (:mod:`enso_api.repositories.change_feed`), which also carries
+writes made by other processes: a committed write replaces the tags of each
+thought it touched, and deleted or purged thoughts leave every bitmap. Only
+committed state reaches the bitmaps, so a rolled back ``_replace_tags`` never
+shows up in a filter.
+"""
+
+from __future__ import annotations
+
+import heapq
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from dataclasses import replace
+from typing import Iterable, Iterator, Mapping
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .domain.tags import TagCount, TagFacets, TagFilter, TagIndexStats
+from .domain.thought import ThoughtRead
+from .models import Thought, ThoughtTag
+
+CHUNK_BITS = 16
+CHUNK_BYTES = (1 << CHUNK_BITS) // 8
+OFFSET_MASK = (1 << CHUNK_BITS) - 1
+# sparse chunks cost 2 bytes per member and dense ones 8 KiB, but sparse
+# chunks are walked member by member in Python, so they convert early
+SPARSE_LIMIT = 256
+LOAD_BATCH_SIZE = 10_000
+
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+_BYTE_OFFSETS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+# each byte of a bitmap spread to one 0/1 byte per bit, for counting sparse members with map()
+_BYTE_FLAGS = [bytes(value >> bit & 1 for bit in range(8)) for value in range(256)]
+
+
+class TagBitmap:
+    """Set of slots stored as 2**16-slot chunks, each a sorted array of offsets or an ``int`` bitmap."""
+
+    __slots__ = ("_chunks", "_count")
+
+    def __init__(self) -> None:
+        self._chunks: dict[int, array | int] = {}
+        self._count = 0
+
+    @classmethod
+    def from_slots(cls, slots: Iterable[int]) -> "TagBitmap":
+        grouped: dict[int, list[int]] = {}
+        for slot in slots:
+            grouped.setdefault(slot >> CHUNK_BITS, []).append(slot & OFFSET_MASK)
+        bitmap = cls()
+        for key, offsets in grouped.items():
+            unique = sorted(set(offsets))
+            bitmap._chunks[key] = _dense(unique) if len(unique) > SPARSE_LIMIT else array("H", unique)
+            bitmap._count += len(unique)
+        return bitmap
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, slot: int) -> bool:
+        container = self._chunks.get(slot >> CHUNK_BITS)
+        if container is None:
+            return False
+        offset = slot & OFFSET_MASK
+        if isinstance(container, array):
+            position = bisect_left(container, offset)
+            return position < len(container) and container[position] == offset
+        return bool(container >> offset & 1)
+
+    def add(self, slot: int) -> None:
+        key, offset = slot >> CHUNK_BITS, slot & OFFSET_MASK
+        container = self._chunks.get(key)
+        if container is None:
+            self._chunks[key] = array("H", (offset,))
+        elif isinstance(container, array):
+            position = bisect_left(container, offset)
+            if position < len(container) and container[position] == offset:
+                return
+            container.insert(position, offset)
+            if len(container) > SPARSE_LIMIT:
+                self._chunks[key] = _dense(container)
+        elif container >> offset & 1:
+            return
+        else:
+            self._chunks[key] = container | 1 << offset
+        self._count += 1
+
+    def discard(self, slot: int) -> None:
+        key, offset = slot >> CHUNK_BITS, slot & OFFSET_MASK
+        container = self._chunks.get(key)
+        if container is None:
+            return
+        if isinstance(container, array):
+            position = bisect_left(container, offset)
+            if position == len(container) or container[position] != offset:
+                return
+            del container[position]
+            if not container:
+                del self._chunks[key]
+        elif not container >> offset & 1:
+            return
+        else:
+            container ^= 1 << offset
+            members = container.bit_count()
+            # half the limit, so a chunk on the boundary does not flip back and forth
+            if members <= SPARSE_LIMIT // 2:
+                sparse = array("H", _offsets(container))
+                if sparse:
+                    self._chunks[key] = sparse
+                else:
+                    del self._chunks[key]
+            else:
+                self._chunks[key] = container
+        self._count -= 1
+
+    def chunk(self, key: int) -> int | None:
+        """The chunk at ``key`` as an ``int`` bitmap, or ``None`` when it is empty."""
+        container = self._chunks.get(key)
+        if container is None or isinstance(container, int):
+            return container
+        return _dense(container)
+
+    def dense(self) -> dict[int, int]:
+        return {key: self.chunk(key) for key in self._chunks}
+
+    def count_within(self, mask: Mapping[int, int], mask_flags: Mapping[int, bytes]) -> int:
+        """Members that are also in ``mask``; ``mask_flags`` holds the same chunks as one 0/1 byte per slot."""
+        total = 0
+        for key, container in self._chunks.items():
+            bits = mask.get(key)
+            if bits is None:
+                continue
+            if isinstance(container, array):
+                total += sum(map(mask_flags[key].__getitem__, container))
+            else:
+                total += (container & bits).bit_count()
+        return total
+
+    def layout(self) -> tuple[int, int, int]:
+        """``(sparse chunks, dense chunks, approximate bytes)``."""
+        sparse = dense = size = 0
+        for container in self._chunks.values():
+            if isinstance(container, array):
+                sparse += 1
+            else:
+                dense += 1
+            size += sys.getsizeof(container)
+        return sparse, dense, size
+
+
+class TagIndex:
+    """Thread-safe tag dictionary and bitmaps over live thoughts, kept current by committed writes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ids: list[str] = []
+        self._slots: dict[str, int] = {}
+        self._slot_tags: list[tuple[int, ...]] = []
+        self._names: list[str] = []
+        self._tag_ids: dict[str, int] = {}
+        self._bitmaps: list[TagBitmap] = []
+        self._live = TagBitmap()
+        # changes delivered while a load is running, replayed on top of it
+        self._backlog: dict[str, ThoughtRead | None] | None = None
+
+    def tag_id(self, tag: str) -> int | None:
+        """Interned id of ``tag``; ids are stable for the life of the index."""
+        return self._tag_ids.get(tag)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def load(self, session: Session) -> None:
+        """Replace the contents of the index with the tags of the live thoughts currently stored."""
+        with self._lock:
+            self._backlog = {}
+        ids: list[str] = []
+        slots: dict[str, int] = {}
+        thoughts = select(Thought.id).where(Thought.deleted_at.is_(None)).execution_options(yield_per=LOAD_BATCH_SIZE)
+        for partition in session.execute(thoughts).partitions():
+            for (thought_id,) in partition:
+                slots[thought_id] = len(ids)
+                ids.append(thought_id)
+
+        names: list[str] = []
+        tag_ids: dict[str, int] = {}
+        members: list[list[int]] = []
+        tagged: dict[int, list[int]] = {}
+        rows = (
+            select(ThoughtTag.thought_id, ThoughtTag.tag)
+            .join(Thought, Thought.id == ThoughtTag.thought_id)
+            .where(Thought.deleted_at.is_(None))
+            .execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        for partition in session.execute(rows).partitions():
+            for thought_id, tag in partition:
+                slot = slots.get(thought_id)
+                if slot is None:
+                    continue
+                tag_id = tag_ids.get(tag)
+                if tag_id is None:
+                    tag_id = tag_ids[tag] = len(names)
+                    names.append(tag)
+                    members.append([])
+                members[tag_id].append(slot)
+                tagged.setdefault(slot, []).append(tag_id)
+
+        slot_tags: list[tuple[int, ...]] = [()] * len(ids)
+        for slot, slot_tag_ids in tagged.items():
+            slot_tags[slot] = tuple(slot_tag_ids)
+        bitmaps = [TagBitmap.from_slots(tag_members) for tag_members in members]
+        live = TagBitmap.from_slots(range(len(ids)))
+
+        with self._lock:
+            self._ids, self._slots, self._slot_tags = ids, slots, slot_tags
+            self._names, self._tag_ids, self._bitmaps, self._live = names, tag_ids, bitmaps, live
+            backlog, self._backlog = self._backlog, None
+            self._apply(backlog or {})
+
+    def apply(self, changes: Mapping[str, ThoughtRead | None]) -> None:
+        """Change feed subscriber: replace the tags of every committed thought."""
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.update(changes)
+            self._apply(changes)
+
+    def _apply(self, changes: Mapping[str, ThoughtRead | None]) -> None:
+        for thought_id, record in changes.items():
+            if record is None or record.deleted_at is not None:
+                slot = self._slots.get(thought_id)
+                if slot is not None:
+                    self._retag(slot, ())
+                    self._live.discard(slot)
+                continue
+            slot = self._slot(thought_id)
+            self._retag(slot, tuple(self._intern(tag) for tag in record.tags))
+            self._live.add(slot)
+
+    def _slot(self, thought_id: str) -> int:
+        slot = self._slots.get(thought_id)
+        if slot is None:
+            slot = self._slots[thought_id] = len(self._ids)
+            self._ids.append(thought_id)
+            self._slot_tags.append(())
+        return slot
+
+    def _intern(self, tag: str) -> int:
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_ids[tag] = len(self._names)
+            self._names.append(tag)
+            self._bitmaps.append(TagBitmap())
+        return tag_id
+
+    def _retag(self, slot: int, tag_ids: tuple[int, ...]) -> None:
+        previous = self._slot_tags[slot]
+        for tag_id in previous:
+            if tag_id not in tag_ids:
+                self._bitmaps[tag_id].discard(slot)
+        for tag_id in tag_ids:
+            if tag_id not in previous:
+                self._bitmaps[tag_id].add(slot)
+        self._slot_tags[slot] = tag_ids
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def count(self, tag_filter: TagFilter) -> int:
+        with self._lock:
+            return sum(bits.bit_count() for bits in self._evaluate(tag_filter).values())
+
+    def narrow(self, tag_filter: TagFilter, max_ids: int) -> TagFilter:
+        """Attach the matching thought ids to ``tag_filter`` when there are between one and ``max_ids`` of them.
+
+        Filters naming a tag the index has not seen, or matching nothing, are
+        left to SQL: a write this process has not caught up with yet may have
+        added the tag.
+        """
+        with self._lock:
+            if any(tag not in self._tag_ids for tag in (*tag_filter.all_of, *tag_filter.any_of, *tag_filter.none_of)):
+                return tag_filter
+            matched = self._evaluate(tag_filter)
+            if not 0 < sum(bits.bit_count() for bits in matched.values()) <= max_ids:
+                return tag_filter
+            ids = tuple(
+                self._ids[key << CHUNK_BITS | offset] for key in sorted(matched) for offset in _offsets(matched[key])
+            )
+        return replace(tag_filter, thought_ids=ids)
+
+    def facets(self, tag_filter: TagFilter | None = None, limit: int = 50) -> TagFacets:
+        """Most used tags among the live thoughts matching ``tag_filter``, by count then name."""
+        with self._lock:
+            if tag_filter is None:
+                total = len(self._live)
+                counts = [(len(bitmap), tag_id) for tag_id, bitmap in enumerate(self._bitmaps) if len(bitmap)]
+            else:
+                mask = self._evaluate(tag_filter)
+                mask_flags = {key: _flags(bits) for key, bits in mask.items()}
+                total = sum(bits.bit_count() for bits in mask.values())
+                counts = []
+                if mask:
+                    for tag_id, bitmap in enumerate(self._bitmaps):
+                        if len(bitmap) and (within := bitmap.count_within(mask, mask_flags)):
+                            counts.append((within, tag_id))
+            top = heapq.nsmallest(limit, counts, key=lambda entry: (-entry[0], self._names[entry[1]]))
+            return TagFacets(total=total, tags=[TagCount(tag=self._names[tag_id], count=count) for count, tag_id in top])
+
+    def stats(self) -> TagIndexStats:
+        with self._lock:
+            sparse = dense = size = memberships = tags = 0
+            for bitmap in (*self._bitmaps, self._live):
+                chunk_sparse, chunk_dense, chunk_bytes = bitmap.layout()
+                sparse, dense, size = sparse + chunk_sparse, dense + chunk_dense, size + chunk_bytes
+            for bitmap in self._bitmaps:
+                memberships += len(bitmap)
+                tags += bool(len(bitmap))
+            return TagIndexStats(
+                thoughts=len(self._ids),
+                live_thoughts=len(self._live),
+                tags=tags,
+                memberships=memberships,
+                sparse_chunks=sparse,
+                dense_chunks=dense,
+                bitmap_bytes=size,
+            )
+
+    def _evaluate(self, tag_filter: TagFilter) -> dict[int, int]:
+        """Chunks of the slots matching ``tag_filter``, as ``int`` bitmaps."""
+        required = [self._bitmap(tag) for tag in tag_filter.all_of]
+        if any(bitmap is None for bitmap in required):
+            return {}
+        result: dict[int, int] | None = None
+        # smallest first, so the running intersection shrinks as early as possible
+        for bitmap in sorted(required, key=len):
+            result = bitmap.dense() if result is None else _intersect(result, bitmap)
+        if tag_filter.any_of:
+            union: dict[int, int] = {}
+            for tag in tag_filter.any_of:
+                bitmap = self._bitmap(tag)
+                if bitmap is not None:
+                    for key, bits in bitmap.dense().items():
+                        union[key] = union.get(key, 0) | bits
+            if result is None:
+                result = union
+            else:
+                result = {key: bits & union[key] for key, bits in result.items() if key in union and bits & union[key]}
+        if result is None:
+            result = self._live.dense()
+        for tag in tag_filter.none_of:
+            bitmap = self._bitmap(tag)
+            if bitmap is not None:
+                result = _subtract(result, bitmap)
+        return result
+
+    def _bitmap(self, tag: str) -> TagBitmap | None:
+        tag_id = self._tag_ids.get(tag)
+        return self._bitmaps[tag_id] if tag_id is not None else None
+
+
+def _dense(offsets: Iterable[int]) -> int:
+    data = bytearray(CHUNK_BYTES)
+    for offset in offsets:
+        data[offset >> 3] |= 1 << (offset & 7)
+    return int.from_bytes(data, "little")
+
+
+def _flags(bits: int) -> bytes:
+    return b"".join(map(_BYTE_FLAGS.__getitem__, bits.to_bytes(CHUNK_BYTES, "little")))
+
+
+def _offsets(bits: int) -> Iterator[int]:
+    data = bits.to_bytes(CHUNK_BYTES, "little")
+    for match in _NONZERO_BYTE.finditer(data):
+        base = match.start() << 3
+        for bit in _BYTE_OFFSETS[data[match.start()]]:
+            yield base | bit
+
+
+def _intersect(left: dict[int, int], right: TagBitmap) -> dict[int, int]:
+    result: dict[int, int] = {}
+    for key, bits in left.items():
+        other = right.chunk(key)
+        if other is not None and bits & other:
+            result[key] = bits & other
+    return result
+
+
+def _subtract(left: dict[int, int], right: TagBitmap) -> dict[int, int]:
+    result: dict[int, int] = {}
+    for key, bits in left.items():
+        other = right.chunk(key)
+        remaining = bits & ~other if other is not None else bits
+        if remaining:
+            result[key] = remaining
+    return result
+
+
+__all__ = ["TagBitmap", "TagIndex"]
@@ -0,0 +1,647 @@
+"""Embedding index over thought text for semantic search.
+
+Each live thought owns a slot in a float32 matrix of unit-length embeddings of
+its title and content. With a ``path`` the matrix is a ``numpy.memmap`` under
+that directory (``vectors.f32`` next to ``digests.u64``, ``ids.jsonl`` and a
+``manifest.json`` naming the embedder), so embeddings survive restarts and the
+operating system pages in only the rows a query touches. At load the stored
+rows are matched to the thoughts table by id and a BLAKE2 digest of the
+embedded text: rows that still match are kept, everything else is queued for
+embedding. Without a path the same arrays live in memory.
+
+The index follows the change feed (:mod:`enso_api.repositories.change_feed`),
+writes from other processes included, without doing I/O under its lock:
+deletes and purges drop a slot at once, new or edited text is queued (text
+that is already stored or being embedded is not queued again), and
+:class:`~enso_api.services.semantic.SemanticSearch` embeds the queue in the
+background and hands the vectors back through :meth:`VectorIndex.upsert`.
+
+Queries are scored by cosine similarity. ``exact`` multiplies the query into
+the matrix block by block and keeps a running top-k. ``ivf`` clusters the
+vectors with spherical k-means into about ``sqrt(n)`` lists once there are
+``ivf_min_vectors`` of them, and only scores the lists whose centroids are
+closest to the query; vectors written after the lists were built are kept in
+an overlay until enough pile up. ``auto`` uses ``ivf`` when it is trained.
+
+numpy is optional (the ``graph`` extra); without it no index is built and
+``/api/ai/search`` keeps its previous behaviour.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Callable, Literal, Mapping, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .domain.ai import VectorIndexStats
+from .domain.thought import ThoughtRead
+from .models import Thought
+
+try:  # pragma: no cover - optional dependency
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+SearchMode = Literal["auto", "exact", "ivf"]
+
+INITIAL_CAPACITY = 1024
+LOAD_BATCH_SIZE = 10_000
+# rows multiplied per step of an exact scan
+BLOCK_ROWS = 65_536
+# rows compared with every centroid per step of k-means or list assignment
+ASSIGN_BLOCK_ROWS = 4096
+IVF_MIN_VECTORS = 20_000
+IVF_MIN_LISTS = 16
+IVF_MAX_LISTS = 4096
+IVF_SAMPLES_PER_LIST = 64
+IVF_MAX_SAMPLE = 131_072
+IVF_ITERATIONS = 10
+# overlay slots kept beside the inverted lists before they are rebuilt
+IVF_REBUILD_THRESHOLD = 16_384
+# the lists are retrained once the corpus has grown this many times over
+IVF_RETRAIN_GROWTH = 4
+DEFAULT_PROBES = 8
+# text beyond this many characters is not embedded
+EMBED_TEXT_LIMIT = 8192
+# in-flight markers next to text digests (which are unsigned): text still to be read, result superseded
+_UNREAD = -1
+_STALE = -2
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def thought_text(title: str, content: str) -> str:
+    """What a thought's embedding is computed from."""
+    return f"{title}\n\n{content}"[:EMBED_TEXT_LIMIT]
+
+
+def text_digest(text: str) -> int:
+    """64-bit digest of embedded text; never 0, which marks a slot without a vector."""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little") or 1
+
+
+class HashingEmbedder:
+    """Deterministic offline embedder: signed feature hashing of words and word pairs.
+
+    It knows nothing about meaning, only shared vocabulary, but needs no model
+    runner and gives the same vector for the same text in every process.
+    """
+
+    def __init__(self, dimensions: int = 256) -> None:
+        if np is None:
+            raise RuntimeError("the hashing embedder requires numpy (install enso-backend[graph])")
+        self.dimensions = dimensions
+        self.signature = f"hashing-v1:{dimensions}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows: list[int] = []
+        features: list[int] = []
+        for row, text in enumerate(texts):
+            tokens = _TOKEN_PATTERN.findall(text.lower())
+            for feature in (*tokens, *(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))):
+                rows.append(row)
+                features.append(zlib.crc32(feature.encode()))
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        if features:
+            hashed = np.array(features, dtype=np.uint32)
+            signs = np.where(hashed & 0x80000000, np.float32(-1.0), np.float32(1.0))
+            np.add.at(vectors, (np.array(rows), (hashed & 0x7FFFFFFF) % self.dimensions), signs)
+        # dampen repeated words the way sublinear tf does
+        np.copyto(vectors, np.sign(vectors) * np.log1p(np.abs(vectors)))
+        return vectors
+
+
+class _InvertedLists:
+    """Trained IVF state: centroids plus slots grouped by list, CSR style."""
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, trained_on: int) -> None:
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.trained_on = trained_on
+
+
+class VectorIndex:
+    """Thread-safe slot matrix of thought embeddings, kept current by committed writes."""
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        *,
+        signature: str,
+        dimensions: int | None = None,
+        ivf_min_vectors: int = IVF_MIN_VECTORS,
+    ) -> None:
+        if np is None:
+            raise RuntimeError("the vector index requires numpy (install enso-backend[graph])")
+        self.path = Path(path) if path is not None else None
+        self.signature = signature
+        self.dimensions = dimensions
+        self.ivf_min_vectors = ivf_min_vectors
+        self.embedded = 0
+        self.exact_searches = 0
+        self.ivf_searches = 0
+        self._lock = threading.Lock()
+        self._ids: list[str] = []
+        self._slots: dict[str, int] = {}
+        self._matrix: np.ndarray | None = None
+        self._digests = np.zeros(0, dtype=np.uint64)
+        self._live = np.zeros(0, dtype=bool)
+        self._assignment = np.zeros(0, dtype=np.int32)
+        self._ids_file = None
+        # thought id -> text to embed, or None to read it from the database
+        self._pending: dict[str, str | None] = {}
+        # ids handed out by take_pending -> digest of the text being embedded, _UNREAD,
+        # or _STALE once a newer write makes the result stale
+        self._in_flight: dict[str, int] = {}
+        self._backlog: dict[str, ThoughtRead | None] | None = None
+        self._ivf: _InvertedLists | None = None
+        self._recent: set[int] = set()
+        self._training_writes: set[int] | None = None
+        # called (under the lock, without I/O) whenever text is queued for embedding
+        self.listener: Callable[[], None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def load(self, session: Session) -> None:
+        """Match stored embeddings to the live thoughts; queue the ones that are missing or stale."""
+        with self._lock:
+            self._backlog = {}
+        stored_ids, stored_digests, stored_matrix = self._read_store()
+        stored_slots = {thought_id: slot for slot, thought_id in enumerate(stored_ids)}
+
+        ids: list[str] = []
+        digests = []
+        copy_from: list[int] = []
+        copy_to: list[int] = []
+        stale: list[str] = []
+        thoughts = (
+            select(Thought.id, Thought.title, Thought.content)
+            .where(Thought.deleted_at.is_(None))
+            .execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        for partition in session.execute(thoughts).partitions():
+            for thought_id, title, content in partition:
+                digest = text_digest(thought_text(title, content))
+                previous = stored_slots.get(thought_id)
+                if previous is not None and int(stored_digests[previous]) == digest:
+                    copy_from.append(previous)
+                    copy_to.append(len(ids))
+                    digests.append(digest)
+                else:
+                    stale.append(thought_id)
+                    digests.append(0)
+                ids.append(thought_id)
+
+        capacity = _capacity_for(len(ids))
+        matrix, digest_array = self._create_store(capacity, ids)
+        digest_array[: len(ids)] = np.array(digests, dtype=np.uint64)
+        if matrix is not None and copy_from:
+            source, target = np.array(copy_from), np.array(copy_to)
+            for start in range(0, len(source), BLOCK_ROWS):
+                matrix[target[start : start + BLOCK_ROWS]] = stored_matrix[source[start : start + BLOCK_ROWS]]
+        del stored_matrix
+
+        with self._lock:
+            self._close_store()
+            ids_file = self._swap_store()
+            self._ids = ids
+            self._slots = {thought_id: slot for slot, thought_id in enumerate(ids)}
+            self._matrix, self._digests, self._ids_file = matrix, digest_array, ids_file
+            self._live = np.zeros(capacity, dtype=bool)
+            self._live[: len(ids)] = digest_array[: len(ids)] != 0
+            self._assignment = np.full(capacity, -1, dtype=np.int32)
+            self._ivf, self._recent = None, set()
+            self._pending = dict.fromkeys(stale)
+            self._in_flight.clear()
+            backlog, self._backlog = self._backlog, None
+            self._apply(backlog or {})
+            self._notify()
+
+    def apply(self, changes: Mapping[str, ThoughtRead | None]) -> None:
+        """Change feed subscriber: drop deleted thoughts and queue changed text for embedding."""
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.update(changes)
+            self._apply(changes)
+            self._notify()
+
+    def take_pending(self, limit: int) -> list[tuple[str, str | None]]:
+        """Up to ``limit`` queued ``(id, text)`` pairs; ``text`` is None when it has to be read."""
+        with self._lock:
+            taken = []
+            for thought_id in list(itertools.islice(self._pending, limit)):
+                text = self._pending.pop(thought_id)
+                taken.append((thought_id, text))
+                self._in_flight[thought_id] = _UNREAD if text is None else text_digest(text)
+            return taken
+
+    def requeue(self, items: Sequence[tuple[str, str | None]]) -> None:
+        """Put back items whose embedding failed, unless a newer write already replaced them."""
+        with self._lock:
+            for thought_id, text in items:
+                if self._in_flight.pop(thought_id, _STALE) != _STALE and thought_id not in self._pending:
+                    self._pending[thought_id] = text
+
+    def upsert(self, ids: Sequence[str], texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Store the embeddings of ``texts``; results a newer write made stale while in flight are dropped."""
+        vectors = _normalized(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            if self._matrix is None:
+                self.dimensions = self.dimensions or vectors.shape[1]
+                self._allocate(max(INITIAL_CAPACITY, len(self._live)))
+            if vectors.shape[1] != self.dimensions:
+                raise ValueError(f"expected {self.dimensions}-dimensional embeddings, got {vectors.shape[1]}")
+            for thought_id, text, vector in zip(ids, texts, vectors):
+                if self._in_flight.pop(thought_id, None) == _STALE:
+                    continue
+                slot = self._slot(thought_id)
+                self._matrix[slot] = vector
+                self._digests[slot] = text_digest(text)
+                self._live[slot] = True
+                self._assign(slot)
+                self.embedded += 1
+            if self._ivf is not None and len(self._recent) >= IVF_REBUILD_THRESHOLD:
+                self._rebuild_lists()
+
+    def drop(self, ids: Sequence[str]) -> None:
+        """Forget in-flight ids whose thoughts turned out to be gone."""
+        with self._lock:
+            for thought_id in ids:
+                if self._in_flight.pop(thought_id, _STALE) != _STALE:
+                    slot = self._slots.get(thought_id)
+                    if slot is not None:
+                        self._live[slot] = False
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending) + len(self._in_flight)
+
+    def maybe_train(self) -> bool:
+        """(Re)build the inverted lists when the corpus is big enough or has outgrown them."""
+        with self._lock:
+            live = int(np.count_nonzero(self._live[: len(self._ids)]))
+            trained_on = self._ivf.trained_on if self._ivf is not None else 0
+            if live < self.ivf_min_vectors or (trained_on and live < IVF_RETRAIN_GROWTH * trained_on):
+                return False
+        self.train()
+        return True
+
+    def train(self, lists: int | None = None) -> None:
+        """Cluster the live vectors with spherical k-means and rebuild the inverted lists."""
+        with self._lock:
+            if self._matrix is None:
+                return
+            size = len(self._ids)
+            matrix = self._matrix
+            live_slots = np.flatnonzero(self._live[:size])
+            self._training_writes = set()
+        try:
+            if len(live_slots) == 0:
+                return
+            count = lists or int(min(IVF_MAX_LISTS, max(IVF_MIN_LISTS, math.sqrt(len(live_slots)))))
+            count = min(count, len(live_slots))
+            rng = np.random.default_rng(0)
+            sample_size = min(len(live_slots), IVF_MAX_SAMPLE, IVF_SAMPLES_PER_LIST * count)
+            sample = np.asarray(matrix[np.sort(rng.choice(live_slots, sample_size, replace=False))])
+            centroids = _spherical_kmeans(sample, count, rng)
+            assignment = np.full(size, -1, dtype=np.int32)
+            for start in range(0, len(live_slots), ASSIGN_BLOCK_ROWS):
+                block = live_slots[start : start + ASSIGN_BLOCK_ROWS]
+                assignment[block] = _nearest(np.asarray(matrix[block]), centroids)
+        except BaseException:
+            with self._lock:
+                self._training_writes = None
+            raise
+
+        with self._lock:
+            written, self._training_writes = self._training_writes or set(), None
+            grown = np.full(len(self._live), -1, dtype=np.int32)
+            grown[:size] = assignment
+            self._assignment = grown
+            self._ivf = _InvertedLists(centroids, np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64), len(live_slots))
+            self._recent = set()
+            self._rebuild_lists()
+            for slot in written:
+                self._assign(slot)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_store()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def search(
+        self, query: np.ndarray, limit: int = 10, mode: SearchMode = "auto", probes: int = DEFAULT_PROBES
+    ) -> tuple[list[tuple[str, float]], str]:
+        """The ``limit`` live thoughts most similar to ``query`` as ``(id, cosine)``, and the mode used."""
+        query = _normalized(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            size = len(self._ids)
+            matrix, ids, ivf = self._matrix, self._ids, self._ivf
+            live = self._live[:size].copy()
+            if matrix is None or size == 0:
+                return [], "exact"
+            if query.shape[0] != self.dimensions:
+                raise ValueError(f"expected a {self.dimensions}-dimensional query, got {query.shape[0]}")
+            use_ivf = ivf is not None and mode != "exact"
+            if use_ivf:
+                # single slots are reassigned in place; a stale read only moves one candidate
+                assignment = self._assignment
+                recent = np.fromiter(self._recent, dtype=np.int64, count=len(self._recent))
+                self.ivf_searches += 1
+            else:
+                self.exact_searches += 1
+
+        if use_ivf:
+            candidates = _probe(ivf, assignment, recent, query, probes)
+            candidates = candidates[live[candidates]]
+            scores = np.asarray(matrix[candidates]) @ query
+            best = _top(scores, limit)
+            return [(ids[candidates[i]], float(scores[i])) for i in best], "ivf"
+
+        found_slots: list[np.ndarray] = []
+        found_scores: list[np.ndarray] = []
+        for start in range(0, size, BLOCK_ROWS):
+            stop = min(size, start + BLOCK_ROWS)
+            scores = np.asarray(matrix[start:stop]) @ query
+            scores[~live[start:stop]] = -np.inf
+            best = _top(scores, limit)
+            found_slots.append(best + start)
+            found_scores.append(scores[best])
+        slots, scores = np.concatenate(found_slots), np.concatenate(found_scores)
+        best = _top(scores, limit)
+        return [(ids[slots[i]], float(scores[i])) for i in best if np.isfinite(scores[i])], "exact"
+
+    def stats(self) -> VectorIndexStats:
+        with self._lock:
+            size = len(self._ids)
+            return VectorIndexStats.model_construct(
+                vectors=size,
+                live_vectors=int(np.count_nonzero(self._live[:size])),
+                dimensions=self.dimensions,
+                pending=len(self._pending) + len(self._in_flight),
+                embedded=self.embedded,
+                matrix_bytes=int(self._matrix.nbytes) if self._matrix is not None else 0,
+                memory_mapped=self.path is not None,
+                signature=self.signature,
+                ivf_lists=len(self._ivf.centroids) if self._ivf is not None else None,
+                ivf_trained_on=self._ivf.trained_on if self._ivf is not None else None,
+                ivf_overlay=len(self._recent),
+                exact_searches=self.exact_searches,
+                ivf_searches=self.ivf_searches,
+            )
+
+    # ------------------------------------------------------------------
+    # Internal helpers; callers hold the lock
+    # ------------------------------------------------------------------
+    def _apply(self, changes: Mapping[str, ThoughtRead | None]) -> None:
+        for thought_id, record in changes.items():
+            text: str | None = None
+            digest: int | None = None
+            if record is not None and record.deleted_at is None:
+                text = thought_text(record.title, record.content)
+                digest = text_digest(text)
+            if thought_id in self._in_flight:
+                if self._in_flight[thought_id] == digest:
+                    # the same text again (the change log repeats local writes): the embedding under way holds
+                    continue
+                self._in_flight[thought_id] = _STALE
+            slot = self._slots.get(thought_id)
+            if text is None:
+                self._pending.pop(thought_id, None)
+                if slot is not None:
+                    self._live[slot] = False
+                continue
+            if slot is not None and int(self._digests[slot]) == digest:
+                # restored, or only tags or links changed: the stored vector still holds
+                self._pending.pop(thought_id, None)
+                self._live[slot] = True
+                continue
+            self._pending[thought_id] = text
+
+    def _notify(self) -> None:
+        if self._pending and self.listener is not None:
+            self.listener()
+
+    def _slot(self, thought_id: str) -> int:
+        slot = self._slots.get(thought_id)
+        if slot is not None:
+            return slot
+        slot = len(self._ids)
+        if slot >= len(self._live):
+            self._allocate(2 * len(self._live))
+        self._ids.append(thought_id)
+        self._slots[thought_id] = slot
+        if self._ids_file is not None:
+            self._ids_file.write(json.dumps(thought_id) + "\n")
+            self._ids_file.flush()
+        return slot
+
+    def _assign(self, slot: int) -> None:
+        if self._training_writes is not None:
+            self._training_writes.add(slot)
+        if self._ivf is not None:
+            self._assignment[slot] = _nearest(self._matrix[slot : slot + 1], self._ivf.centroids)[0]
+            self._recent.add(slot)
+
+    def _rebuild_lists(self) -> None:
+        assert self._ivf is not None
+        size = len(self._ids)
+        assignment = self._assignment[:size]
+        listed = np.flatnonzero(assignment >= 0)
+        order = listed[np.argsort(assignment[listed], kind="stable")]
+        counts = np.bincount(assignment[listed], minlength=len(self._ivf.centroids))
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        self._ivf = _InvertedLists(self._ivf.centroids, order, offsets, self._ivf.trained_on)
+        self._recent = set()
+
+    def _allocate(self, capacity: int) -> None:
+        """Grow every per-slot array to ``capacity`` rows, keeping their contents."""
+        size = len(self._ids)
+        live = np.zeros(capacity, dtype=bool)
+        live[:size] = self._live[:size]
+        assignment = np.full(capacity, -1, dtype=np.int32)
+        assignment[:size] = self._assignment[:size]
+        self._live, self._assignment = live, assignment
+        if self.dimensions is None:
+            self._digests = np.zeros(capacity, dtype=np.uint64)
+            return
+        if self.path is None:
+            matrix = np.zeros((capacity, self.dimensions), dtype=np.float32)
+            digests = np.zeros(capacity, dtype=np.uint64)
+            if self._matrix is not None:
+                matrix[:size] = self._matrix[:size]
+            digests[:size] = self._digests[:size]
+            self._matrix, self._digests = matrix, digests
+            return
+        if self._matrix is None:
+            # first vectors of an index whose dimensions were unknown until now
+            self._write_manifest()
+        self._matrix = _resize_memmap(self.path / "vectors.f32", np.float32, (capacity, self.dimensions), self._matrix)
+        self._digests = _resize_memmap(self.path / "digests.u64", np.uint64, (capacity,), self._digests)
+
+    def _read_store(self) -> tuple[list[str], np.ndarray, np.ndarray | None]:
+        """Ids, digests and matrix left by a previous run with the same embedder, if any."""
+        empty: tuple[list[str], np.ndarray, np.ndarray | None] = ([], np.zeros(0, dtype=np.uint64), None)
+        if self.path is None:
+            return empty
+        try:
+            manifest = json.loads((self.path / "manifest.json").read_text())
+            if manifest.get("signature") != self.signature:
+                return empty
+            dimensions = int(manifest["dimensions"])
+            with open(self.path / "ids.jsonl", encoding="utf-8") as handle:
+                ids = [json.loads(line) for line in handle if line.endswith("\n")]
+            digests = np.memmap(self.path / "digests.u64", dtype=np.uint64, mode="r")
+            matrix = np.memmap(self.path / "vectors.f32", dtype=np.float32, mode="r").reshape(-1, dimensions)
+        except (OSError, ValueError, KeyError):
+            return empty
+        # rows past the shortest file were never completely written
+        usable = min(len(ids), len(digests), len(matrix))
+        self.dimensions = self.dimensions or dimensions
+        if dimensions != self.dimensions:
+            return empty
+        return ids[:usable], digests[:usable], matrix
+
+    def _create_store(self, capacity: int, ids: list[str]) -> tuple[np.ndarray | None, np.ndarray]:
+        """Fresh matrix and digests for a load; file-backed ones are written aside until :meth:`_swap_store`."""
+        if self.path is None:
+            matrix = np.zeros((capacity, self.dimensions), dtype=np.float32) if self.dimensions else None
+            return matrix, np.zeros(capacity, dtype=np.uint64)
+        self.path.mkdir(parents=True, exist_ok=True)
+        digests = _resize_memmap(self.path / "digests.u64.new", np.uint64, (capacity,), None)
+        matrix = None
+        if self.dimensions:
+            matrix = _resize_memmap(self.path / "vectors.f32.new", np.float32, (capacity, self.dimensions), None)
+        with open(self.path / "ids.jsonl.new", "w", encoding="utf-8") as handle:
+            handle.writelines(json.dumps(thought_id) + "\n" for thought_id in ids)
+        return matrix, digests
+
+    def _swap_store(self):  # noqa: ANN202
+        """Move the files written by :meth:`_create_store` into place; returns the ids file for appending."""
+        if self.path is None:
+            return None
+        # the new memmaps keep pointing at the renamed files
+        for name in ("vectors.f32", "digests.u64", "ids.jsonl"):
+            if (self.path / f"{name}.new").exists():
+                os.replace(self.path / f"{name}.new", self.path / name)
+            else:
+                (self.path / name).unlink(missing_ok=True)
+        if self.dimensions:
+            self._write_manifest()
+        else:
+            (self.path / "manifest.json").unlink(missing_ok=True)
+        return open(self.path / "ids.jsonl", "a", encoding="utf-8")  # noqa: SIM115
+
+    def _write_manifest(self) -> None:
+        assert self.path is not None
+        manifest = {"signature": self.signature, "dimensions": self.dimensions}
+        (self.path / "manifest.json").write_text(json.dumps(manifest))
+
+    def _close_store(self) -> None:
+        if isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+        if isinstance(self._digests, np.memmap):
+            self._digests.flush()
+        if self._ids_file is not None:
+            self._ids_file.close()
+            self._ids_file = None
+
+
+def _capacity_for(count: int) -> int:
+    return max(INITIAL_CAPACITY, 1 << max(0, count - 1).bit_length())
+
+
+def _resize_memmap(path: Path, dtype: type, shape: tuple[int, ...], current: np.ndarray | None) -> np.ndarray:
+    """Open ``path`` as a writable memmap of ``shape``, growing the file; existing bytes are kept."""
+    if current is not None and isinstance(current, np.memmap):
+        current.flush()
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    with open(path, "ab") as handle:
+        if handle.tell() < size:
+            handle.truncate(size)
+    return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _top(scores: np.ndarray, limit: int) -> np.ndarray:
+    """Positions of the ``limit`` highest scores, best first."""
+    if limit < len(scores):
+        best = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        best = np.arange(len(scores))
+    return best[np.argsort(-scores[best], kind="stable")]
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+
+
+def _spherical_kmeans(sample: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = sample[rng.choice(len(sample), count, replace=False)].copy()
+    for _ in range(IVF_ITERATIONS):
+        assignment = np.concatenate(
+            [
+                _nearest(sample[start : start + ASSIGN_BLOCK_ROWS], centroids)
+                for start in range(0, len(sample), ASSIGN_BLOCK_ROWS)
+            ]
+        )
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=count)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        sums = np.add.reduceat(sample[order], starts[filled], axis=0)
+        centroids[filled] = sums
+        # an empty list restarts from a random sample vector
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = _normalized(centroids)
+    return centroids
+
+
+def _probe(ivf: _InvertedLists, assignment: np.ndarray, recent: np.ndarray, query: np.ndarray, probes: int) -> np.ndarray:
+    """Slots in the ``probes`` lists nearest to ``query``, overlay included."""
+    closest = _top(ivf.centroids @ query, min(probes, len(ivf.centroids)))
+    listed = [ivf.order[ivf.offsets[item] : ivf.offsets[item + 1]] for item in closest]
+    candidates = np.concatenate([*listed, recent]) if listed or len(recent) else np.zeros(0, dtype=np.int64)
+    chosen = np.zeros(len(ivf.centroids), dtype=bool)
+    chosen[closest] = True
+    # slots whose vector moved to another list since the lists were built are only counted there
+    candidates = candidates[(assignment[candidates] >= 0) & chosen[np.maximum(assignment[candidates], 0)]]
+    return np.unique(candidates)
+
+
+def vector_index_available() -> bool:
+    return np is not None
+
+
+__all__ = [
+    "HashingEmbedder",
+    "SearchMode",
+    "VectorIndex",
+    "text_digest",
+    "thought_text",
+    "vector_index_available",
+]
@@ -0,0 +1,178 @@
+"""Group commit for single-writer databases.
+
+With SQLite every request that commits its own transaction takes the write
+lock and syncs the journal on its own. :class:`GroupCommitWriter` funnels
+repository mutations from concurrent requests into one writer that applies
+them inside a single transaction, each under its own savepoint, and commits
+once per group. A failing mutation rolls back only its savepoint; the caller
+that submitted it gets the exception and every other caller gets its own
+result once the group commits.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, TypeVar
+
+from anyio import CapacityLimiter
+from anyio.to_thread import run_sync
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .repositories.thoughts import ThoughtRepository
+
+T = TypeVar("T")
+
+WriteOperation = Callable[[ThoughtRepository], Any]
+
+
+@dataclass(slots=True)
+class _PendingWrite:
+    operation: WriteOperation
+    future: asyncio.Future
+
+
+@dataclass(slots=True)
+class GroupCommitStats:
+    groups: int = 0
+    writes: int = 0
+    failed_writes: int = 0
+    failed_commits: int = 0
+    largest_group: int = 0
+
+
+@dataclass(slots=True)
+class _Outcome:
+    ok: bool
+    value: Any = field(default=None)
+
+
+class GroupCommitWriter:
+    """Coalesce writes from concurrent requests into grouped commits.
+
+    The writer waits at most ``window_seconds`` after the first queued write
+    for others to join, and never applies more than ``max_batch`` writes per
+    transaction.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        *,
+        window_seconds: float = 0.005,
+        max_batch: int = 128,
+    ) -> None:
+        self._session_factory = session_factory
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.stats = GroupCommitStats()
+        self._queue: asyncio.Queue[_PendingWrite | None] | None = None
+        self._task: asyncio.Task | None = None
+        # one worker thread at a time: the point is a single writer
+        self._limiter = CapacityLimiter(1)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Apply writes already queued, then stop accepting new ones."""
+        if self._task is None or self._queue is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, operation: Callable[[ThoughtRepository], T]) -> T:
+        """Queue ``operation`` and wait until its group has committed."""
+        if not self.running or self._queue is None:
+            raise RuntimeError("the write queue is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingWrite(operation, future))
+        return await future
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            group = [first]
+            deadline = loop.time() + self.window_seconds
+            while len(group) < self.max_batch:
+                remaining = deadline - loop.time()
+                try:
+                    pending = self._queue.get_nowait() if remaining <= 0 else await asyncio.wait_for(
+                        self._queue.get(), remaining
+                    )
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                group.append(pending)
+
+            group = [pending for pending in group if not pending.future.cancelled()]
+            if not group:
+                continue
+            outcomes = await run_sync(self._apply_group, [pending.operation for pending in group], limiter=self._limiter)
+            for pending, outcome in zip(group, outcomes):
+                if pending.future.done():
+                    continue
+                if outcome.ok:
+                    pending.future.set_result(outcome.value)
+                else:
+                    pending.future.set_exception(outcome.value)
+
+    def _apply_group(self, operations: list[WriteOperation]) -> list[_Outcome]:
+        outcomes: list[_Outcome] = []
+        session = self._session_factory()
+        try:
+            _begin_write(session)
+            repo = ThoughtRepository(session)
+            for operation in operations:
+                try:
+                    with session.begin_nested():
+                        outcomes.append(_Outcome(True, operation(repo)))
+                except Exception as exc:  # reported to the submitting request
+                    outcomes.append(_Outcome(False, exc))
+            session.commit()
+        except Exception as exc:
+            session.rollback()
+            self.stats.failed_commits += 1
+            # nothing in this group was persisted, including writes that "succeeded"
+            outcomes = [outcome if not outcome.ok else _Outcome(False, exc) for outcome in outcomes]
+            outcomes += [_Outcome(False, exc)] * (len(operations) - len(outcomes))
+        finally:
+            session.close()
+
+        self.stats.groups += 1
+        self.stats.writes += len(operations)
+        self.stats.failed_writes += sum(not outcome.ok for outcome in outcomes)
+        self.stats.largest_group = max(self.stats.largest_group, len(operations))
+        return outcomes
+
+
+def _begin_write(session: Session) -> None:
+    """Open the outer transaction before the first savepoint.
+
+    pysqlite only emits ``BEGIN`` ahead of DML, so a leading ``SAVEPOINT``
+    would start (and its ``RELEASE`` would commit) a transaction per write.
+    ``BEGIN IMMEDIATE`` also takes the write lock up front instead of failing
+    when a reader's snapshot has to be upgraded.
+    """
+    connection = session.connection()
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+__all__ = ["GroupCommitStats", "GroupCommitWriter"]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import os
-from typing import Generator
+from typing import Callable, Generator
 
 import pytest
 from fastapi.testclient import TestClient
@@ -13,15 +13,25 @@ from enso_api.main import app  # noqa: E402  pylint: disable=C0413
 from enso_api.database import Base, engine, SessionLocal
 
 
-@pytest.fixture(autouse=True)
-def _reset_database() -> Generator[None, None, None]:
+def _recreate_schema() -> None:
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def _reset_database() -> Generator[None, None, None]:
+    _recreate_schema()
     yield
     SessionLocal.close_all()
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture()
+def reset_database() -> Callable[[], None]:
+    """Start over from an empty schema partway through a test."""
+    return _recreate_schema
+
+
 @pytest.fixture()
 def client() -> Generator[TestClient, None, None]:
     with TestClient(app) as test_client:
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+from enso_api.config import get_settings
+from enso_api.domain.ai import AISuggestRequest, AISummaryRequest
+from enso_api.main import app
+from enso_api.services.ai import AIService
+from enso_api.services.ai_batcher import ModelBatcher
+
+
+def _settings():
+    return get_settings().model_copy(update={"ai_enabled": True, "ai_mode": "local"})
+
+
+async def test_identical_calls_in_flight_share_one_upstream_call():
+    calls: list[str] = []
+    release = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await release.wait()
+        return httpx.Response(200, json={"summary": "launch plan", "source": "local"})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://model") as client:
+        batcher = ModelBatcher(client, window_seconds=0.001)
+        await batcher.start()
+        service = AIService(settings=_settings(), client=client, batcher=batcher)
+        # whitespace-only differences do not change the answer, so they coalesce too
+        waiting = [
+            asyncio.create_task(service.summarize(AISummaryRequest(content=content)))
+            for content in ("Plan the launch", "Plan the launch", "  Plan the launch\n")
+        ]
+        await asyncio.sleep(0.01)
+        release.set()
+        responses = await asyncio.gather(*waiting)
+        await batcher.stop()
+
+    assert calls == ["/summary"]
+    assert {response.summary for response in responses} == {"launch plan"}
+    assert (batcher.stats.calls, batcher.stats.coalesced, batcher.stats.upstream_calls) == (3, 2, 1)
+    assert batcher.snapshot()["in_flight"] == 0
+
+
+async def test_concurrent_calls_go_out_as_one_batch_and_fall_back_without_a_batch_route():
+    bodies: list[tuple[str, object]] = []
+    batch_route = True
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        bodies.append((request.url.path, body))
+        if request.url.path == "/suggest/batch":
+            if not batch_route:
+                return httpx.Response(404, json={"detail": "Not Found"})
+            return httpx.Response(
+                200, json={"responses": [{"suggestions": [{"label": f"#{item['content']}"}]} for item in body["requests"]]}
+            )
+        return httpx.Response(200, json={"suggestions": [{"label": f"#{body['content']}"}]})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://model") as client:
+        batcher = ModelBatcher(client, window_seconds=0.01, max_batch=8)
+        await batcher.start()
+        service = AIService(settings=_settings(), client=client, batcher=batcher)
+        words = ["alpha", "beta", "gamma"]
+        responses = await asyncio.gather(*(service.suggest(AISuggestRequest(content=word)) for word in words))
+        # answers come back to the right callers
+        assert [response.suggestions[0].label for response in responses] == ["#alpha", "#beta", "#gamma"]
+        assert bodies == [("/suggest/batch", {"requests": [AISuggestRequest(content=word).model_dump() for word in words]})]
+        assert (batcher.stats.batches, batcher.stats.largest_batch) == (1, 3)
+
+        # a runner without the batch route is asked once, then served call by call
+        bodies.clear()
+        batch_route = False
+        for _ in range(2):
+            responses = await asyncio.gather(*(service.suggest(AISuggestRequest(content=f"{w}!")) for w in words[:2]))
+            assert [response.suggestions[0].label for response in responses] == ["#alpha!", "#beta!"]
+        await batcher.stop()
+
+    assert [path for path, _ in bodies] == ["/suggest/batch", "/suggest", "/suggest", "/suggest", "/suggest"]
+    assert batcher.snapshot()["unbatched_paths"] == ["/suggest"]
+
+
+def test_suggest_batch_endpoint(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ai_enabled", True)
+    monkeypatch.setattr(settings, "ai_mode", "local")
+
+    with TestClient(app) as client:
+        sent: list[str] = []
+
+        async def send(request: httpx.Request, **kwargs: object) -> httpx.Response:
+            sent.append(request.url.path)
+            requests = json.loads(request.content)["requests"]
+            responses = [{"suggestions": [{"label": f"#{item['content']}"}], "source": "local"} for item in requests]
+            return httpx.Response(200, json={"responses": responses}, request=request)
+
+        monkeypatch.setattr(app.state.ai_client, "send", send)
+        items = [{"content": word} for word in ("alpha", "beta", "alpha")]
+        response = client.post("/api/ai/suggest/batch", json={"requests": items})
+        assert response.status_code == 200
+        assert [item["suggestions"][0]["label"] for item in response.json()["responses"]] == ["#alpha", "#beta", "#alpha"]
+        # the duplicate rode along with the first "alpha"; the rest went out as one upstream call
+        assert sent == ["/suggest/batch"]
+        stats = client.get("/stats").json()["ai_batcher"]
+        assert (stats["calls"], stats["coalesced"], stats["batches"]) == (3, 1, 1)
+
+        assert client.post("/api/ai/suggest/batch", json={"requests": []}).status_code == 422
+
+    assert app.state.ai_batcher is None
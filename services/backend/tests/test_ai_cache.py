@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import httpx
+from fastapi.testclient import TestClient
+
+from enso_api.config import get_settings
+from enso_api.domain.ai import AISuggestRequest, AISummaryRequest
+from enso_api.main import app
+from enso_api.services.ai import AIService
+from enso_api.services.ai_cache import build_response_cache, request_key
+
+
+def test_request_key_normalizes_what_does_not_change_the_answer():
+    base = request_key("suggest", AISuggestRequest(content="Plan the launch", tags=["Work", "focus"]))
+    assert request_key("suggest", AISuggestRequest(content="  Plan the launch  \n", tags=["focus", "work "])) == base
+    assert request_key("suggest", AISuggestRequest(content="Plan the launch", tags=["work"])) != base
+    assert request_key("summary", AISummaryRequest(content="Plan the launch")) != base
+    assert request_key("summary", AISummaryRequest(content="x", length="short")) != request_key(
+        "summary", AISummaryRequest(content="x", length="long")
+    )
+
+
+async def test_memory_and_disk_tiers(tmp_path):
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"summary": "launch plan", "latency_ms": 120.0, "source": "local"})
+
+    settings = get_settings().model_copy(
+        update={"ai_enabled": True, "ai_mode": "local", "ai_cache_path": str(tmp_path / "ai.db")}
+    )
+    payload = AISummaryRequest(content="Plan the launch")
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://model") as client:
+        cache = build_response_cache(settings)
+        service = AIService(settings=settings, client=client, cache=cache)
+        first = await service.summarize(payload)
+        second = await service.summarize(payload)
+        assert (first.source, first.latency_ms) == ("local", 120.0)
+        assert second.source == "cache" and second.summary == "launch plan" and second.latency_ms < 120.0
+        cache.close()
+
+        # a fresh process: the memory tier is empty, the disk tier still answers
+        restarted = build_response_cache(settings)
+        third = await AIService(settings=settings, client=client, cache=restarted).summarize(payload)
+        assert third.source == "cache" and calls == ["/summary"]
+        stats = restarted.snapshot()
+        assert (stats["disk_hits"], stats["misses"], stats["hit_ratio"]) == (1, 0, 1.0)
+        assert stats["memory"]["bytes"] > 0 and stats["disk"]["entries"] == 1
+        restarted.close()
+
+
+def test_cache_stats_exposed(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ai_enabled", True)
+    monkeypatch.setattr(settings, "ai_mode", "local")
+
+    with TestClient(app) as client:
+
+        async def send(request: httpx.Request, **kwargs: object) -> httpx.Response:
+            return httpx.Response(200, json={"suggestions": [{"label": "@launch"}]}, request=request)
+
+        monkeypatch.setattr(app.state.ai_client, "send", send)
+        for _ in range(3):
+            assert client.post("/api/ai/suggest", json={"content": "launch"}).status_code == 200
+        stats = client.get("/stats").json()["ai_cache"]
+        assert (stats["memory_hits"], stats["misses"]) == (2, 1)
+        assert stats["disk"] is None and stats["memory"]["entries"] == 1
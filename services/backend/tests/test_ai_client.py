@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import httpx
+from fastapi.testclient import TestClient
+
+from enso_api.config import get_settings
+from enso_api.domain.ai import AISuggestRequest
+from enso_api.main import app
+from enso_api.services.ai import AIService, build_model_client
+
+
+async def test_service_reuses_the_shared_client():
+    paths: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        return httpx.Response(200, json={"suggestions": [{"label": "#work"}], "source": "local"})
+
+    settings = get_settings().model_copy(update={"ai_enabled": True, "ai_mode": "local"})
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://model") as client:
+        service = AIService(settings=settings, client=client)
+        for _ in range(3):
+            response = await service.suggest(AISuggestRequest(content="plan the week"))
+            assert response.suggestions[0].label == "#work"
+        assert paths == ["/suggest"] * 3 and not client.is_closed
+
+
+def test_lifespan_owns_one_pooled_client(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ai_enabled", True)
+    monkeypatch.setattr(settings, "ai_mode", "local")
+    monkeypatch.setattr(settings, "ai_max_connections", 3)
+    monkeypatch.setattr(settings, "ai_http2", True)
+
+    with TestClient(app) as client:
+        shared = app.state.ai_client
+        assert isinstance(shared, httpx.AsyncClient) and str(shared.base_url).startswith(settings.ai_model_url)
+        # h2 is optional: without it the client quietly stays on HTTP/1.1
+        assert shared._transport._pool._max_connections == 3  # noqa: SLF001
+
+        sent: list[str] = []
+
+        async def send(request: httpx.Request, **kwargs: object) -> httpx.Response:
+            sent.append(request.url.path)
+            return httpx.Response(200, json={"summary": "short", "source": "local"}, request=request)
+
+        # every request goes through the one client the lifespan created
+        monkeypatch.setattr(shared, "send", send)
+        for index in range(2):
+            assert client.post("/api/ai/summary", json={"content": f"note {index}"}).json()["summary"] == "short"
+        assert sent == ["/summary", "/summary"]
+
+    assert shared.is_closed and app.state.ai_client is None
+
+
+def test_no_client_without_a_model_backend():
+    settings = get_settings()
+    assert build_model_client(settings.model_copy(update={"ai_enabled": False})) is None
+    assert build_model_client(settings.model_copy(update={"ai_enabled": True, "ai_mode": "stub"})) is None
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from enso_api.config import get_settings
+from enso_api.domain.ai import AISummaryRequest
+from enso_api.main import app
+from enso_api.services.ai import AIService
+from enso_api.services.ai_router import ModelBackend, ModelRouter
+
+
+def _backend(name: str, hits: list[str], *, delay: float = 0.0, status: int = 200, **options: object) -> ModelBackend:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        hits.append(name)
+        await asyncio.sleep(delay)
+        return httpx.Response(status, json={"summary": name, "source": name})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url=f"http://{name}")
+    return ModelBackend(name, client, **options)  # type: ignore[arg-type]
+
+
+def _service(router: ModelRouter) -> AIService:
+    settings = get_settings().model_copy(update={"ai_enabled": True, "ai_mode": "auto"})
+    return AIService(settings=settings, router=router)
+
+
+async def test_routes_to_the_faster_backend():
+    hits: list[str] = []
+    router = ModelRouter([_backend("local", hits, delay=0.02), _backend("remote", hits)])
+    service = _service(router)
+    for index in range(6):
+        await service.summarize(AISummaryRequest(content=f"note {index}"))
+    # both get tried once, then the lower median wins
+    assert hits == ["local", "remote", "remote", "remote", "remote", "remote"]
+    local, remote = router.statuses()
+    assert local.samples == 1 and remote.samples == 5 and local.p50_ms > remote.p50_ms
+    await router.aclose()
+
+
+async def test_breaker_fails_fast_and_probes_after_cooldown():
+    hits: list[str] = []
+    local = _backend("local", hits, status=500, failure_threshold=2, cooldown_seconds=0.05)
+    router = ModelRouter([local, _backend("remote", hits)])
+    service = _service(router)
+    for index in range(3):
+        response = await service.summarize(AISummaryRequest(content=f"note {index}"))
+        assert response.summary == "remote"
+    # a backend that only failed ranks last but is still the fallback
+    assert hits == ["local", "remote", "remote", "remote"] and local.breaker.state == "closed"
+
+    remote = router.backends[1]
+    remote.breaker.state, remote.breaker.opened_at = "open", time.monotonic()
+    assert (await service.summarize(AISummaryRequest(content="remote down"))).source == "stub"
+    # the second failure opens the breaker; from then on local is not even tried
+    assert local.breaker.state == "open" and router.ranked() == []
+
+    remote.breaker.cooldown_seconds = 60
+    await asyncio.sleep(0.06)
+    hits.clear()
+    await service.summarize(AISummaryRequest(content="after cooldown"))
+    # local's cooldown is over: the call is its probe, which fails and opens the breaker again
+    assert hits == ["local"] and local.breaker.state == "open"
+    health = await service.health()
+    assert health.status == "degraded" and [backend.state for backend in health.backends] == ["open", "open"]
+    await router.aclose()
+
+
+async def test_hedged_request_answers_from_the_second_backend():
+    hits: list[str] = []
+    router = ModelRouter([_backend("local", hits, delay=0.5), _backend("remote", hits)], hedge_after_seconds=0.01)
+    started = time.perf_counter()
+    response = await _service(router).summarize(AISummaryRequest(content="tail latency"))
+    assert response.summary == "remote" and time.perf_counter() - started < 0.25
+    assert (router.stats.hedges, router.stats.hedge_wins) == (1, 1)
+    # the losing call was cancelled, not counted as a failure
+    assert router.backends[0].window.error_rate == 0.0 and router.backends[0].breaker.state == "closed"
+    await router.aclose()
+
+
+def test_auto_mode_falls_back_to_the_stub(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ai_enabled", True)
+    monkeypatch.setattr(settings, "ai_mode", "auto")
+    monkeypatch.setattr(settings, "ai_backends", {"local": "http://127.0.0.1:9", "remote": "http://127.0.0.1:10"})
+    monkeypatch.setattr(settings, "ai_breaker_failures", 1)
+
+    with TestClient(app) as client:
+        router = app.state.ai_router
+        assert app.state.ai_client is None and [backend.name for backend in router.backends] == ["local", "remote"]
+
+        async def send(request: httpx.Request, **kwargs: object) -> httpx.Response:
+            raise httpx.ConnectError("connection refused", request=request)
+
+        for backend in router.backends:
+            monkeypatch.setattr(backend.client, "send", send)
+        response = client.post("/api/ai/summary", json={"content": "first line\nsecond line"})
+        assert response.status_code == 200 and response.json()["source"] == "stub"
+
+        health = client.get("/api/ai/health").json()
+        assert health["status"] == "degraded" and health["mode"] == "auto"
+        assert [(backend["name"], backend["state"]) for backend in health["backends"]] == [
+            ("local", "open"),
+            ("remote", "open"),
+        ]
+        stats = client.get("/stats").json()["ai_router"]
+        assert stats["exhausted"] == 1 and stats["backends"][0]["batcher"]["failed_calls"] == 1
+
+    assert app.state.ai_router is None
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import io
+import json
+import tarfile
+
+from enso_api import bulk
+from enso_api.cli import main as cli_main
+from enso_api.database import session_scope
+from enso_api.domain.thought import ThoughtCreate
+from enso_api.repositories.thoughts import ThoughtRepository
+
+
+def _jsonl(*rows: object) -> bytes:
+    return b"".join((row if isinstance(row, bytes) else json.dumps(row).encode()) + b"\n" for row in rows)
+
+
+def test_jsonl_import_resolves_forward_links_and_reports_bad_rows():
+    with session_scope() as session:
+        stored = ThoughtRepository(session).create(ThoughtCreate(title="Stored", content="already here")).id
+
+    source = _jsonl(
+        {"id": "th_a", "title": "A", "content": "first", "tags": ["Work"], "links": ["th_b", "Stored", "nowhere"]},
+        b"{not json",
+        {"id": "th_b", "title": "B", "content": "second", "links": ["a"]},
+        {"id": "th_a", "title": "A again", "content": "duplicate"},
+        {"id": stored, "title": "Stored", "content": "exists"},
+        {"title": "Empty", "content": " "},
+    )
+    report = bulk.import_file(io.BytesIO(source), "jsonl", chunk_size=2)
+
+    assert (report.read, report.imported, report.skipped, report.invalid) == (6, 2, 2, 2)
+    assert report.errors[0].startswith("line 2: invalid JSON")
+    assert report.errors[1].startswith("line 6: content")
+    assert (report.links, report.unresolved_links) == (3, 1)
+    assert report.rows_per_second > 0
+
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        a, b = repo.get("th_a"), repo.get("th_b")
+        assert sorted(a.links) == sorted(["th_b", stored]) and a.tags == ["work"]
+        assert b.links == ["th_a"]
+        assert [hit.id for hit in repo.search("second")] == ["th_b"]
+
+    again = bulk.import_file(io.BytesIO(source), "jsonl")
+    assert (again.imported, again.skipped, again.links) == (0, 4, 0)
+
+
+def test_markdown_folder_round_trip(tmp_path):
+    notes = tmp_path / "notes"
+    (notes / "nested").mkdir(parents=True)
+    (notes / "inbox.md").write_text("# Inbox\nSee [[Weekly review|the review]] and [[ideas#later]].\n")
+    (notes / "nested" / "ideas.md").write_text(
+        "---\ntags: [someday, Maybe]\ncreated_at: 2024-05-01T10:00:00Z\n---\nA list of ideas.\n"
+    )
+    (notes / "review.md").write_text('---\ntitle: "Weekly review"\ntags:\n  - work\n---\nLook back.\n')
+
+    assert cli_main(["import", str(notes)]) == 0
+
+    with session_scope() as session:
+        records = {record.title: record for record in ThoughtRepository(session).list()}
+    assert set(records) == {"Inbox", "ideas", "Weekly review"}
+    assert sorted(records["Inbox"].links) == sorted([records["Weekly review"].id, records["ideas"].id])
+    assert records["ideas"].tags == ["maybe", "someday"] and records["ideas"].created_at.year == 2024
+    assert records["Weekly review"].content == "Look back."
+
+    exported = tmp_path / "exported"
+    assert cli_main(["export", str(exported), "--format", "markdown"]) == 0
+    files = sorted(path.name for path in exported.iterdir())
+    assert files == sorted(bulk.markdown_filename(record) for record in records.values())
+
+    parsed = bulk.parse_markdown((exported / bulk.markdown_filename(records["Inbox"])).read_text(), "inbox.md")
+    assert parsed["id"] == records["Inbox"].id and parsed["title"] == "Inbox"
+    # stored links come back as ids, next to the wikilinks still in the body
+    assert set(records["Inbox"].links) <= set(parsed["links"])
+
+
+def test_api_import_and_streaming_export(client):
+    source = _jsonl(
+        {"id": "th_one", "title": "One", "content": "one", "links": ["th_two"]},
+        {"id": "th_two", "title": "Two", "content": "two"},
+    )
+    report = client.post("/thoughts/import", content=source).json()
+    assert (report["imported"], report["links"]) == (2, 1)
+    assert client.get("/thoughts/th_one").json()["links"] == ["th_two"]
+
+    response = client.get("/thoughts/export", params={"format": "markdown"})
+    assert response.headers["content-type"] == "application/x-tar"
+    with tarfile.open(fileobj=io.BytesIO(response.content)) as archive:
+        assert sorted(member.name for member in archive) == ["one-th_one.md", "two-th_two.md"]
+
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        repo.purge("th_one")
+        repo.purge("th_two")
+    report = client.post("/thoughts/import", params={"format": "markdown"}, content=response.content).json()
+    assert (report["imported"], report["links"], report["unresolved_links"]) == (2, 1, 0)
+    assert client.get("/thoughts/th_one").json()["links"] == ["th_two"]
+
+    assert client.post("/thoughts/import", params={"format": "markdown"}, content=b"not a tar").status_code == 400
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from enso_api.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_evicts_least_recent_and_expires_by_ttl():
+    clock = FakeClock()
+    cache: LRUCache[str, int] = LRUCache(2, ttl_seconds=10, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.snapshot() | {"entries": 1} == {
+        "hits": 3,
+        "misses": 2,
+        "evictions": 1,
+        "expirations": 1,
+        "invalidations": 0,
+        "rejected_fills": 0,
+        "entries": 1,
+        "max_entries": 2,
+        "ttl_seconds": 10,
+    }
+
+
+def test_fill_is_dropped_after_concurrent_invalidation():
+    cache: LRUCache[str, int] = LRUCache(8, ttl_seconds=60)
+    token = cache.token()
+    cache.invalidate(["a"])
+    assert cache.put("a", 1, token) is False
+    assert cache.get("a") is None
+    assert cache.put("a", 2, cache.token()) is True
+    assert cache.get("a") == 2
+    assert cache.stats.rejected_fills == 1
+
+
+def test_sizeof_tracks_bytes_held():
+    clock = FakeClock()
+    cache: LRUCache[str, bytes] = LRUCache(2, ttl_seconds=10, clock=clock, sizeof=len)
+    cache.put("a", b"xxxx")
+    cache.put("a", b"xx")
+    cache.put("b", b"yyy")
+    cache.put("c", b"z")
+    assert cache.bytes == 4 and cache.snapshot()["bytes"] == 4
+    cache.invalidate(["b"])
+    clock.now = 11
+    assert cache.get("c") is None
+    assert cache.bytes == 0
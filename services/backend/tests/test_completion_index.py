@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import random
+
+from fastapi.testclient import TestClient
+
+from enso_api import completion
+from enso_api.completion import CompletionIndex, PrefixTable
+from enso_api.config import get_settings
+from enso_api.database import engine, session_scope
+from enso_api.domain.thought import ThoughtCreate, ThoughtUpdate
+from enso_api.main import app
+from enso_api.repositories import change_feed
+from enso_api.repositories.thoughts import ThoughtRepository
+
+
+def test_prefix_table_agrees_with_a_scan_across_compactions(monkeypatch):
+    monkeypatch.setattr(completion, "COMPACT_THRESHOLD", 16)
+    rng = random.Random(5)
+    words = ["plan", "planet", "plant", "play", "pl", "road", "roadmap", "rock", "zen"]
+    expected: dict[int, tuple[str, float]] = {}
+
+    def entry() -> tuple[str, float]:
+        return f"{rng.choice(words)} {rng.randrange(50)}", float(rng.randrange(10))
+
+    for member in range(100):
+        expected[member] = entry()
+    table = PrefixTable.build((key, member, score) for member, (key, score) in expected.items())
+    for _ in range(400):
+        member = rng.randrange(130)
+        if rng.random() < 0.2:
+            table.discard(member)
+            expected.pop(member, None)
+        else:
+            expected[member] = entry()
+            table.set(member, *expected[member])
+
+    assert table.compactions > 0 and len(table) == len(expected)
+    for prefix in ["", "p", "pla", "plan", "plant 1", "road", "rock 4", "x"]:
+        scan = sorted(
+            (-score, key, member) for member, (key, score) in expected.items() if key.startswith(prefix)
+        )
+        assert table.top(prefix, 7) == [member for _, _, member in scan[:7]]
+
+
+def test_index_ranks_by_links_and_recency_and_follows_commits():
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        roadmap = repo.create(ThoughtCreate(title="Roadmap 2025", content="x", tags=["work"])).id
+        road_trip = repo.create(ThoughtCreate(title="Road trip", content="x", tags=["travel", "work"])).id
+        rocks = repo.create(ThoughtCreate(title="Rock garden", content="x", tags=["home"])).id
+        repo.create(ThoughtCreate(title="Weekly review", content="x", links=[roadmap], tags=["work", "review"]))
+
+    index = CompletionIndex()
+    change_feed.subscribe(index.apply)
+    try:
+        with session_scope() as session:
+            index.load(session)
+        # the linked roadmap outranks the newer road trip; "road " only matches the trip
+        assert [hit.id for hit in index.complete("ROAD").titles] == [roadmap, road_trip]
+        assert [hit.title for hit in index.complete("road ").titles] == ["Road trip"]
+        assert [hit.tag for hit in index.complete("#").tags] == ["work", "review", "home", "travel"]
+        assert index.complete("r", kind="titles").tags == []
+
+        with session_scope() as session:
+            repo = ThoughtRepository(session)
+            repo.update(rocks, ThoughtUpdate(title="Road closures", tags=["travel"]))
+            repo.update(road_trip, ThoughtUpdate(tags=["travel"]))
+            repo.delete(roadmap)
+        assert [hit.title for hit in index.complete("road").titles] == ["Road trip", "Road closures"]
+        assert index.complete("rock").titles == []
+        assert [hit.tag for hit in index.complete("#").tags] == ["travel", "review", "work"]
+        stats = index.stats()
+        assert (stats.titles, stats.tags) == (3, 3)
+    finally:
+        change_feed.unsubscribe(index.apply)
+
+
+def test_index_catches_up_with_writes_from_other_processes():
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        target = repo.create(ThoughtCreate(title="Roadmap", content="x")).id
+        renamed = repo.create(ThoughtCreate(title="Rock garden", content="x")).id
+
+    index = CompletionIndex()
+    follower = change_feed.ChangeLogFollower(engine)
+    follower.mark()
+    change_feed.subscribe(index.apply)
+    try:
+        with session_scope() as session:
+            index.load(session)
+        # committed by another worker: this process's change feed never hears of it
+        change_feed.unsubscribe(index.apply)
+        with session_scope() as session:
+            repo = ThoughtRepository(session)
+            repo.create(ThoughtCreate(title="Road trip", content="x", links=[target], tags=["travel"]))
+            repo.update(renamed, ThoughtUpdate(title="Garden"))
+        change_feed.subscribe(index.apply)
+        assert [hit.title for hit in index.complete("r").titles] == ["Rock garden", "Roadmap"]
+
+        assert follower.poll() == 2
+        expected = index.complete("r")
+        assert [hit.title for hit in expected.titles] == ["Roadmap", "Road trip"]
+        assert [hit.tag for hit in index.complete("#t").tags] == ["travel"]
+
+        # this process's own writes come round again through the log without moving anything
+        with session_scope() as session:
+            ThoughtRepository(session).update(target, ThoughtUpdate(tags=["travel"]))
+        before = index.stats()
+        assert follower.poll() == 1
+        assert index.complete("r") == expected and index.stats() == before
+    finally:
+        change_feed.unsubscribe(index.apply)
+
+
+def test_complete_endpoint(client):
+    target = client.post("/thoughts/", json={"title": "Project Enso", "content": "long body", "tags": ["projects"]})
+    client.post("/thoughts/", json={"title": "Prep talk", "content": "x", "links": [target.json()["id"]]})
+
+    response = client.get("/thoughts/complete", params={"prefix": "pro"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "titles": [{"id": target.json()["id"], "title": "Project Enso"}],
+        "tags": [{"tag": "projects"}],
+    }
+    response = client.get("/thoughts/complete", params={"prefix": "#pro"})
+    assert response.json() == {"titles": [], "tags": [{"tag": "projects"}]}
+    titles = client.get("/thoughts/complete", params={"prefix": "pr", "kind": "titles", "limit": 1}).json()["titles"]
+    assert [hit["title"] for hit in titles] == ["Project Enso"]
+    assert client.get("/thoughts/complete").status_code == 422
+    assert client.get("/stats").json()["completion_index"]["titles"] == 2
+
+
+def test_complete_without_index(monkeypatch):
+    monkeypatch.setattr(get_settings(), "completion_index", False)
+    with TestClient(app) as client:
+        assert client.get("/thoughts/complete", params={"prefix": "a"}).status_code == 503
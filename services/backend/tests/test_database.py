@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+
+from enso_api.config import Settings
+from enso_api.database import install_sqlite_pragmas, run_sqlite_maintenance, sqlite_pragmas
+
+
+def test_sqlite_profile_applies_to_every_connection(tmp_path):
+    profile = Settings(sqlite_busy_timeout_ms=2500, sqlite_cache_size_kib=8192)
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    install_sqlite_pragmas(file_engine, sqlite_pragmas(profile))
+    try:
+        for _ in range(2):
+            with file_engine.connect() as connection:
+                read = lambda pragma: connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()  # noqa: E731
+                assert read("journal_mode") == "wal"
+                assert read("synchronous") == 1
+                assert read("busy_timeout") == 2500
+                assert read("cache_size") == -8192
+                assert read("temp_store") == 2
+                assert read("foreign_keys") == 1
+            file_engine.dispose()
+        run_sqlite_maintenance(file_engine)
+    finally:
+        file_engine.dispose()
+
+
+def test_sqlite_profile_rejects_unknown_modes():
+    with pytest.raises(ValidationError, match="sqlite_journal_mode"):
+        Settings(sqlite_journal_mode="wal2")
+    with pytest.raises(ValidationError, match="sqlite_busy_timeout_ms"):
+        Settings(sqlite_busy_timeout_ms=-1)
+
+
+def test_async_engine_rejects_in_memory_sqlite():
+    for url in ("sqlite://", "sqlite:///:memory:"):
+        with pytest.raises(ValidationError, match="database_async"):
+            Settings(database_url=url, database_async=True)
+    assert Settings(database_url="sqlite:///./enso.db", database_async=True).database_async
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+import pytest
+
+from enso_api.encoding import RequestDecodingError, available_codecs, negotiate_encoding, wants_msgpack
+
+
+def _seed(client, count: int = 20) -> None:
+    for index in range(count):
+        client.post("/thoughts/", json={"title": f"Note {index}", "content": "repeated content " * 20})
+
+
+def test_negotiate_prefers_quality_then_server_order():
+    codecs = available_codecs()
+    assert negotiate_encoding("gzip", codecs).name == "gzip"
+    assert negotiate_encoding("identity", codecs) is None
+    assert negotiate_encoding("gzip;q=0.5, *;q=0.1", codecs).name == "gzip"
+    assert negotiate_encoding("gzip;q=0", codecs) is None
+
+
+def test_msgpack_is_negotiated_by_quality():
+    pytest.importorskip("msgpack")
+    assert wants_msgpack("application/msgpack")
+    assert wants_msgpack("application/json;q=0.5, application/x-msgpack")
+    assert wants_msgpack("application/msgpack; charset=utf-8; q=0.8, */*;q=0.1")
+    assert not wants_msgpack("application/msgpack;q=0")
+    assert not wants_msgpack("application/msgpack;q=0.5, application/json")
+    assert not wants_msgpack("*/*")
+
+
+def test_brotli_request_bodies_are_inflated_within_the_limit():
+    brotli = pytest.importorskip("brotli")
+    decompress = available_codecs()["br"].decompress
+    assert decompress(brotli.compress(b"x" * 4096), 4096) == b"x" * 4096
+    with pytest.raises(RequestDecodingError) as error:
+        decompress(brotli.compress(b"\0" * 2**24, quality=1), 1024)
+    assert error.value.status_code == 413
+    with pytest.raises(brotli.error):
+        decompress(brotli.compress(b"abc" * 1000)[:-4], 4096)
+
+
+def test_zstd_request_bodies_must_be_complete_frames():
+    zstandard = pytest.importorskip("zstandard")
+    decompress = available_codecs()["zstd"].decompress
+    packed = zstandard.ZstdCompressor().compress(b"abc" * 100_000)
+    assert decompress(packed, 300_000) == b"abc" * 100_000
+    with pytest.raises(RequestDecodingError) as error:
+        decompress(packed, 299_999)
+    assert error.value.status_code == 413
+    with pytest.raises(zstandard.ZstdError):
+        decompress(packed[:-4], 300_000)
+
+
+def test_truncated_request_bodies_are_rejected(client):
+    zstandard = pytest.importorskip("zstandard")
+    body = json.dumps({"title": "Cut short", "content": "x" * 4000}).encode()
+    for coding, packed in [("gzip", gzip.compress(body)), ("zstd", zstandard.ZstdCompressor().compress(body))]:
+        response = client.post(
+            "/thoughts/",
+            content=packed[: len(packed) // 2],
+            headers={"Content-Encoding": coding, "Content-Type": "application/json"},
+        )
+        assert response.status_code == 400, coding
+
+
+def test_list_response_is_gzip_compressed(client):
+    _seed(client)
+    response = client.get("/thoughts/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert len(response.json()) == 20
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/thoughts/", headers={"Accept-Encoding": "gzip"})
+    assert response.json() == []
+    assert "content-encoding" not in response.headers
+
+
+@pytest.mark.parametrize("coding, module", [("br", "brotli"), ("zstd", "zstandard")])
+def test_optional_codecs_shrink_responses(client, coding, module):
+    pytest.importorskip(module)
+    _seed(client)
+    plain = client.get("/thoughts/", headers={"Accept-Encoding": "identity"})
+    response = client.get("/thoughts/", headers={"Accept-Encoding": coding})
+    assert response.headers["content-encoding"] == coding
+    assert int(response.headers["content-length"]) < len(plain.content) / 4
+
+
+def test_streamed_ndjson_is_compressed(client):
+    _seed(client, 5)
+    response = client.get("/thoughts/export", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.text.splitlines()) == 5
+
+
+def test_gzip_request_body_is_accepted(client):
+    body = gzip.compress(json.dumps({"title": "Packed", "content": "compressed push"}).encode())
+    response = client.post(
+        "/thoughts/",
+        content=body,
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+    assert response.status_code == 201
+    assert response.json()["title"] == "Packed"
+
+
+def test_unknown_request_encoding_is_rejected(client):
+    response = client.post(
+        "/thoughts/",
+        content=b"xx",
+        headers={"Content-Encoding": "compress", "Content-Type": "application/json"},
+    )
+    assert response.status_code == 415
+
+
+def test_msgpack_sync_round_trip(client):
+    msgpack = pytest.importorskip("msgpack")
+    stamp = "2025-01-01T00:00:00Z"
+    payload = {
+        "client_id": "device-m",
+        "changes": [{"id": "th_packed", "title": "Packed", "content": "x", "created_at": stamp, "updated_at": stamp}],
+    }
+    response = client.post(
+        "/sync/thoughts",
+        content=msgpack.packb(payload),
+        headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    body = msgpack.unpackb(response.content)
+    assert body["changes"] == []
+    assert client.get("/thoughts/th_packed").json()["title"] == "Packed"
+
+
+def test_compressed_representations_get_their_own_etags(client):
+    _seed(client)
+    thought_id = client.post("/thoughts/", json={"title": "Tagged", "content": "long body " * 200}).json()["id"]
+    plain = client.get(f"/thoughts/{thought_id}", headers={"Accept-Encoding": "identity"})
+    packed = client.get(f"/thoughts/{thought_id}", headers={"Accept-Encoding": "gzip"})
+    assert packed.headers["content-encoding"] == "gzip"
+    assert packed.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+
+    revalidated = client.get(
+        f"/thoughts/{thought_id}", headers={"Accept-Encoding": "gzip", "If-None-Match": packed.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == packed.headers["etag"]
+
+    listing = client.get("/thoughts/", headers={"Accept-Encoding": "gzip"})
+    assert listing.headers["etag"].endswith('-gzip"')
+    assert client.get("/thoughts/", headers={"If-None-Match": listing.headers["etag"]}).status_code == 304
+
+    updated = client.patch(
+        f"/thoughts/{thought_id}", json={"title": "Retagged"}, headers={"If-Match": packed.headers["etag"]}
+    )
+    assert updated.status_code == 200
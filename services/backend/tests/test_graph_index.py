@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from enso_api.config import get_settings  # noqa: E402
+from enso_api.database import session_scope  # noqa: E402
+from enso_api.domain.thought import ThoughtCreate, ThoughtUpdate  # noqa: E402
+from enso_api.graph import LinkGraphIndex  # noqa: E402
+from enso_api.main import app  # noqa: E402
+from enso_api.repositories import change_feed  # noqa: E402
+from enso_api.repositories.thoughts import ThoughtRepository  # noqa: E402
+
+
+def _create(repo: ThoughtRepository, title: str, links: list[str] | None = None) -> str:
+    return repo.create(ThoughtCreate(title=title, content=title, links=links or [])).id
+
+
+def test_index_follows_committed_link_changes():
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        a, b, c = (_create(repo, title) for title in "abc")
+        repo.link(a, b)
+
+    index = LinkGraphIndex()
+    change_feed.subscribe(index.apply)
+    try:
+        with session_scope() as session:
+            index.load(session)
+        assert index.successors(a) == [b]
+
+        with session_scope() as session:
+            repo = ThoughtRepository(session)
+            d = _create(repo, "d", links=[a])
+            repo.link(b, c)
+            repo.unlink(a, b)
+        assert index.successors(d) == [a] and index.successors(b) == [c] and index.successors(a) == []
+
+        # a savepoint that rolls back never reaches the index
+        with session_scope() as session:
+            repo = ThoughtRepository(session)
+            with pytest.raises(ValueError):
+                with session.begin_nested():
+                    repo.link(c, a)
+                    raise ValueError("abandon")
+            repo.update(c, ThoughtUpdate(links=[d]))
+        assert index.successors(c) == [d]
+
+        with session_scope() as session:
+            ThoughtRepository(session).delete(a)
+        assert index.successors(d) == []
+        assert index.orphans().thought_ids == []
+        assert [component.size for component in index.components().components] == [3]
+
+        with session_scope() as session:
+            ThoughtRepository(session).purge(d)
+        assert index.successors(c) == []
+        assert index.orphans().thought_ids == []
+        assert index.stats().live_nodes == 2 and index.stats().edges == 1
+    finally:
+        change_feed.unsubscribe(index.apply)
+
+
+def test_components_orphans_and_hubs(client):
+    def create(title: str, links: list[str] = []) -> str:  # noqa: B006
+        return client.post("/thoughts/", json={"title": title, "content": title, "links": links}).json()["id"]
+
+    hub = create("hub")
+    spokes = [create(f"spoke {index}", [hub]) for index in range(3)]
+    x = create("x")
+    y = create("y", [x])
+    lonely = create("lonely")
+    gone = create("gone", [lonely])
+    assert client.delete(f"/thoughts/{gone}").status_code == 204
+
+    components = client.get("/graph/components", params={"max_members": 2}).json()
+    assert components["total"] == 3
+    assert [component["size"] for component in components["components"]] == [4, 2, 1]
+    assert len(components["components"][0]["thought_ids"]) == 2
+    assert sorted(components["components"][1]["thought_ids"]) == sorted([x, y])
+
+    assert client.get("/graph/orphans").json() == {"total": 1, "thought_ids": [lonely]}
+
+    hubs = client.get("/graph/hubs", params={"limit": 2}).json()
+    assert hubs[0]["id"] == hub and hubs[0]["in_degree"] == 3
+    assert [entry["id"] for entry in client.get("/graph/hubs", params={"ranking": "degree"}).json()][0] == hub
+
+    stats = client.get("/stats").json()["graph_index"]
+    # stored links still count the deleted thought's outgoing one
+    assert stats["edges"] == len(spokes) + 2 and stats["live_nodes"] == 7
+    assert stats["bytes_per_million_edges"] > 0
+
+
+def test_graph_endpoints_unavailable_when_disabled(monkeypatch):
+    monkeypatch.setattr(get_settings(), "graph_index", False)
+    with TestClient(app) as client:
+        assert client.get("/graph/components").status_code == 503
+        assert client.get("/stats").json()["graph_index"] is None
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import random
+
+from fastapi.testclient import TestClient
+
+from enso_api.config import get_settings
+from enso_api.database import engine, session_scope
+from enso_api.domain.tags import TagCount, TagFilter
+from enso_api.domain.thought import ThoughtCreate, ThoughtUpdate
+from enso_api.main import app
+from enso_api.repositories import change_feed
+from enso_api.repositories.thoughts import ThoughtRepository
+from enso_api.tags import SPARSE_LIMIT, TagBitmap, TagIndex
+
+
+def test_bitmap_switches_between_sparse_and_dense_chunks():
+    rng = random.Random(3)
+    slots = rng.sample(range(3 << 16), 2000)
+    bitmap = TagBitmap.from_slots(slots[:10])
+    for slot in slots[10:]:
+        bitmap.add(slot)
+    assert len(bitmap) == len(slots) and all(slot in bitmap for slot in slots)
+    assert bitmap.layout()[1] == 3
+
+    for slot in slots[SPARSE_LIMIT // 2 :]:
+        bitmap.discard(slot)
+    bitmap.discard(slots[-1])
+    assert len(bitmap) == SPARSE_LIMIT // 2 and bitmap.layout()[1] == 0
+    assert sorted(slot for key, bits in bitmap.dense().items() for slot in _slots(key, bits)) == sorted(
+        slots[: SPARSE_LIMIT // 2]
+    )
+
+
+def _slots(key: int, bits: int) -> list[int]:
+    return [key << 16 | offset for offset in range(1 << 16) if bits >> offset & 1]
+
+
+def test_index_filters_agree_with_sql_and_follow_commits():
+    rng = random.Random(11)
+    vocabulary = ["work", "focus", "archive", "home", "idea"]
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        ids = [
+            repo.create(ThoughtCreate(title=f"t{index}", content="x", tags=rng.sample(vocabulary, rng.randrange(4)))).id
+            for index in range(60)
+        ]
+
+    index = TagIndex()
+    change_feed.subscribe(index.apply)
+    try:
+        with session_scope() as session:
+            index.load(session)
+            repo = ThoughtRepository(session)
+            repo.update(ids[0], ThoughtUpdate(tags=["work", "focus"]))
+            repo.update(ids[1], ThoughtUpdate(tags=["work", "focus", "archive"]))
+            repo.delete(ids[2])
+
+        filters = [
+            TagFilter.from_params(["work", "focus"], [], ["archive"]),
+            TagFilter.from_params([], ["home", "idea"], []),
+            TagFilter.from_params([], [], ["work"]),
+            TagFilter.from_params(["Work "], ["missing", "idea"], ["missing"]),
+            TagFilter.from_params(["missing"], [], []),
+        ]
+        with session_scope() as session:
+            repo = ThoughtRepository(session)
+            for tag_filter in filters:
+                expected = {record.id for record in repo.list(tags=tag_filter)}
+                narrowed = index.narrow(tag_filter, 1000)
+                if "missing" in (*tag_filter.all_of, *tag_filter.any_of):
+                    # a tag the index has never seen may come from a write it has not caught up with
+                    assert narrowed is tag_filter
+                else:
+                    assert set(narrowed.thought_ids) == expected
+                assert {record.id for record in repo.list(tags=narrowed)} == expected
+                assert index.count(tag_filter) == len(expected)
+            assert index.narrow(filters[2], 1).thought_ids is None
+
+        assert ids[0] in index.narrow(filters[0], 1000).thought_ids
+        assert ids[1] not in index.narrow(filters[0], 1000).thought_ids
+        assert index.stats().live_thoughts == 59
+        assert index.tag_id("work") is not None and index.tag_id("nope") is None
+    finally:
+        change_feed.unsubscribe(index.apply)
+
+
+def test_index_catches_up_with_writes_from_other_processes():
+    with session_scope() as session:
+        kept = ThoughtRepository(session).create(ThoughtCreate(title="kept", content="x", tags=["work"])).id
+
+    index = TagIndex()
+    follower = change_feed.ChangeLogFollower(engine, batch_size=2)
+    follower.mark()
+    change_feed.subscribe(index.apply)
+    try:
+        with session_scope() as session:
+            index.load(session)
+        # another worker's commits never reach this process's change feed
+        change_feed.unsubscribe(index.apply)
+        with session_scope() as session:
+            repo = ThoughtRepository(session)
+            elsewhere = [repo.create(ThoughtCreate(title=f"w{n}", content="x", tags=["remote"])).id for n in range(3)]
+            repo.update(kept, ThoughtUpdate(tags=["remote"]))
+        change_feed.subscribe(index.apply)
+
+        remote = TagFilter.from_params(["remote"], [], [])
+        assert index.narrow(remote, 1000) is remote
+        with session_scope() as session:
+            assert len(ThoughtRepository(session).list(tags=remote)) == 4
+        assert index.facets().total == 1
+
+        assert follower.poll() == 4 and follower.poll() == 0
+        assert set(index.narrow(remote, 1000).thought_ids) == {kept, *elsewhere}
+        assert index.facets().tags == [TagCount(tag="remote", count=4)]
+    finally:
+        change_feed.unsubscribe(index.apply)
+
+
+def test_tag_filters_and_facets_endpoints(client):
+    def create(title: str, tags: list[str]) -> str:
+        return client.post("/thoughts/", json={"title": title, "content": title, "tags": tags}).json()["id"]
+
+    both = create("both", ["work", "focus"])
+    archived = create("archived", ["work", "focus", "archive"])
+    home = create("home", ["home"])
+    create("untagged", [])
+
+    response = client.get("/thoughts/", params={"tags_all": ["work", "focus"], "tags_none": "archive"})
+    assert [thought["id"] for thought in response.json()] == [both]
+    response = client.get("/thoughts/", params={"tags_any": ["home", "archive"], "limit": 1})
+    assert [thought["id"] for thought in response.json()] == [home] and "X-Next-Cursor" in response.headers
+
+    facets = client.get("/thoughts/facets").json()
+    assert facets["total"] == 4
+    assert facets["tags"] == [
+        {"tag": "focus", "count": 2},
+        {"tag": "work", "count": 2},
+        {"tag": "archive", "count": 1},
+        {"tag": "home", "count": 1},
+    ]
+    facets = client.get("/thoughts/facets", params={"tags_all": "work", "tags_none": "archive", "limit": 1}).json()
+    assert facets == {"total": 1, "tags": [{"tag": "focus", "count": 1}]}
+
+    assert client.patch(f"/thoughts/{archived}", json={"tags": ["home"]}).status_code == 200
+    assert client.get("/thoughts/facets", params={"tags_any": "home"}).json()["total"] == 2
+    assert client.get("/stats").json()["tag_index"]["memberships"] == 4
+
+
+def test_tag_filters_without_index(monkeypatch):
+    monkeypatch.setattr(get_settings(), "tag_index", False)
+    with TestClient(app) as client:
+        tagged = client.post("/thoughts/", json={"title": "a", "content": "a", "tags": ["work"]}).json()["id"]
+        client.post("/thoughts/", json={"title": "b", "content": "b"})
+        assert [thought["id"] for thought in client.get("/thoughts/", params={"tags_any": "work"}).json()] == [tagged]
+        assert client.get("/thoughts/facets").status_code == 503
+        assert client.get("/stats").json()["tag_index"] is None
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Generator
+
+import pytest
+from sqlalchemy import event, select
+
+from enso_api.database import Base, engine, session_scope
+from enso_api.domain.thought import BatchUpdate, SyncThoughtPayload, ThoughtCreate, ThoughtUpdate
+from enso_api.models import ThoughtChange
+from enso_api.repositories.thought_cache import get_thought_cache
+from enso_api.repositories.thoughts import ThoughtRepository
+
+
+@contextmanager
+def count_queries() -> Generator[list[str], None, None]:
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):  # noqa: ANN001
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def _seed(count: int) -> None:
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        previous: str | None = None
+        for index in range(count):
+            created = repo.create(
+                ThoughtCreate(
+                    title=f"Thought {index}",
+                    content=f"Body {index}",
+                    tags=["work", f"tag-{index}"],
+                    links=[previous] if previous else [],
+                )
+            )
+            previous = created.id
+
+
+def _list_query_count() -> tuple[int, list]:
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        with count_queries() as statements:
+            items = repo.list()
+    return len(statements), items
+
+
+def test_list_hydrates_with_constant_query_count():
+    _seed(3)
+    small_count, small_items = _list_query_count()
+
+    _seed(30)
+    large_count, large_items = _list_query_count()
+
+    assert len(small_items) == 3
+    assert len(large_items) == 33
+    assert small_count == large_count
+    linked = [item for item in large_items if item.links]
+    assert linked and all(len(item.links) == 1 for item in linked)
+    assert all("work" in item.tags for item in large_items)
+
+
+SEEDED_AT = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _seed_sync_fixture() -> None:
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        for thought_id, tags, links in (
+            ("th_keep", ["home"], []),
+            ("th_edit", ["focus", "old"], ["th_keep"]),
+            ("th_gone", ["work"], []),
+        ):
+            repo.create(
+                ThoughtCreate(
+                    id=thought_id,
+                    title=thought_id,
+                    content=f"seeded {thought_id}",
+                    tags=tags,
+                    links=links,
+                    created_at=SEEDED_AT,
+                    updated_at=SEEDED_AT,
+                )
+            )
+
+
+def _sync_changes() -> list[SyncThoughtPayload]:
+    later = SEEDED_AT + timedelta(days=1)
+    earlier = SEEDED_AT - timedelta(days=1)
+
+    def change(thought_id: str, stamp: datetime, **fields) -> SyncThoughtPayload:
+        base = {
+            "id": thought_id,
+            "title": thought_id,
+            "content": f"content of {thought_id}",
+            "created_at": stamp,
+            "updated_at": stamp,
+        }
+        return SyncThoughtPayload(**{**base, **fields})
+
+    return [
+        change("th_new_a", later, tags=["inbox"], links=["th_keep"]),
+        change("th_new_b", later, links=["th_new_a", "th_keep"]),
+        change("th_edit", later, title="Edited", tags=["focus", "new"], links=["th_new_b"]),
+        change("th_keep", earlier, title="Stale", tags=["ignored"]),
+        change("th_new_a", later + timedelta(minutes=1), tags=["done"]),
+        change("th_gone", later, deleted_at=later, tags=["work"]),
+    ]
+
+
+def _snapshot() -> tuple[list[dict], list[str], list[tuple[str, str | None]]]:
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        records = [record.model_dump() for record in repo.list(include_deleted=True)]
+        searchable = sorted(record.id for record in repo.search("content"))
+        logged = sorted(session.execute(select(ThoughtChange.thought_id, ThoughtChange.client_id)).tuples())
+    return sorted(records, key=lambda row: row["id"]), searchable, logged
+
+
+def test_sync_batch_matches_per_change_apply(reset_database):
+    _seed_sync_fixture()
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        for change in _sync_changes():
+            repo.upsert_sync_payload(change, client_id="device-x")
+    expected = _snapshot()
+
+    reset_database()
+    _seed_sync_fixture()
+    with session_scope() as session:
+        ThoughtRepository(session).apply_sync_batch(_sync_changes(), client_id="device-x")
+
+    assert _snapshot() == expected
+
+
+def test_sync_batch_rejects_unknown_link_target():
+    change = SyncThoughtPayload(
+        id="th_orphan",
+        title="Orphan",
+        content="points nowhere",
+        links=["th_missing"],
+        created_at=SEEDED_AT,
+        updated_at=SEEDED_AT,
+    )
+    with pytest.raises(ValueError, match="th_missing"):
+        with session_scope() as session:
+            ThoughtRepository(session).apply_sync_batch([change])
+
+
+async def test_async_repository_runs_on_async_engine(tmp_path):
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from enso_api.database import create_async_engine_for
+    from enso_api.repositories.thoughts import AsyncThoughtRepository
+
+    async_engine = create_async_engine_for(f"sqlite:///{tmp_path / 'async.db'}")
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    try:
+        async with factory() as session:
+            repo = AsyncThoughtRepository(session)
+            first = await repo.create(ThoughtCreate(title="Async first", content="via aiosqlite", tags=["Async"]))
+            second = await repo.create(ThoughtCreate(title="Async second", content="linked", links=[first.id]))
+            await session.commit()
+
+        async with factory() as session:
+            repo = AsyncThoughtRepository(session)
+            listed = await repo.list()
+            assert {item.id for item in listed} == {first.id, second.id}
+            assert (await repo.get(second.id)).links == [first.id]
+            assert [item.id for item in await repo.search("aiosqlite")] == [first.id]
+            page = await repo.fetch_changes_after(0, 10)
+            assert [item.id for item in page.changes] == [first.id, second.id]
+    finally:
+        await async_engine.dispose()
+
+
+def test_get_cache_is_invalidated_by_writes_and_ignores_rollbacks():
+    cache = get_thought_cache()
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        source = repo.create(ThoughtCreate(title="Cached", content="hot"))
+        target = repo.create(ThoughtCreate(title="Target", content="linked"))
+
+    with session_scope() as session:
+        assert ThoughtRepository(session).get(source.id).title == "Cached"
+    hits = cache.stats.hits
+    with session_scope() as session:
+        assert ThoughtRepository(session).get(source.id).title == "Cached"
+    assert cache.stats.hits == hits + 1
+
+    with pytest.raises(RuntimeError):
+        with session_scope() as session:
+            repo = ThoughtRepository(session)
+            repo.update(source.id, ThoughtUpdate(title="Never committed"))
+            assert repo.get(source.id).title == "Never committed"
+            raise RuntimeError("abort")
+    with session_scope() as session:
+        assert ThoughtRepository(session).get(source.id).title == "Cached"
+
+    with session_scope() as session:
+        ThoughtRepository(session).link(source.id, target.id)
+    with session_scope() as session:
+        assert ThoughtRepository(session).get(source.id).links == [target.id]
+
+    with session_scope() as session:
+        ThoughtRepository(session).purge(target.id)
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        assert repo.get(target.id) is None
+        assert repo.get(source.id).links == []
+
+
+def test_batch_writes_are_set_based():
+    def retag(count: int) -> int:
+        with session_scope() as session:
+            repo = ThoughtRepository(session)
+            ids = [record.id for record in repo.list()][:count]
+            operations = [
+                BatchUpdate(op="update", id=thought_id, changes=ThoughtUpdate(tags=["moved"])) for thought_id in ids
+            ]
+            with count_queries() as statements:
+                outcome = repo.apply_batch(operations)
+        assert outcome.committed and outcome.applied == count
+        return len(statements)
+
+    _seed(40)
+    assert retag(4) == retag(40)
+    with session_scope() as session:
+        assert all(record.tags == ["moved"] for record in ThoughtRepository(session).list())
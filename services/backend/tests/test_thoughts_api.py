@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime, timedelta, timezone
 
 import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from enso_api.database import engine, session_scope
+from enso_api.domain.thought import ThoughtCreate
+from enso_api.main import app
+from enso_api.models import ThoughtChange
+from enso_api.repositories.thoughts import ThoughtRepository
+from enso_api.search import get_search_index
 
 
 @pytest.fixture()
@@ -80,7 +90,9 @@ def test_sync_flow(client, sample_thought):
     )
     assert second_resp.status_code == 200
     sync_payload = second_resp.json()
-    assert any(item["content"] == "Updated offline" for item in sync_payload["changes"])
+    # the pushing device does not get its own change echoed back
+    assert sync_payload["changes"] == []
+    assert client.get(f"/thoughts/{first_thought['id']}").json()["content"] == "Updated offline"
 
     stale_change = {
         **updated_change,
@@ -115,9 +127,329 @@ def test_sync_flow(client, sample_thought):
         },
     )
     assert final_resp.status_code == 200
-    final_changes = final_resp.json()["changes"]
+    other_device = client.post("/sync/thoughts", json={"client_id": "device-b"})
+    final_changes = other_device.json()["changes"]
     assert final_changes[0]["deleted_at"] is not None
 
     list_resp = client.get("/thoughts/")
     assert list_resp.status_code == 200
     assert list_resp.json() == []
+
+
+def test_list_keyset_pagination(client):
+    stamp = datetime(2025, 1, 1, tzinfo=timezone.utc).isoformat()
+    created_ids = []
+    for index in range(5):
+        response = client.post(
+            "/thoughts/",
+            json={
+                "title": f"Page {index}",
+                "content": "paged note",
+                "created_at": stamp,
+                "updated_at": stamp if index < 3 else (datetime(2025, 1, 2, tzinfo=timezone.utc)).isoformat(),
+            },
+        )
+        assert response.status_code == 201
+        created_ids.append(response.json()["id"])
+
+    seen: list[str] = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 2, "search": "paged"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/thoughts/", params=params)
+        assert response.status_code == 200
+        pages += 1
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert sorted(seen) == sorted(created_ids)
+    assert len(set(seen)) == len(seen)
+
+    full = [item["id"] for item in client.get("/thoughts/").json()]
+    assert full == seen
+
+    response = client.get("/thoughts/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_full_text_search_ranks_and_highlights(client):
+    client.post("/thoughts/", json={"title": "Garden plans", "content": "Plant tomatoes in spring", "tags": ["home"]})
+    client.post("/thoughts/", json={"title": "Tomato sauce", "content": "Recipe with tomatoes and basil"})
+    removed = client.post("/thoughts/", json={"title": "Old tomato", "content": "tomatoes gone"}).json()
+    client.delete(f"/thoughts/{removed['id']}")
+
+    response = client.get("/thoughts/search", params={"q": "tomat"})
+    assert response.status_code == 200
+    hits = response.json()
+    assert [hit["title"] for hit in hits] == ["Tomato sauce", "Garden plans"]
+    assert "<mark>" in hits[1]["snippet"]
+    assert hits[0]["score"] >= hits[1]["score"]
+
+    response = client.get("/thoughts/", params={"search": "home"})
+    assert [item["title"] for item in response.json()] == ["Garden plans"]
+
+    garden_id = hits[1]["id"]
+    client.patch(f"/thoughts/{garden_id}", json={"content": "Plant peppers", "title": "Garden"})
+    titles = [hit["title"] for hit in client.get("/thoughts/search", params={"q": "tomatoes"}).json()]
+    assert titles == ["Tomato sauce"]
+
+    # a title-only match is excerpted from the title, not from unrelated content
+    hits = client.get("/thoughts/search", params={"q": "garden"}).json()
+    assert [hit["snippet"] for hit in hits] == ["<mark>Garden</mark>"]
+
+
+def test_list_search_matches_word_prefixes(client):
+    client.post("/thoughts/", json={"title": "Roadmap", "content": "Quarterly planning", "tags": ["work"]})
+    client.post("/thoughts/", json={"title": "Groceries", "content": "Café au lait"})
+
+    def search(query: str) -> list[str]:
+        return [item["title"] for item in client.get("/thoughts/", params={"search": query}).json()]
+
+    assert search("ROAD plan") == ["Roadmap"] and search("wor") == ["Roadmap"]
+    assert search("cafe") == ["Groceries"]
+    # not a substring match: every word of the query has to start a word
+    assert search("map") == [] and search("oceries") == []
+    assert search("road groceries") == [] and search("!!") == []
+
+
+def test_search_index_is_created_for_databases_that_predate_it():
+    with session_scope() as session:
+        ThoughtRepository(session).create(ThoughtCreate(title="Garden plans", content="Plant tomatoes"))
+        get_search_index(engine.dialect.name).drop(session.connection())
+
+    with TestClient(app) as client:
+        response = client.get("/thoughts/search", params={"q": "tomatoes"})
+        assert response.status_code == 200
+        assert [hit["title"] for hit in response.json()] == ["Garden plans"]
+
+    with session_scope() as session:
+        get_search_index(engine.dialect.name).drop(session.connection())
+        assert ThoughtRepository(session).rebuild_search_index() == 1
+
+
+def test_ndjson_list_and_export_stream(client):
+    ids = [
+        client.post("/thoughts/", json={"title": f"Stream {index}", "content": "line"}).json()["id"]
+        for index in range(3)
+    ]
+    client.post(f"/thoughts/{ids[0]}/links/{ids[1]}")
+    client.delete(f"/thoughts/{ids[2]}")
+
+    response = client.get("/thoughts/", headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert {row["id"] for row in rows} == set(ids[:2])
+    assert next(row for row in rows if row["id"] == ids[0])["links"] == [ids[1]]
+
+    response = client.get("/thoughts/export", params={"include_deleted": True})
+    assert response.status_code == 200
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert {row["id"] for row in exported} == set(ids)
+
+
+def test_sync_cursor_follows_server_sequence(client):
+    ancient = datetime(2001, 1, 1, tzinfo=timezone.utc).isoformat()
+    for index in range(3):
+        client.post("/thoughts/", json={"title": f"Seq {index}", "content": "ordered"})
+
+    first = client.post("/sync/thoughts", json={"client_id": "device-b"}).json()
+    assert len(first["changes"]) == 3
+
+    # a client-supplied timestamp far in the past must still be delivered
+    client.post(
+        "/thoughts/",
+        json={"title": "Backdated", "content": "old clock", "created_at": ancient, "updated_at": ancient},
+    )
+    second = client.post("/sync/thoughts", json={"client_id": "device-b", "since": first["cursor"]}).json()
+    assert [item["title"] for item in second["changes"]] == ["Backdated"]
+
+
+def test_sync_pages_do_not_skip_rows(client, monkeypatch):
+    from enso_api.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "sync_page_size", 2)
+    created = [client.post("/thoughts/", json={"title": f"Row {index}", "content": "x"}).json()["id"] for index in range(5)]
+
+    received: list[str] = []
+    cursor = None
+    while True:
+        body = {"client_id": "device-c"}
+        if cursor:
+            body["since"] = cursor
+        payload = client.post("/sync/thoughts", json=body).json()
+        received.extend(item["id"] for item in payload["changes"])
+        cursor = payload["cursor"]
+        if not payload["has_more"]:
+            break
+
+    assert received == created
+    assert client.post("/sync/thoughts", json={"client_id": "device-c", "since": cursor}).json()["changes"] == []
+
+
+def test_sync_skips_echoes_of_own_changes(client):
+    stamp = datetime.now(timezone.utc).isoformat()
+    change = {"id": "th_echo", "title": "Echo", "content": "from a", "created_at": stamp, "updated_at": stamp}
+
+    pushed = client.post("/sync/thoughts", json={"client_id": "device-a", "changes": [change]}).json()
+    assert pushed["changes"] == []
+
+    seen_by_b = client.post("/sync/thoughts", json={"client_id": "device-b"}).json()
+    assert [item["id"] for item in seen_by_b["changes"]] == ["th_echo"]
+
+    # once someone else edits the thought, the original author receives it again
+    client.patch("/thoughts/th_echo", json={"content": "edited on web"})
+    pulled = client.post("/sync/thoughts", json={"client_id": "device-a", "since": pushed["cursor"]}).json()
+    assert [item["content"] for item in pulled["changes"]] == ["edited on web"]
+    assert int(pulled["cursor"]) > int(pushed["cursor"])
+
+
+def test_change_log_is_backfilled_for_databases_that_predate_it():
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        ids = [repo.create(ThoughtCreate(title=f"Old {index}", content="x")).id for index in range(3)]
+        session.execute(delete(ThoughtChange))
+
+    with TestClient(app) as client:
+        payload = client.post("/sync/thoughts", json={"client_id": "device-d"}).json()
+        assert [item["id"] for item in payload["changes"]] == ids and int(payload["cursor"]) > 0
+        assert client.get(f"/thoughts/{ids[0]}").headers["etag"]
+        client.patch(f"/thoughts/{ids[0]}", json={"content": "edited"})
+
+    with session_scope() as session:
+        assert ThoughtRepository(session).backfill_change_log() == 0
+
+
+def test_conditional_get_for_thought_and_list(client, sample_thought):
+    thought_id = sample_thought["id"]
+    first = client.get(f"/thoughts/{thought_id}")
+    etag = first.headers["etag"]
+
+    cached = client.get(f"/thoughts/{thought_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    other = client.post("/thoughts/", json={"title": "Other", "content": "Target"}).json()
+    listing = client.get("/thoughts/", params={"limit": 10})
+    list_etag = listing.headers["etag"]
+    assert client.get("/thoughts/", params={"limit": 10}, headers={"If-None-Match": list_etag}).status_code == 304
+    assert client.get("/thoughts/", params={"limit": 5}, headers={"If-None-Match": list_etag}).status_code == 200
+
+    # linking does not touch updated_at but still changes the representation
+    client.post(f"/thoughts/{thought_id}/links/{other['id']}")
+    refreshed = client.get(f"/thoughts/{thought_id}", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.json()["links"] == [other["id"]]
+    assert refreshed.headers["etag"] != etag
+    assert client.get("/thoughts/", params={"limit": 10}, headers={"If-None-Match": list_etag}).status_code == 200
+
+
+def test_patch_honours_if_match(client, sample_thought):
+    thought_id = sample_thought["id"]
+    etag = client.get(f"/thoughts/{thought_id}").headers["etag"]
+
+    updated = client.patch(f"/thoughts/{thought_id}", json={"title": "Mine"}, headers={"If-Match": etag})
+    assert updated.status_code == 200
+    assert updated.headers["etag"] != etag
+
+    stale = client.patch(f"/thoughts/{thought_id}", json={"title": "Theirs"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert client.get(f"/thoughts/{thought_id}").json()["title"] == "Mine"
+
+    weak = client.patch(f"/thoughts/{thought_id}", json={"title": "Weak"}, headers={"If-Match": f"W/{updated.headers['etag']}"})
+    assert weak.status_code == 412
+    assert client.patch(f"/thoughts/{thought_id}", json={"title": "Any"}, headers={"If-Match": "*"}).status_code == 200
+
+
+def test_backlinks_and_neighborhood_graph(client):
+    def create(title: str, links: list[str] | None = None) -> str:
+        return client.post("/thoughts/", json={"title": title, "content": title, "links": links or []}).json()["id"]
+
+    a = create("A")
+    b = create("B")
+    c = create("C", [a])
+    client.patch(f"/thoughts/{a}", json={"links": [b]})
+    client.patch(f"/thoughts/{b}", json={"links": [c]})
+    d = create("D", [a])
+    gone = create("Gone", [a])
+    client.delete(f"/thoughts/{gone}")
+
+    backlinks = client.get(f"/thoughts/{a}/backlinks").json()
+    assert backlinks == [
+        {"id": node_id, "title": title, "depth": 1} for node_id, title in sorted([(c, "C"), (d, "D")])
+    ]
+
+    graph = client.get(f"/thoughts/{a}/graph", params={"depth": 1}).json()
+    assert graph["root"] == a and graph["truncated"] is False
+    assert {node["id"]: node["depth"] for node in graph["nodes"]} == {a: 0, b: 1, c: 1, d: 1}
+    assert sorted((edge["source"], edge["target"]) for edge in graph["edges"]) == sorted(
+        [(a, b), (b, c), (c, a), (d, a)]
+    )
+
+    # the a -> b -> c -> a cycle ends at the depth bound
+    outward = client.get(f"/thoughts/{a}/graph", params={"depth": 5, "direction": "out"}).json()
+    assert {node["id"]: node["depth"] for node in outward["nodes"]} == {a: 0, b: 1, c: 2}
+
+    capped = client.get(f"/thoughts/{a}/graph", params={"depth": 2, "max_nodes": 2, "max_edges": 1}).json()
+    assert len(capped["nodes"]) == 2 and capped["truncated"] is True
+
+    assert client.get(f"/thoughts/{gone}/graph").status_code == 404
+    assert client.get("/thoughts/th_missing/backlinks").status_code == 404
+
+
+def test_batch_mutations_best_effort_and_atomic(client):
+    hub = client.post("/thoughts/", json={"title": "Hub", "content": "hub"}).json()["id"]
+    notes = [
+        client.post("/thoughts/", json={"title": f"Note {index}", "content": "n", "links": [hub]}).json()["id"]
+        for index in range(3)
+    ]
+
+    response = client.post(
+        "/thoughts/batch",
+        json={
+            "mode": "best_effort",
+            "operations": [
+                {"op": "create", "thought": {"id": "th_batch", "title": "New", "content": "c", "links": [hub]}},
+                *({"op": "update", "id": note, "changes": {"tags": ["Retagged"]}} for note in notes),
+                {"op": "unlink", "source": notes[0], "target": hub},
+                {"op": "link", "source": hub, "target": "th_batch"},
+                {"op": "link", "source": hub, "target": "th_missing"},
+                {"op": "delete", "id": notes[2]},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["committed"] is True and body["applied"] == 7 and body["failed"] == 1
+    assert [result["status"] for result in body["results"]] == [201, 200, 200, 200, 200, 200, 400, 204]
+    assert body["results"][6]["error"] == "source or target thought not found"
+
+    assert client.get(f"/thoughts/{notes[1]}").json()["tags"] == ["retagged"]
+    assert client.get(f"/thoughts/{notes[0]}").json()["links"] == []
+    assert client.get(f"/thoughts/{hub}").json()["links"] == ["th_batch"]
+    assert client.get(f"/thoughts/{notes[2]}").json()["deleted_at"] is not None
+    backlinks = {node["id"] for node in client.get(f"/thoughts/{hub}/backlinks").json()}
+    assert backlinks == {"th_batch", notes[1]}
+
+    response = client.post(
+        "/thoughts/batch",
+        json={
+            "operations": [
+                {"op": "update", "id": notes[1], "changes": {"title": "Renamed"}},
+                {"op": "create", "thought": {"id": "th_batch", "title": "Clash", "content": "c"}},
+            ]
+        },
+    )
+    body = response.json()
+    assert body["committed"] is False and body["applied"] == 0
+    assert [result["status"] for result in body["results"]] == [424, 409]
+    assert client.get(f"/thoughts/{notes[1]}").json()["title"] == "Note 1"
+
+    assert client.post("/thoughts/batch", json={"operations": []}).status_code == 422
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from enso_api.config import get_settings  # noqa: E402
+from enso_api.database import engine, session_scope  # noqa: E402
+from enso_api.domain.ai import AISearchRequest  # noqa: E402
+from enso_api.domain.thought import ThoughtCreate, ThoughtUpdate  # noqa: E402
+from enso_api.main import app  # noqa: E402
+from enso_api.repositories import change_feed  # noqa: E402
+from enso_api.repositories.thoughts import ThoughtRepository  # noqa: E402
+from enso_api.services.semantic import LocalEmbedder, SemanticSearch, resolve_embedder  # noqa: E402
+from enso_api.vectors import VectorIndex  # noqa: E402
+
+NOTES = {
+    "Launch plan": "Ship the product launch next week with the marketing team",
+    "Garden": "Plant tomatoes and basil in the raised garden bed",
+    "Reading": "Finish the novel about the lighthouse keeper",
+}
+
+
+def _semantic(path=None) -> SemanticSearch:
+    embedder = LocalEmbedder(128)
+    return SemanticSearch(VectorIndex(path, signature=embedder.signature, dimensions=128), embedder)
+
+
+def _seed() -> dict[str, str]:
+    with session_scope() as session:
+        repo = ThoughtRepository(session)
+        return {title: repo.create(ThoughtCreate(title=title, content=content)).id for title, content in NOTES.items()}
+
+
+async def _top(semantic: SemanticSearch, query: str, mode: str = "exact") -> list[str]:
+    response = await semantic.search(AISearchRequest(query=query, limit=3, mode=mode))
+    return [result.id for result in response.results]
+
+
+async def test_search_follows_committed_changes():
+    ids = _seed()
+    semantic = _semantic()
+    change_feed.subscribe(semantic.index.apply)
+    try:
+        with session_scope() as session:
+            semantic.index.load(session)
+        await semantic.drain()
+        assert (await _top(semantic, "tomatoes for the garden"))[0] == ids["Garden"]
+        response = await semantic.search(AISearchRequest(query="product launch"))
+        assert response.results[0].id == ids["Launch plan"] and response.results[0].title == "Launch plan"
+        assert response.source == "vector" and response.results[0].metadata == {"source": "vector", "mode": "exact"}
+
+        with session_scope() as session:
+            repo = ThoughtRepository(session)
+            repo.update(ids["Reading"], ThoughtUpdate(content="Repot the basil and water the tomatoes"))
+            # only tags changed: the stored vector still holds, nothing is queued
+            repo.update(ids["Garden"], ThoughtUpdate(tags=["home"]))
+            repo.delete(ids["Launch plan"])
+        assert semantic.index.pending() == 1
+        await semantic.drain()
+        assert await _top(semantic, "basil and tomatoes") == [ids["Reading"], ids["Garden"]]
+        assert ids["Launch plan"] not in await _top(semantic, "product launch")
+        assert semantic.index.stats().live_vectors == 2
+    finally:
+        change_feed.unsubscribe(semantic.index.apply)
+        await semantic.stop()
+
+
+async def test_memory_mapped_store_survives_a_restart(tmp_path):
+    ids = _seed()
+    semantic = _semantic(tmp_path)
+    with session_scope() as session:
+        semantic.index.load(session)
+    await semantic.drain()
+    assert semantic.index.stats().embedded == 3
+    await semantic.stop()
+
+    # edited while the process was down: only that thought is embedded again
+    with session_scope() as session:
+        ThoughtRepository(session).update(ids["Garden"], ThoughtUpdate(content="Prune the apple trees"))
+    restarted = _semantic(tmp_path)
+    with session_scope() as session:
+        restarted.index.load(session)
+    stats = restarted.index.stats()
+    assert stats.memory_mapped and (stats.live_vectors, stats.pending) == (2, 1)
+    await restarted.drain()
+    assert (await _top(restarted, "apple trees"))[0] == ids["Garden"]
+    assert (await _top(restarted, "lighthouse novel"))[0] == ids["Reading"]
+    await restarted.stop()
+
+
+async def test_search_catches_up_with_writes_from_other_processes():
+    ids = _seed()
+    semantic = _semantic()
+    follower = change_feed.ChangeLogFollower(engine)
+    follower.mark()
+    change_feed.subscribe(semantic.apply)
+    try:
+        with session_scope() as session:
+            semantic.load(session)
+        await semantic.drain()
+        # committed by another worker: this process's change feed never hears of it
+        change_feed.unsubscribe(semantic.apply)
+        with session_scope() as session:
+            repo = ThoughtRepository(session)
+            sailing = repo.create(ThoughtCreate(title="Sailing", content="Rig the boat for the regatta")).id
+            repo.delete(ids["Garden"])
+        change_feed.subscribe(semantic.apply)
+        assert (semantic.index.pending(), semantic.index.stats().live_vectors) == (0, 3)
+
+        assert follower.poll() == 2
+        await semantic.drain()
+        assert (await _top(semantic, "regatta boat"))[0] == sailing
+        assert semantic.index.stats().live_vectors == 3 and semantic.index.stats().embedded == 4
+
+        # a local edit comes round again through the log while it is being embedded: it is not queued twice
+        with session_scope() as session:
+            ThoughtRepository(session).update(ids["Reading"], ThoughtUpdate(content="Repaint the lighthouse"))
+        batch = semantic.index.take_pending(10)
+        assert follower.poll() == 1 and semantic.index.pending() == 1
+        texts = [text for _, text in batch]
+        semantic.index.upsert([thought_id for thought_id, _ in batch], texts, await semantic.embedder.embed(texts))
+        assert semantic.index.pending() == 0
+        assert (await _top(semantic, "paint the lighthouse"))[0] == ids["Reading"]
+    finally:
+        change_feed.unsubscribe(semantic.apply)
+        await semantic.stop()
+
+
+def test_ivf_agrees_with_exact_search():
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(40, 32)).astype(np.float32)
+    members = rng.integers(0, len(centers), size=4000)
+    vectors = centers[members] + 0.05 * rng.normal(size=(4000, 32)).astype(np.float32)
+    index = VectorIndex(signature="test", dimensions=32, ivf_min_vectors=1000)
+    ids = [f"t{slot}" for slot in range(len(vectors))]
+    index.upsert(ids[:3000], ids[:3000], vectors[:3000])
+    assert index.maybe_train() and index.stats().ivf_lists == 54
+    # written after training: served from the overlay until the lists are rebuilt
+    index.upsert(ids[3000:], ids[3000:], vectors[3000:])
+
+    recall = []
+    for query in centers[:10] + 0.05 * rng.normal(size=(10, 32)).astype(np.float32):
+        exact, mode = index.search(query, 10, "exact")
+        approximate, used = index.search(query, 10, "auto", probes=4)
+        assert (mode, used) == ("exact", "ivf")
+        recall.append(len({hit for hit, _ in exact} & {hit for hit, _ in approximate}) / 10)
+    assert np.mean(recall) >= 0.9
+    stats = index.stats()
+    assert (stats.exact_searches, stats.ivf_searches, stats.ivf_overlay) == (10, 10, 1000)
+
+
+def test_search_endpoint_returns_thought_ids(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "ai_enabled", True)
+    monkeypatch.setattr(settings, "ai_mode", "stub")
+
+    with TestClient(app) as client:
+        ids = {
+            title: client.post("/thoughts/", json={"title": title, "content": content}).json()["id"]
+            for title, content in NOTES.items()
+        }
+        deadline = time.monotonic() + 5
+        while client.get("/stats").json()["vector_index"]["live_vectors"] < len(NOTES):
+            assert time.monotonic() < deadline, "thoughts were not embedded"
+            time.sleep(0.01)
+
+        response = client.post("/api/ai/search", json={"query": "lighthouse keeper novel", "limit": 2})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["source"] == "vector" and [result["id"] for result in body["results"]][0] == ids["Reading"]
+        assert body["results"][0]["snippet"] == NOTES["Reading"]
+
+    assert app.state.semantic_search is None
+
+
+def test_embedder_defaults_to_the_model_runner_when_one_is_configured():
+    settings = get_settings()
+    assert resolve_embedder(settings.model_copy(update={"ai_mode": "stub"})) == "hashing"
+    assert resolve_embedder(settings.model_copy(update={"ai_mode": "local"})) == "model"
+    assert resolve_embedder(settings.model_copy(update={"ai_mode": "remote", "ai_model_url": None})) == "hashing"
+    assert resolve_embedder(settings.model_copy(update={"ai_mode": "auto", "ai_embedder": "hashing"})) == "hashing"
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+
+from enso_api.config import get_settings
+from enso_api.database import session_scope
+from enso_api.domain.thought import ThoughtCreate, ThoughtRead, ThoughtUpdate
+from enso_api.main import app
+from enso_api.repositories.thoughts import ThoughtRepository
+from enso_api.write_queue import GroupCommitWriter
+
+
+async def test_group_commit_resolves_each_write_with_its_own_outcome():
+    writer = GroupCommitWriter(window_seconds=0.05)
+    await writer.start()
+    try:
+        creates = [
+            writer.submit(lambda repo, index=index: repo.create(ThoughtCreate(title=f"Queued {index}", content="grouped")))
+            for index in range(5)
+        ]
+        missing = writer.submit(lambda repo: repo.update("th_missing", ThoughtUpdate(title="nope")))
+        results = await asyncio.gather(*creates, missing, return_exceptions=True)
+    finally:
+        await writer.stop()
+
+    created, failure = results[:5], results[5]
+    assert all(isinstance(record, ThoughtRead) for record in created)
+    assert isinstance(failure, ValueError)
+    assert writer.stats.groups == 1
+    assert writer.stats.writes == 6 and writer.stats.failed_writes == 1
+
+    with session_scope() as session:
+        stored = ThoughtRepository(session).list()
+    assert sorted(record.id for record in stored) == sorted(record.id for record in created)
+
+
+def test_routes_write_through_the_queue(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(get_settings(), "write_coalescing", True)
+    with TestClient(app) as client:
+        first = client.post("/thoughts/", json={"title": "First", "content": "queued"}).json()
+        second = client.post("/thoughts/", json={"title": "Second", "content": "queued"}).json()
+        linked = client.post(f"/thoughts/{first['id']}/links/{second['id']}")
+        assert linked.status_code == 200
+        assert linked.json()["links"] == [second["id"]]
+        assert client.patch("/thoughts/th_missing", json={"title": "x"}).status_code == 404
+        assert client.get(f"/thoughts/{first['id']}").json()["links"] == [second["id"]]
+        assert app.state.write_queue.stats.writes == 4
+        stats = client.get("/stats").json()
+        assert stats["write_queue"]["writes"] == 4
+        assert stats["thought_cache"]["hits"] + stats["thought_cache"]["misses"] >= 1
+    assert app.state.write_queue is None